@@ -1,21 +1,36 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
-from sqlalchemy.orm import Session
-from typing import List
-from ..models.dataset import Dataset, DatasetCreate, DatasetUpdate
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response, UploadFile, File
+from fastapi.responses import StreamingResponse, ORJSONResponse
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
+from typing import List, Optional
+from urllib.parse import quote
+from ..models.dataset import (
+    Dataset, DatasetCreate, DatasetUpdate, DatasetVersion, DatasetVersionDiff, DatasetFilter, DatasetFilterReport
+)
 from ..services.dataset_service import DatasetService
-from ..core.database import get_db
+from ..core.database import get_async_db
+from ..core.etag import make_etag, etag_headers, not_modified, file_response
+from ..services.version_service import VersionService
+from ..services.export_service import ExportService
+from ..services.sampling_service import SamplingService
+from ..services.dataset_version_service import DatasetVersionService
+from ..services.quality_filter_service import QualityFilterService
+from ..services.import_service import ImportService
+from ..services.delta_service import DeltaService
+from ..models.bulk_import import ImportReport
 
 router = APIRouter()
 
 
 @router.post("/", response_model=Dataset)
-async def create_dataset(dataset: DatasetCreate, db: Session = Depends(get_db)):
-    """创建新数据集"""
-    return await DatasetService.create_dataset(db, dataset)
+async def create_dataset(dataset: DatasetCreate, db: AsyncSession = Depends(get_async_db)):
+    """创建新数据集，按 question_ids 或筛选条件收录问题"""
+    return await DatasetService.generate_dataset(db, dataset)
 
 
 @router.get("/", response_model=Dataset)
-async def get_dataset(dataset_id: str = Query(..., description="数据集ID"), db: Session = Depends(get_db)):
+async def get_dataset(dataset_id: str = Query(..., description="数据集ID"), db: AsyncSession = Depends(get_async_db)):
     """获取数据集详情"""
     dataset = await DatasetService.get_dataset(db, dataset_id)
     if not dataset:
@@ -24,7 +39,7 @@ async def get_dataset(dataset_id: str = Query(..., description="数据集ID"), d
 
 
 @router.post("/update", response_model=Dataset)
-async def update_dataset(dataset_id: str = Query(..., description="数据集ID"), dataset: DatasetUpdate = None, db: Session = Depends(get_db)):
+async def update_dataset(dataset_id: str = Query(..., description="数据集ID"), dataset: DatasetUpdate = None, db: AsyncSession = Depends(get_async_db)):
     """更新数据集"""
     updated_dataset = await DatasetService.update_dataset(db, dataset_id, dataset.dict(exclude_unset=True))
     if not updated_dataset:
@@ -33,26 +48,217 @@ async def update_dataset(dataset_id: str = Query(..., description="数据集ID")
 
 
 @router.post("/delete")
-async def delete_dataset(dataset_id: str = Query(..., description="数据集ID"), db: Session = Depends(get_db)):
+async def delete_dataset(dataset_id: str = Query(..., description="数据集ID"), db: AsyncSession = Depends(get_async_db)):
     """删除数据集"""
-    if not await DatasetService.delete_dataset(dataset_id):
+    if not await DatasetService.delete_dataset(db, dataset_id):
         raise HTTPException(status_code=404, detail="Dataset not found")
     return {"message": "Dataset deleted successfully"}
 
 
 @router.get("/list", response_model=List[Dataset])
-async def list_project_datasets(project_id: str = Query(..., description="项目ID"), db: Session = Depends(get_db)):
+async def list_project_datasets(
+    request: Request,
+    response: Response,
+    project_id: str = Query(..., description="项目ID"),
+    db: AsyncSession = Depends(get_async_db)
+):
     """获取项目下的所有数据集"""
+    etag = make_etag("datasets", await VersionService.get_project_version(db, project_id), request)
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    response.headers.update(etag_headers(etag))
     return await DatasetService.list_datasets(db, project_id)
 
 
+@router.get("/items", response_class=ORJSONResponse)
+async def list_dataset_items(
+    dataset_id: str = Query(..., description="数据集ID"),
+    page: int = Query(1, ge=1, description="页码"),
+    page_size: int = Query(20, ge=1, le=500, description="每页数量"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """分页获取数据集项"""
+    result = await DatasetService.list_dataset_items(db, dataset_id, page, page_size)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    items, total = result
+    return ORJSONResponse({
+        "items": items,
+        "total": total,
+        "page": page,
+        "page_size": page_size
+    })
+
+
+@router.post("/import", response_model=ImportReport)
+async def import_dataset_items(
+    dataset_id: str = Query(..., description="数据集ID"),
+    format: Optional[str] = Query(None, description="文件格式: jsonl / parquet，不传则按扩展名判断"),
+    file: UploadFile = File(...)
+):
+    """从 JSONL / Parquet 批量导入数据集项"""
+    try:
+        report = await run_in_threadpool(
+            ImportService.import_file, file.file, ImportService.detect_format(file.filename, format),
+            "dataset_items", dataset_id
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not report:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    return report
+
+
 @router.get("/export")
-async def export_dataset(dataset_id: str = Query(..., description="数据集ID"), format: str = Query("json", description="导出格式")):
-    """导出数据集"""
+async def export_dataset(
+    dataset_id: str = Query(..., description="数据集ID"),
+    format: str = Query("json", description="导出格式: json / jsonl / alpaca / sharegpt"),
+    version: Optional[int] = Query(None, description="数据集版本，不传则导出当前数据"),
+    split: Optional[str] = Query(None, description="划分比例，如 train:0.8,validation:0.1,test:0.1"),
+    split_name: Optional[str] = Query(None, description="只导出指定划分，不传则每条记录附带 split 字段"),
+    seed: str = Query("0", description="划分与抽样使用的随机种子，相同种子结果可复现"),
+    sample_size: Optional[int] = Query(None, ge=1, description="抽样条数，不传则不抽样"),
+    stratify_by: Optional[str] = Query(None, description="分层抽样: text / chunk"),
+    compression: str = Query("none", description="压缩算法: none / gzip / zstd"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """流式导出数据集，可按种子哈希划分训练/验证/测试集并抽样"""
+    try:
+        options = SamplingService.build_options(split, split_name, seed, sample_size, stratify_by)
+        export = await DatasetService.export_dataset(db, dataset_id, format, version, options, compression)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not export:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+
+    return StreamingResponse(
+        export.content,
+        media_type=export.media_type,
+        headers={"Content-Disposition": f"attachment; filename*=UTF-8''{quote(export.filename)}"}
+    )
+
+
+@router.get("/export/delta")
+async def export_dataset_delta(
+    dataset_id: str = Query(..., description="数据集ID"),
+    cursor: Optional[str] = Query(None, description="上一次增量导出末尾返回的游标"),
+    since: Optional[datetime] = Query(None, description="没有游标时，导出该时间(UTC)之后的变化"),
+    compression: str = Query("none", description="压缩算法: none / gzip / zstd"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """增量导出：以 JSONL 输出游标之后的删除（op=delete）和新增/修改（op=upsert），最后一行为新游标（op=cursor）"""
+    try:
+        export = await DeltaService.export_delta(db, dataset_id, cursor, since, compression)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not export:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+
+    return StreamingResponse(
+        export.content,
+        media_type=export.media_type,
+        headers={"Content-Disposition": f"attachment; filename*=UTF-8''{quote(export.filename)}"}
+    )
+
+
+@router.post("/export/file")
+async def export_dataset_file(
+    dataset_id: str = Query(..., description="数据集ID"),
+    format: str = Query("jsonl", description="导出格式: json / jsonl / alpaca / sharegpt"),
+    version: Optional[int] = Query(None, description="数据集版本，不传则导出当前数据"),
+    compression: str = Query("gzip", description="压缩算法: none / gzip / zstd"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """把导出结果写成文件，之后通过 /export/shards/file 下载，支持断点续传"""
     try:
-        content = await DatasetService.export_dataset(dataset_id, format)
-        if not content:
-            raise HTTPException(status_code=404, detail="Dataset not found")
-        return content
+        export = await DatasetService.export_dataset(db, dataset_id, format, version, compression=compression)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    if not export:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    return await run_in_threadpool(ExportService.save_export, dataset_id, export)
+
+
+@router.post("/export/shards")
+async def export_dataset_shards(
+    dataset_id: str = Query(..., description="数据集ID"),
+    format: str = Query("parquet", description="分片格式: parquet / arrow"),
+    compression: str = Query("zstd", description="压缩算法，none 表示不压缩"),
+    max_shard_mb: int = Query(256, ge=1, description="单个分片的最大大小(MB)"),
+):
+    """把数据集导出为列式分片，返回 manifest"""
+    try:
+        manifest = await run_in_threadpool(
+            ExportService.write_shards, dataset_id, format, compression, max_shard_mb * 1024 * 1024
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not manifest:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    return manifest
+
+
+@router.get("/export/shards/file")
+async def download_dataset_shard(
+    request: Request,
+    dataset_id: str = Query(..., description="数据集ID"),
+    export_id: str = Query(..., description="导出ID"),
+    file: str = Query(ExportService.MANIFEST_NAME, description="文件名，默认为 manifest"),
+):
+    """下载导出目录中的单个文件（分片、manifest 或完整导出文件），支持 Range 断点续传"""
+    path = ExportService.shard_file(dataset_id, export_id, file)
+    if not path:
+        raise HTTPException(status_code=404, detail="File not found")
+    return file_response(request, path, filename=ExportService.download_name(path))
+
+
+@router.post("/versions", response_model=DatasetVersion)
+async def create_dataset_version(
+    dataset_id: str = Query(..., description="数据集ID"),
+    note: Optional[str] = Query(None, description="版本说明"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """把数据集当前内容提交为新版本"""
+    version = await DatasetVersionService.create_version(db, dataset_id, note)
+    if not version:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    return version
+
+
+@router.get("/versions/list", response_model=List[DatasetVersion])
+async def list_dataset_versions(dataset_id: str = Query(..., description="数据集ID"), db: AsyncSession = Depends(get_async_db)):
+    """获取数据集的所有版本"""
+    return await DatasetVersionService.list_versions(db, dataset_id)
+
+
+@router.get("/versions/diff", response_model=DatasetVersionDiff)
+async def diff_dataset_versions(
+    dataset_id: str = Query(..., description="数据集ID"),
+    from_version: int = Query(..., description="起始版本"),
+    to_version: int = Query(..., description="目标版本"),
+    limit: int = Query(1000, ge=0, le=100000, description="最多返回的哈希数量"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """比较两个版本之间新增、移除的记录"""
+    diff = await DatasetVersionService.diff_versions(db, dataset_id, from_version, to_version, limit)
+    if not diff:
+        raise HTTPException(status_code=404, detail="Version not found")
+    return diff
+
+
+@router.post("/filter", response_model=DatasetFilterReport)
+async def filter_dataset(
+    rules: DatasetFilter,
+    dataset_id: str = Query(..., description="数据集ID"),
+    dry_run: bool = Query(False, description="只统计各规则的丢弃数量，不修改数据"),
+    note: Optional[str] = Query(None, description="过滤后版本的说明")
+):
+    """按质量规则过滤数据集，返回各规则的丢弃数量并生成过滤后的版本"""
+    try:
+        report = await run_in_threadpool(QualityFilterService.filter_dataset, dataset_id, rules, dry_run, note)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not report:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    return report
@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
+from backend.app.core.metrics import render_metrics
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus 指标（多进程时汇总所有 worker）"""
+    # 多进程模式下需要读取所有 worker 的指标文件，放到线程池中执行
+    content, content_type = await run_in_threadpool(render_metrics)
+    return Response(content=content, media_type=content_type)
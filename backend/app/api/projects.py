@@ -1,5 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Response, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from urllib.parse import quote
 from backend.app.models.project import Project, ProjectCreate
@@ -10,8 +11,8 @@ from backend.app.services.project_service import ProjectService
 from backend.app.services.text_service import TextService
 from backend.app.services.question_service import QuestionService
 from backend.app.services.dataset_service import DatasetService
-from backend.app.core.database import get_db
-from backend.app.models.database import Text as TextModel
+from backend.app.core.database import get_async_db
+from backend.app.core.etag import file_response
 from backend.app.schemas.question import Question, QuestionCreate, QuestionUpdate, QuestionGenerationResponse
 import os
 
@@ -19,13 +20,13 @@ router = APIRouter()
 
 
 @router.post("/", response_model=Project)
-async def create_project(project: ProjectCreate, db: Session = Depends(get_db)):
+async def create_project(project: ProjectCreate, db: AsyncSession = Depends(get_async_db)):
     """创建新项目"""
     return await ProjectService.create_project(db, project)
 
 
 @router.get("/detail", response_model=Project)
-async def get_project(project_id: str = Query(..., description="项目ID"), db: Session = Depends(get_db)):
+async def get_project(project_id: str = Query(..., description="项目ID"), db: AsyncSession = Depends(get_async_db)):
     """获取项目详情"""
     project = await ProjectService.get_project(db, project_id)
     if not project:
@@ -34,7 +35,7 @@ async def get_project(project_id: str = Query(..., description="项目ID"), db:
 
 
 @router.get("/", response_model=List[Project])
-async def list_projects(db: Session = Depends(get_db)):
+async def list_projects(db: AsyncSession = Depends(get_async_db)):
     """获取所有项目"""
     projects = await ProjectService.list_projects(db)
     result = []
@@ -54,7 +55,7 @@ async def list_projects(db: Session = Depends(get_db)):
 async def update_project(
     project_id: str = Query(..., description="项目ID"),
     project: ProjectCreate = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """更新项目信息"""
     updated_project = await ProjectService.update_project(db, project_id, project)
@@ -64,7 +65,7 @@ async def update_project(
 
 
 @router.post("/delete")
-async def delete_project(project_id: str = Query(..., description="项目ID"), db: Session = Depends(get_db)):
+async def delete_project(project_id: str = Query(..., description="项目ID"), db: AsyncSession = Depends(get_async_db)):
     """删除项目"""
     success = await ProjectService.delete_project(db, project_id)
     if not success:
@@ -76,7 +77,7 @@ async def delete_project(project_id: str = Query(..., description="项目ID"), d
 async def upload_text(
     project_id: str = Query(..., description="项目ID"),
     file: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """上传文本文件"""
     content = await file.read()
@@ -124,7 +125,7 @@ async def upload_text(
 async def generate_questions(
     project_id: str = Query(..., description="项目ID"),
     text_id: str = Query(..., description="文本ID"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """为文本生成问题"""
     questions = await QuestionService.generate_questions(db, text_id)
@@ -135,15 +136,15 @@ async def generate_questions(
 async def create_dataset(
     project_id: str = Query(..., description="项目ID"),
     dataset: DatasetCreate = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """创建数据集"""
     dataset.project_id = project_id
-    return await DatasetService.create_dataset(db, dataset)
+    return await DatasetService.generate_dataset(db, dataset)
 
 
 @router.get("/datasets", response_model=List[Dataset])
-async def list_datasets(project_id: str = Query(..., description="项目ID"), db: Session = Depends(get_db)):
+async def list_datasets(project_id: str = Query(..., description="项目ID"), db: AsyncSession = Depends(get_async_db)):
     """获取项目下的所有数据集"""
     return await DatasetService.list_datasets(db, project_id)
 
@@ -152,20 +153,30 @@ async def list_datasets(project_id: str = Query(..., description="项目ID"), db
 async def export_dataset(
     project_id: str = Query(..., description="项目ID"),
     dataset_id: str = Query(..., description="数据集ID"),
-    db: Session = Depends(get_db)
+    format: str = Query("json", description="导出格式: json / jsonl / alpaca / sharegpt"),
+    compression: str = Query("none", description="压缩算法: none / gzip / zstd"),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """导出数据集"""
-    dataset = await DatasetService.export_dataset(db, dataset_id)
-    if not dataset:
+    """流式导出数据集"""
+    try:
+        export = await DatasetService.export_dataset(db, dataset_id, format, compression=compression)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not export:
         raise HTTPException(status_code=404, detail="数据集不存在")
-    return dataset
+
+    return StreamingResponse(
+        export.content,
+        media_type=export.media_type,
+        headers={"Content-Disposition": f"attachment; filename*=UTF-8''{quote(export.filename)}"}
+    )
 
 
 @router.post("/datasets/delete")
 async def delete_dataset(
     project_id: str = Query(..., description="项目ID"),
     dataset_id: str = Query(..., description="数据集ID"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """删除数据集"""
     success = await DatasetService.delete_dataset(db, dataset_id)
@@ -175,53 +186,48 @@ async def delete_dataset(
 
 
 @router.get("/texts/download")
-async def download_text(text_id: str = Query(..., description="文本ID"), db: Session = Depends(get_db)):
-    """下载文本文件"""
+async def download_text(request: Request, text_id: str = Query(..., description="文本ID"), db: AsyncSession = Depends(get_async_db)):
+    """下载文本文件，支持 Range 断点续传和 ETag 校验"""
     text = await TextService.get_text(db, text_id)
     if not text:
         raise HTTPException(status_code=404, detail="文件不存在")
 
-    try:
-        # 读取文件内容
-        with open(text.file_path, 'rb') as f:
-            content = f.read()
-
-        # 根据文件扩展名设置正确的 MIME 类型
-        file_extension = os.path.splitext(text.title)[1].lower()
-        mime_types = {
-            '.md': 'text/markdown',
-            '.txt': 'text/plain',
-            '.json': 'application/json',
-            '.csv': 'text/csv',
-            '.html': 'text/html',
-            '.htm': 'text/html',
-            '.xml': 'application/xml',
-            '.yaml': 'text/yaml',
-            '.yml': 'text/yaml',
+    file_path = TextService.resolve_path(text.file_path)
+    if not file_path.is_file():
+        raise HTTPException(status_code=404, detail="文件不存在")
+
+    # 根据文件扩展名设置正确的 MIME 类型
+    file_extension = os.path.splitext(text.title)[1].lower()
+    mime_types = {
+        '.md': 'text/markdown',
+        '.txt': 'text/plain',
+        '.json': 'application/json',
+        '.csv': 'text/csv',
+        '.html': 'text/html',
+        '.htm': 'text/html',
+        '.xml': 'application/xml',
+        '.yaml': 'text/yaml',
+        '.yml': 'text/yaml',
+    }
+    content_type = mime_types.get(file_extension, 'text/plain')
+
+    return file_response(
+        request,
+        file_path,
+        filename=text.title,
+        media_type=f"{content_type}; charset=utf-8",
+        headers={
+            "X-Content-Type-Options": "nosniff",  # 防止浏览器对文件类型进行嗅探修改
+            "Cache-Control": "no-cache",
         }
-        content_type = mime_types.get(file_extension, 'text/plain')
-
-        # 返回文件内容
-        return Response(
-            content=content,
-            media_type=content_type,
-            headers={
-                "Content-Disposition": f'attachment; filename="{quote(text.title)}"; filename*=UTF-8\'\'{quote(text.title)}',
-                "X-Content-Type-Options": "nosniff",  # 防止浏览器对文件类型进行嗅探修改
-                "Content-Type": f"{content_type}; charset=utf-8",
-                "Cache-Control": "no-cache",
-                "Pragma": "no-cache"
-            }
-        )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"读取文件失败: {str(e)}")
+    )
 
 
 @router.post("/generate-dataset", response_model=Dataset)
 async def generate_dataset(
     project_id: str = Query(..., description="项目ID"),
     text_id: str = Query(..., description="文本ID"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """从文本生成数据集"""
     try:
@@ -237,7 +243,7 @@ async def generate_dataset(
 async def list_chunk_datasets(
     project_id: str = Query(..., description="项目ID"),
     chunk_index: int = Query(..., description="分块索引"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取特定分块的数据集列表"""
     return await DatasetService.list_chunk_datasets(db, project_id, chunk_index)
@@ -248,7 +254,7 @@ async def generate_dataset_from_chunk(
     project_id: str,
     text_id: str,
     chunk_index: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """从特定分块生成数据集"""
     dataset = await DatasetService.generate_dataset_from_chunk(db, text_id, chunk_index, project_id)
@@ -260,16 +266,17 @@ async def generate_questions_for_chunk(
     project_id: str,
     text_id: str,
     chunk_index: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """为特定文本分块生成问题"""
     # 获取文本对象
-    text = db.query(TextModel).filter(TextModel.id == text_id, TextModel.project_id == project_id).first()
-    if not text:
+    text = await TextService.get_text(db, text_id)
+    if not text or text.project_id != project_id:
         raise HTTPException(status_code=404, detail="文本不存在")
     
     # 检查分块索引是否有效
-    if not text.chunks or chunk_index >= len(text.chunks):
+    chunks = await TextService.get_text_chunks(db, text_id)
+    if not chunks or chunk_index >= len(chunks):
         raise HTTPException(status_code=400, detail=f"分块索引 {chunk_index} 超出范围")
     
     # 创建 QuestionService 实例
@@ -295,7 +302,7 @@ async def get_chunk_question_count(
     project_id: str,
     text_id: str,
     chunk_index: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取特定分块的问题数量"""
     count = await QuestionService.get_chunk_question_count(db, project_id, text_id, chunk_index)
@@ -305,7 +312,7 @@ async def get_chunk_question_count(
 @router.get("/{project_id}/question-count")
 async def get_project_question_count(
     project_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取项目的问题总数"""
     count = await QuestionService.get_project_question_count(db, project_id)
@@ -1,21 +1,51 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
-from backend.app.core.database import get_db
-from backend.app.schemas.question import Question, QuestionCreate, QuestionUpdate, AnswerGenerationResponse, BatchDeleteRequest
+from backend.app.core.database import get_async_db
+from backend.app.core.etag import make_etag, etag_headers, not_modified
+from backend.app.schemas.question import (
+    Question, QuestionCreate, QuestionUpdate, AnswerGenerationResponse, BatchDeleteRequest,
+    BatchUpdateRequest, BatchUpdateResponse
+)
+from backend.app.models.bulk_import import ImportReport
 from backend.app.services.question_service import QuestionService
+from backend.app.services.import_service import ImportService
+from backend.app.services.version_service import VersionService
 
 router = APIRouter()
 
 
 @router.post("/", response_model=Question)
-async def create_question(question: QuestionCreate, db: Session = Depends(get_db)):
+async def create_question(question: QuestionCreate, db: AsyncSession = Depends(get_async_db)):
     """创建新问题"""
     return await QuestionService.create_question(db, question)
 
 
+@router.post("/import", response_model=ImportReport)
+async def import_questions(
+    project_id: str = Query(..., description="项目ID"),
+    format: str | None = Query(None, description="文件格式: jsonl / parquet，不传则按扩展名判断"),
+    text_id: str | None = Query(None, description="记录中没有 text_id 时使用的文本ID"),
+    chunk_index: int | None = Query(None, ge=0, description="记录中没有 chunk_index 时使用的分块索引"),
+    file: UploadFile = File(...)
+):
+    """从 JSONL / Parquet 批量导入问答对，无效行跳过并在报告中列出"""
+    try:
+        report = await run_in_threadpool(
+            ImportService.import_file, file.file, ImportService.detect_format(file.filename, format),
+            "questions", project_id, text_id, chunk_index
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not report:
+        raise HTTPException(status_code=404, detail="项目不存在")
+    return report
+
+
 @router.get("/", response_model=Question)
-async def get_question(question_id: str = Query(..., description="问题ID"), db: Session = Depends(get_db)):
+async def get_question(question_id: str = Query(..., description="问题ID"), db: AsyncSession = Depends(get_async_db)):
     """获取问题详情"""
     question = await QuestionService.get_question(db, question_id)
     if not question:
@@ -27,17 +57,28 @@ async def get_question(question_id: str = Query(..., description="问题ID"), db
 async def update_question(
     question_id: str = Query(..., description="问题ID"),
     question: QuestionUpdate = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """更新问题"""
-    updated_question = await QuestionService.update_question(db, question_id, question)
+    try:
+        updated_question = await QuestionService.update_question(db, question_id, question)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if not updated_question:
         raise HTTPException(status_code=404, detail="问题不存在")
     return updated_question
 
 
+@router.patch("/batch", response_model=BatchUpdateResponse)
+async def batch_update_questions(request: BatchUpdateRequest, db: AsyncSession = Depends(get_async_db)):
+    """批量部分更新问题，所有有效修改在一个事务中提交，返回逐行结果"""
+    results = await QuestionService.batch_update_questions(db, request.items)
+    updated = sum(1 for result in results if result["success"])
+    return {"updated": updated, "failed": len(results) - updated, "results": results}
+
+
 @router.delete("/delete")
-async def delete_question(question_id: str = Query(..., description="问题ID"), db: Session = Depends(get_db)):
+async def delete_question(question_id: str = Query(..., description="问题ID"), db: AsyncSession = Depends(get_async_db)):
     """删除问题"""
     success = await QuestionService.delete_question(db, question_id)
     if not success:
@@ -45,16 +86,22 @@ async def delete_question(question_id: str = Query(..., description="问题ID"),
     return {"message": "删除成功"}
 
 
-@router.get("/list")
+@router.get("/list", response_class=ORJSONResponse)
 async def list_questions(
+    request: Request,
     project_id: str = Query(..., description="项目ID"),
     text_id: str | None = Query(None, description="文件ID"),
     chunk_index: int | None = Query(None, description="分块索引"),
     page: int = Query(1, description="页码"),
     page_size: int = Query(10, description="每页数量"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取问题列表"""
+    etag = make_etag("questions", await VersionService.get_project_version(db, project_id), request)
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+
     questions, total = await QuestionService.list_questions(
         db, 
         project_id=project_id,
@@ -63,12 +110,12 @@ async def list_questions(
         page=page,
         page_size=page_size
     )
-    return {
+    return ORJSONResponse({
         "items": questions,
         "total": total,
         "page": page,
         "page_size": page_size
-    }
+    }, headers=etag_headers(etag))
 
 
 @router.get("/count")
@@ -76,7 +123,7 @@ async def get_chunk_question_count(
     project_id: str = Query(..., description="项目ID"),
     text_id: str = Query(..., description="文本ID"),
     chunk_index: int = Query(..., description="分块索引"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取特定分块的问题数量"""
     count = await QuestionService.get_chunk_question_count(db, project_id, text_id, chunk_index)
@@ -86,7 +133,7 @@ async def get_chunk_question_count(
 @router.post("/{question_id}/generate-answer", response_model=AnswerGenerationResponse)
 async def generate_answer(
     question_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """为问题生成答案"""
     question_service = QuestionService()  # 创建 QuestionService 实例
@@ -114,7 +161,7 @@ async def generate_answer(
 @router.post("/batch-delete")
 async def batch_delete_questions(
     request: BatchDeleteRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """批量删除问题"""
     success = await QuestionService.batch_delete_questions(db, request.question_ids)
@@ -0,0 +1,10 @@
+from fastapi import APIRouter
+from backend.app.core.cache import cache_stats
+
+router = APIRouter()
+
+
+@router.get("/cache")
+async def get_cache_stats():
+    """获取本进程缓存命中率统计"""
+    return cache_stats()
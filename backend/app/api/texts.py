@@ -1,33 +1,61 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
-from backend.app.core.database import get_db
+from backend.app.core.config import settings
+from backend.app.core.database import get_async_db
+from backend.app.core.etag import make_etag, etag_headers, not_modified
+from backend.app.models.text import TextInfo, TextRange
 from backend.app.schemas.text import Text, TextCreate, TextUpdate
 from backend.app.services.text_service import TextService
+from backend.app.services.version_service import VersionService
 
 router = APIRouter()
 
 
 @router.post("/", response_model=Text)
-async def create_text(text: TextCreate, db: Session = Depends(get_db)):
+async def create_text(text: TextCreate, db: AsyncSession = Depends(get_async_db)):
     """创建新文本"""
     return await TextService.create_text(db, text)
 
 
-@router.get("/", response_model=Text)
-async def get_text(text_id: str = Query(..., description="文本ID"), db: Session = Depends(get_db)):
-    """获取文本详情"""
+@router.get("/", response_model=TextInfo)
+async def get_text(text_id: str = Query(..., description="文本ID"), db: AsyncSession = Depends(get_async_db)):
+    """获取文本详情（不含正文，正文通过 /content 分段读取）"""
     text = await TextService.get_text(db, text_id)
     if not text:
         raise HTTPException(status_code=404, detail="文本不存在")
     return text
 
 
+@router.get("/content", response_model=TextRange)
+async def read_text_content(
+    request: Request,
+    text_id: str = Query(..., description="文本ID"),
+    offset: int = Query(0, ge=0, description="起始位置"),
+    length: int = Query(settings.TEXT_RANGE_DEFAULT_LENGTH, ge=1, le=settings.TEXT_RANGE_MAX_LENGTH, description="读取长度"),
+    unit: str = Query("char", description="offset / length 的单位: char / byte"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """分段读取文本正文，大文件可以逐页加载"""
+    etag = make_etag("text-content", await VersionService.get_text_version(db, text_id), request)
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    try:
+        text_range = await TextService.read_text_range(db, text_id, offset, length, unit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not text_range:
+        raise HTTPException(status_code=404, detail="文本不存在")
+    return ORJSONResponse(text_range.model_dump(), headers=etag_headers(etag))
+
+
 @router.post("/update", response_model=Text)
 async def update_text(
     text_id: str = Query(..., description="文本ID"),
     text: TextUpdate = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """更新文本"""
     updated_text = await TextService.update_text(db, text_id, text)
@@ -37,7 +65,7 @@ async def update_text(
 
 
 @router.post("/delete")
-async def delete_text(text_id: str = Query(..., description="文本ID"), db: Session = Depends(get_db)):
+async def delete_text(text_id: str = Query(..., description="文本ID"), db: AsyncSession = Depends(get_async_db)):
     """删除文本"""
     success = await TextService.delete_text(db, text_id)
     if not success:
@@ -45,29 +73,56 @@ async def delete_text(text_id: str = Query(..., description="文本ID"), db: Ses
     return {"message": "删除成功"}
 
 
-@router.get("/list", response_model=List[Text])
-async def list_project_texts(project_id: str = Query(..., description="项目ID"), db: Session = Depends(get_db)):
-    """获取项目下的所有文本"""
-    return await TextService.list_texts(db, project_id)
+@router.get("/list", response_class=ORJSONResponse)
+async def list_project_texts(
+    request: Request,
+    project_id: str = Query(..., description="项目ID"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """获取项目下的所有文本（只有元数据，不含正文）"""
+    etag = make_etag("texts", await VersionService.get_project_version(db, project_id), request)
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    return ORJSONResponse(await TextService.list_texts(db, project_id), headers=etag_headers(etag))
 
 
 @router.get("/count")
-async def get_project_text_count(project_id: str = Query(..., description="项目ID"), db: Session = Depends(get_db)):
+async def get_project_text_count(project_id: str = Query(..., description="项目ID"), db: AsyncSession = Depends(get_async_db)):
     """获取项目下的文本数量"""
     count = await TextService.get_text_count(db, project_id)
     return {"count": count}
 
 
-@router.get("/chunks")
-async def get_text_chunks(
+@router.get("/chunks", response_class=ORJSONResponse)
+async def list_text_chunks(
+    request: Request,
     text_id: str = Query(..., description="文本ID"),
-    db: Session = Depends(get_db)
+    page: int = Query(1, ge=1, description="页码"),
+    page_size: int = Query(100, ge=1, le=1000, description="每页数量"),
+    include_content: bool = Query(True, description="是否返回分块正文，为 false 时只返回位置、元数据和问题数"),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """获取文本的分块数据"""
-    try:
-        chunks = await TextService.get_text_chunks(db, text_id)
-        return chunks
-    except ValueError as e:
-        raise HTTPException(status_code=404, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"获取分块数据失败: {str(e)}")
+    """分页获取文本的分块数据，附带每个分块的问题数和已回答数"""
+    text = await TextService.get_text(db, text_id)
+    if not text:
+        raise HTTPException(status_code=404, detail="文本不存在")
+
+    # 分块随文本版本变化，问题数随项目版本变化
+    text_version = await VersionService.get_text_version(db, text_id)
+    project_version = await VersionService.get_project_version(db, text.project_id)
+    etag = make_etag("chunks", f"{text_version}.{project_version}", request)
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+
+    result = await TextService.list_chunks(db, text_id, page, page_size, include_content)
+    if result is None:
+        raise HTTPException(status_code=404, detail="文本不存在")
+    items, total = result
+    return ORJSONResponse({
+        "items": items,
+        "total": total,
+        "page": page,
+        "page_size": page_size
+    }, headers=etag_headers(etag))
@@ -0,0 +1,95 @@
+import io
+from datetime import date, datetime
+from typing import List
+import orjson
+from sqlalchemy import JSON, insert
+from sqlalchemy.orm import Session
+
+
+def _default_value(column):
+    """模型上的 Python 端默认值（COPY 不会执行这些默认值，需要在写入前补齐）"""
+    default = column.default
+    return default.arg(None) if default.is_callable else default.arg
+
+
+def _copy_text(value, is_json: bool) -> str:
+    """COPY 文本格式的字段值：NULL 为 \\N，反斜杠、制表符和换行需要转义"""
+    if value is None:
+        return r"\N"
+    if is_json:
+        value = orjson.dumps(value).decode()
+    elif isinstance(value, bool):
+        value = "t" if value else "f"
+    elif isinstance(value, (datetime, date)):
+        value = value.isoformat()
+    else:
+        value = str(value)
+    return value.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def bulk_insert(db: Session, model, rows: List[dict]) -> int:
+    """批量写入（不提交），返回写入的行数
+
+    PostgreSQL 使用 COPY FROM STDIN（psycopg2 / psycopg / asyncpg），其余数据库使用 executemany 的 INSERT。
+    rows 的键为列名，缺少的列按模型上的默认值补齐。异步会话中通过 db.run_sync(bulk_insert, ...) 调用
+    """
+    if not rows:
+        return 0
+    table = model.__table__
+    # 按 INSERT 语句选择连接，读写分离时落到写连接上
+    connection = db.connection(bind_arguments={"clause": insert(table)})
+    driver = connection.dialect.driver
+    if connection.dialect.name != "postgresql" or driver not in ("psycopg2", "psycopg", "psycopg_async", "asyncpg"):
+        db.execute(insert(model), rows)
+        return len(rows)
+
+    columns = [
+        column for column in table.columns
+        if column.name in rows[0] or (column.default is not None and not column.default.is_sequence)
+    ]
+    json_columns = [isinstance(column.type, JSON) for column in columns]
+    records = [
+        [row[column.name] if column.name in row else _default_value(column) for column in columns]
+        for row in rows
+    ]
+    raw = connection.connection
+
+    if driver == "asyncpg":
+        # asyncpg 使用二进制 COPY，json 列需要传入字符串
+        values = [
+            tuple(orjson.dumps(value).decode() if is_json and value is not None else value
+                  for value, is_json in zip(record, json_columns))
+            for record in records
+        ]
+        names = [column.name for column in columns]
+        raw.dbapi_connection.run_async(
+            lambda conn: conn.copy_records_to_table(table.name, records=values, columns=names)
+        )
+        return len(rows)
+
+    buffer = io.StringIO()
+    for record in records:
+        buffer.write("\t".join(_copy_text(value, is_json) for value, is_json in zip(record, json_columns)))
+        buffer.write("\n")
+    preparer = connection.dialect.identifier_preparer
+    sql = (
+        f"COPY {preparer.format_table(table)} "
+        f"({', '.join(preparer.quote(column.name) for column in columns)}) FROM STDIN"
+    )
+
+    if driver == "psycopg2":
+        buffer.seek(0)
+        with raw.cursor() as cursor:
+            cursor.copy_expert(sql, buffer)
+    elif driver == "psycopg":
+        with raw.cursor() as cursor:
+            with cursor.copy(sql) as copy:
+                copy.write(buffer.getvalue())
+    else:
+        async def copy_async(conn):
+            async with conn.cursor() as cursor:
+                async with cursor.copy(sql) as copy:
+                    await copy.write(buffer.getvalue())
+
+        raw.dbapi_connection.run_async(copy_async)
+    return len(rows)
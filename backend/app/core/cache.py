@@ -0,0 +1,79 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+# 进程内所有缓存实例，便于统一查看命中率
+_caches: Dict[str, "VersionedCache"] = {}
+
+
+class VersionedCache:
+    """进程内有界 LRU + TTL 缓存
+
+    每个条目都记录写入时实体的版本号（见 VersionService），读取时必须带上当前版本号，
+    版本不一致视为未命中。这样即使其它 worker 进程修改了数据，本进程也不会读到旧值；
+    本进程内的写操作则直接调用 invalidate 立即失效。
+    """
+
+    def __init__(self, name: str, maxsize: int = 256, ttl: float = 300):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        _caches[name] = self
+
+    def get(self, key: Hashable, version: int) -> Optional[Any]:
+        """命中时返回缓存值，未命中、过期或版本不一致时返回 None"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                entry_version, expires_at, value = entry
+                if entry_version == version and expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def set(self, key: Hashable, version: int, value: Any) -> None:
+        """写入缓存，超出容量时淘汰最久未使用的条目"""
+        with self._lock:
+            self._data[key] = (version, time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        """使指定条目失效"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        """命中率统计"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+def cache_stats() -> Dict[str, dict]:
+    """返回本进程所有缓存的统计信息"""
+    return {name: cache.stats() for name, cache in _caches.items()}
@@ -13,6 +13,7 @@ class Settings(BaseModel):
     # 文件存储配置
     BASE_DIR: Path = Path(__file__).resolve().parent.parent.parent
     UPLOAD_DIR: Path = BASE_DIR / "uploads"
+    EXPORT_DIR: Path = BASE_DIR / "exports"
 
     # AI模型配置
     OPENAI_API_KEY: Optional[str] = None
@@ -21,11 +22,69 @@ class Settings(BaseModel):
     # 文本处理配置
     MAX_CHUNK_SIZE: int = 1000
     CHUNK_OVERLAP: int = 200
+    TEXT_RANGE_DEFAULT_LENGTH: int = 65536  # 区间读取文本正文时默认返回的长度
+    TEXT_RANGE_MAX_LENGTH: int = 1048576  # 区间读取单次允许的最大长度
+
+    # 日志配置（backend/core/logger.py，可通过同名环境变量覆盖）
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "text")  # text: 便于阅读的文本；json: 每行一条 JSON，附带 request_id / job_id
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "DEBUG")  # 标准输出的日志级别
+    LOG_FILE_LEVEL: str = os.getenv("LOG_FILE_LEVEL", "INFO")  # 日志文件的日志级别
+    LOG_LEVELS: str = os.getenv("LOG_LEVELS", "")  # 按 logger 名称覆盖级别，例如 "sqlalchemy.engine=INFO,backend.app.services=WARNING"
+    LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))  # 日志先入队、由后台线程写出，队列满时丢弃；0 表示同步写出
+    LOG_DIAGNOSE: bool = os.getenv("LOG_DIAGNOSE", "false").lower() in ("1", "true", "yes")  # 异常日志附带各层变量的值（开销大，且可能包含敏感数据）
+    LOG_SAMPLE_EVERY: int = int(os.getenv("LOG_SAMPLE_EVERY", "10"))  # 高频事件（如逐个分块的进度）每 N 条记录一条，1 表示不采样
+    CREW_VERBOSE: bool = os.getenv("CREW_VERBOSE", "false").lower() in ("1", "true", "yes")  # crewai 是否输出完整的提示词和模型返回
+
+    # 慢查询日志（在 SQL 引擎事件中判断，backend/app/core/slow_query.py，可通过同名环境变量覆盖）
+    SLOW_QUERY_MS: int = int(os.getenv("SLOW_QUERY_MS", "500"))  # 执行超过该毫秒数的语句记录为 WARNING，0 表示关闭
+    SLOW_QUERY_LOG_PARAMETERS: bool = os.getenv("SLOW_QUERY_LOG_PARAMETERS", "true").lower() in ("1", "true", "yes")  # 是否记录绑定参数（可能包含用户数据）
+    SLOW_QUERY_STACK_DEPTH: int = int(os.getenv("SLOW_QUERY_STACK_DEPTH", "3"))  # 记录的调用位置（项目代码）层数
+
+    # 按需性能分析（backend/app/core/profiling.py，需要安装 pyinstrument，可通过同名环境变量覆盖）
+    PROFILE_TOKEN: str = os.getenv("PROFILE_TOKEN", "")  # 请求头 X-Profile-Token 与之相同时分析该请求，为空表示不接受该请求头
+    PROFILE_PATHS: str = os.getenv("PROFILE_PATHS", "")  # 逗号分隔的路径前缀，匹配的每个请求都分析并保存（排查问题时临时开启）
+    PROFILE_INTERVAL: float = float(os.getenv("PROFILE_INTERVAL", "0.001"))  # 采样间隔（秒）
+    PROFILE_DIR: Path = Path(os.getenv("PROFILE_DIR", str(BASE_DIR / "profiles")))  # 保存分析结果的目录
+
+    # 进程内缓存配置
+    CACHE_MAXSIZE: int = 256  # 每类缓存最多保存的条目数
+    CACHE_TTL_SECONDS: int = 300  # 缓存条目的存活时间
+
+    # 连接池配置（PostgreSQL 等服务端数据库，每个进程一个连接池，可通过同名环境变量覆盖）
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT: int = int(os.getenv("DB_POOL_TIMEOUT", "30"))  # 等待空闲连接的秒数
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # 连接最长复用时间，避免被服务端或代理断开
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+    # 数据库初始化：启动时建表并升级表结构。多进程部署由主进程在 fork 前执行一次，worker 中关闭
+    DB_INIT_ON_STARTUP: bool = os.getenv("DB_INIT_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+
+    # 生产环境服务进程配置（python -m backend.serve，可通过同名环境变量覆盖）
+    # PostgreSQL 的总连接数上限为 SERVER_WORKERS * (DB_POOL_SIZE + DB_MAX_OVERFLOW)
+    SERVER_BIND: str = os.getenv("SERVER_BIND", "0.0.0.0:1897")
+    SERVER_WORKERS: int = int(os.getenv("SERVER_WORKERS", str(os.cpu_count() or 1)))
+    SERVER_PRELOAD: bool = os.getenv("SERVER_PRELOAD", "true").lower() in ("1", "true", "yes")  # 主进程导入应用后再 fork，worker 共享已导入的模块
+    SERVER_MAX_REQUESTS: int = int(os.getenv("SERVER_MAX_REQUESTS", "10000"))  # worker 处理这么多请求后平滑重启，0 表示不重启
+    SERVER_MAX_REQUESTS_JITTER: int = int(os.getenv("SERVER_MAX_REQUESTS_JITTER", "1000"))  # 随机增加的请求数，避免 worker 同时重启
+    SERVER_KEEPALIVE: int = int(os.getenv("SERVER_KEEPALIVE", "5"))  # keep-alive 连接的最长空闲秒数
+    SERVER_TIMEOUT: int = int(os.getenv("SERVER_TIMEOUT", "120"))  # worker 无心跳多久后被重启
+    SERVER_GRACEFUL_TIMEOUT: int = int(os.getenv("SERVER_GRACEFUL_TIMEOUT", "30"))  # 重启时等待进行中请求完成的秒数
+    SERVER_BACKLOG: int = int(os.getenv("SERVER_BACKLOG", "2048"))  # 等待 accept 的连接队列长度
+
+    # SQLite 配置（每个连接建立时设置）
+    SQLITE_BUSY_TIMEOUT_MS: int = 15000  # 等待写锁的最长时间，超时才报 database is locked
+    SQLITE_SYNCHRONOUS: str = "NORMAL"  # WAL 模式下提交只追加 WAL，检查点时才 fsync
+    SQLITE_CACHE_SIZE_KB: int = 65536  # 每个连接的页缓存
+    SQLITE_MMAP_SIZE: int = 268435456  # 内存映射读取的最大字节数
+    SQLITE_READ_POOL_SIZE: int = 8  # 只读连接数，0 表示不做读写分离
+    SQLITE_WRITE_TIMEOUT_SECONDS: int = 30  # 排队等待写连接的最长时间
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         # 确保必要的目录存在
         self.UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+        self.EXPORT_DIR.mkdir(parents=True, exist_ok=True)
 
 
 settings = Settings()
@@ -1,19 +1,175 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from .config import settings
+from .metrics import instrument_engine
 import os
 
 # 获取数据库URL，默认为SQLite
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./app.db")
 
-# 创建数据库引擎
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False}  # 仅用于SQLite
-)
+# 同步驱动 -> 对应的异步驱动
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "postgresql+psycopg": "postgresql+psycopg",  # psycopg 3 同时支持同步和异步
+}
+
+
+def async_database_url(url: str) -> str:
+    """由同步连接串推导异步连接串，可通过 ASYNC_DATABASE_URL 单独指定"""
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.drivername)
+    return parsed.set(drivername=driver).render_as_string(hide_password=False) if driver else url
+
+
+def is_sqlite_file(url: str) -> bool:
+    """是否为基于文件的 SQLite 数据库（内存库的每个连接都是独立的库，不能读写分离）"""
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database not in (None, "", ":memory:")
+
+
+def pool_options(url: str) -> dict:
+    """服务端数据库的连接池参数，SQLite 使用 SQLAlchemy 的默认连接池"""
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+def configure_sqlite(bind: Engine, read_only: bool = False, immediate: bool = False) -> None:
+    """在每个新连接上设置 WAL 及相关 pragma
+
+    read_only 的连接拒绝一切写操作；immediate 的连接用 BEGIN IMMEDIATE 开启事务，
+    在事务开始时就拿到写锁，避免读事务升级为写事务时因快照过期直接失败
+    """
+    @event.listens_for(bind, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        if immediate:
+            # 由下面的 begin 事件显式开启事务
+            dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA cache_size=-{settings.SQLITE_CACHE_SIZE_KB}")
+        cursor.execute(f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+    if immediate:
+        @event.listens_for(bind, "begin")
+        def on_begin(conn):
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+class RoutingSession(Session):
+    """读写分离的会话：flush 和 INSERT/UPDATE/DELETE 使用写连接，其余查询使用 info["read_bind"]
+
+    事务中一旦发生写操作，之后的查询也改用写连接，保证能读到本事务尚未提交的修改；
+    事务结束后恢复从只读连接读取。没有配置 read_bind 时与普通 Session 相同
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        reader = self.info.get("read_bind")
+        if reader is None:
+            return super().get_bind(mapper, clause=clause, **kw)
+        if self._flushing or self.info.get("writing") or getattr(clause, "is_dml", False):
+            self.info["writing"] = True
+            return super().get_bind(mapper, clause=clause, **kw)
+        return reader
+
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _end_writing(session, transaction):
+    if transaction.parent is None:
+        session.info.pop("writing", None)
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", async_database_url(DATABASE_URL))
+
+# 创建数据库引擎（同步，供脚本、建表以及在线程池中执行的导出/导入任务使用）
+if is_sqlite_file(DATABASE_URL) and settings.SQLITE_READ_POOL_SIZE > 0:
+    # 与异步引擎相同：导入、质量过滤等任务先读后写，写连接用 BEGIN IMMEDIATE 在事务开始时拿写锁，
+    # 进程内排队使用唯一的写连接；流式导出等只读操作走只读连接池，不占用写锁
+    engine = create_engine(
+        DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=settings.SQLITE_WRITE_TIMEOUT_SECONDS
+    )
+    read_engine = create_engine(
+        DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        pool_size=settings.SQLITE_READ_POOL_SIZE,
+        max_overflow=0
+    )
+    configure_sqlite(engine, immediate=True)
+    configure_sqlite(read_engine, read_only=True)
+    sync_session_info = {"read_bind": read_engine}
+elif make_url(DATABASE_URL).get_backend_name() == "sqlite":
+    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+    configure_sqlite(engine)
+    read_engine = None
+    sync_session_info = {}
+else:
+    engine = create_engine(DATABASE_URL, **pool_options(DATABASE_URL))
+    read_engine = None
+    sync_session_info = {}
+
+if is_sqlite_file(ASYNC_DATABASE_URL) and settings.SQLITE_READ_POOL_SIZE > 0:
+    # 接口和服务层的写操作排队使用唯一的写连接：SQLite 同一时刻本来就只允许一个写事务，
+    # 在进程内排队可以避免连接之间争抢写锁。读操作使用只读连接池，WAL 模式下读写互不阻塞
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=settings.SQLITE_WRITE_TIMEOUT_SECONDS
+    )
+    async_read_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        pool_size=settings.SQLITE_READ_POOL_SIZE,
+        max_overflow=0
+    )
+    configure_sqlite(async_engine.sync_engine, immediate=True)
+    configure_sqlite(async_read_engine.sync_engine, read_only=True)
+    session_info = {"read_bind": async_read_engine.sync_engine}
+else:
+    # 异步引擎，接口和服务层使用，查询期间不阻塞事件循环
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, **pool_options(ASYNC_DATABASE_URL))
+    async_read_engine = None
+    session_info = {}
+
+# SQL 语句次数和耗时计入指标
+instrument_engine(engine, "sync")
+if read_engine is not None:
+    instrument_engine(read_engine, "sync_read")
+instrument_engine(async_engine.sync_engine, "async")
+if async_read_engine is not None:
+    instrument_engine(async_read_engine.sync_engine, "async_read")
 
 # 创建会话工厂
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=RoutingSession, info=sync_session_info)
+# 提交后不使对象过期：异步会话中访问过期属性会触发隐式 IO
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    sync_session_class=RoutingSession,
+    info=session_info,
+    autoflush=False,
+    expire_on_commit=False
+)
 
 # 创建基类
 Base = declarative_base()
@@ -26,3 +182,22 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# 获取异步数据库会话的依赖函数
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def dispose_after_fork() -> None:
+    """在 fork 出的 worker 进程中丢弃继承自主进程的连接池
+
+    close=False：继承来的连接仍归主进程所有，子进程不能关闭或复用，之后按需新建连接
+    """
+    engine.dispose(close=False)
+    if read_engine is not None:
+        read_engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
+    if async_read_engine is not None:
+        async_read_engine.sync_engine.dispose(close=False)
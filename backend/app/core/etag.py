@@ -0,0 +1,48 @@
+import hashlib
+import os
+from typing import Optional, Union
+from fastapi import Request, Response
+from fastapi.responses import FileResponse
+
+
+def make_etag(resource: str, version: Union[int, str], request: Request) -> str:
+    """根据资源名、版本号和查询参数生成弱 ETag
+
+    同一个接口不同的查询参数（分页、筛选）返回的内容不同，因此查询串也参与计算
+    """
+    query_digest = hashlib.blake2b(str(request.url.query).encode("utf-8"), digest_size=6).hexdigest()
+    return f'W/"{resource}-{version}-{query_digest}"'
+
+
+def etag_headers(etag: str) -> dict:
+    """响应中携带 ETag，并要求客户端每次使用前重新校验"""
+    return {"ETag": etag, "Cache-Control": "no-cache"}
+
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """If-None-Match 命中时返回 304 响应，否则返回 None"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return None
+
+    # If-None-Match 使用弱比较，忽略 W/ 前缀
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    if "*" in candidates or etag.removeprefix("W/") in candidates:
+        return Response(status_code=304, headers=etag_headers(etag))
+    return None
+
+
+def file_response(
+    request: Request,
+    path,
+    filename: Optional[str] = None,
+    media_type: Optional[str] = None,
+    headers: Optional[dict] = None
+) -> Response:
+    """文件下载响应
+
+    FileResponse 按块读取文件（服务器支持时使用 sendfile），内存占用与文件大小无关；
+    自带 ETag / Last-Modified，并支持 Range / If-Range 断点续传，这里再补上 If-None-Match 的 304 处理
+    """
+    response = FileResponse(path, filename=filename, media_type=media_type, headers=headers, stat_result=os.stat(path))
+    return not_modified(request, response.headers["etag"]) or response
@@ -0,0 +1,25 @@
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterable
+from backend.core.logger import logger
+
+# 单线程后台删除上传文件，删除大量文件时不占用请求处理时间
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="file-cleanup")
+
+
+def _remove_files(paths: list) -> int:
+    removed = 0
+    for path in paths:
+        try:
+            os.remove(path)
+            removed += 1
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"删除文件失败 {path}: {e}")
+    return removed
+
+
+def remove_files_later(paths: Iterable) -> Future:
+    """在后台线程中删除文件（数据库事务提交后调用），返回的 Future 结果为实际删除的文件数"""
+    return _executor.submit(_remove_files, list(paths))
@@ -1,9 +1,99 @@
+from sqlalchemy import inspect
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateTable
 from .database import engine
 from ..models.database import Base
+from backend.core.logger import logger
 
 
-def init_db():
-    Base.metadata.create_all(bind=engine)
+def _column_ddl(column, dialect) -> str:
+    """生成 ALTER TABLE ADD COLUMN 使用的列定义"""
+    ddl = f"{dialect.identifier_preparer.quote(column.name)} {column.type.compile(dialect=dialect)}"
+    if column.server_default is not None:
+        default = column.server_default.arg
+        # 字符串默认值需要加引号，text() 构造的默认值原样输出
+        if isinstance(default, str):
+            default = "'" + default.replace("'", "''") + "'"
+        ddl += f" DEFAULT {default}"
+    return ddl
+
+
+def _rebuild_sqlite_table(conn, table) -> None:
+    """按照模型重建 SQLite 表（SQLite 不支持修改列约束）
+
+    先建临时表并拷贝数据，再删除旧表并改名，这样其它表中指向该表的外键不会被改写
+    """
+    tmp_name = f"{table.name}__new"
+    existing = {column["name"] for column in inspect(conn).get_columns(table.name)}
+    columns = ", ".join(
+        conn.dialect.identifier_preparer.quote(column.name) for column in table.columns if column.name in existing
+    )
+
+    # 临时表需要放在同一个 MetaData 中才能解析外键，建完后立即移除
+    tmp_table = table.to_metadata(table.metadata, name=tmp_name)
+    try:
+        conn.execute(CreateTable(tmp_table))
+    finally:
+        table.metadata.remove(tmp_table)
+    conn.exec_driver_sql(f"INSERT INTO {tmp_name} ({columns}) SELECT {columns} FROM {table.name}")
+    conn.exec_driver_sql(f"DROP TABLE {table.name}")
+    conn.exec_driver_sql(f"ALTER TABLE {tmp_name} RENAME TO {table.name}")
+
+
+def upgrade_schema(bind: Engine) -> None:
+    """把已有数据库升级到当前模型
+
+    项目没有引入迁移工具，这里只处理向后兼容的变更：
+    补充缺失的列、放宽 NOT NULL 约束、创建缺失的索引
+    """
+    with bind.connect() as conn:
+        # SQLite 开启外键时 DROP TABLE 会触发级联删除，重建表期间必须关闭（只能在事务外设置）。
+        # 写引擎在每个事务开始时执行 BEGIN IMMEDIATE，这里直接用底层连接执行，不经过 SQLAlchemy 开启事务
+        foreign_keys = None
+        if conn.dialect.name == "sqlite":
+            driver_connection = conn.connection.driver_connection
+            foreign_keys = driver_connection.execute("PRAGMA foreign_keys").fetchone()[0]
+            driver_connection.execute("PRAGMA foreign_keys=OFF")
+
+        try:
+            # 检查表结构也使用同一个连接：写引擎只有一个连接
+            with conn.begin():
+                inspector = inspect(conn)
+                for table in Base.metadata.sorted_tables:
+                    if inspector.has_table(table.name):
+                        _upgrade_table(conn, inspector, table)
+        finally:
+            if foreign_keys:
+                driver_connection.execute("PRAGMA foreign_keys=ON")
+
+
+def _upgrade_table(conn, inspector, table) -> None:
+    existing = {column["name"]: column for column in inspector.get_columns(table.name)}
+    for column in table.columns:
+        if column.name not in existing:
+            logger.info(f"数据库升级: {table.name} 新增列 {column.name}")
+            conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {_column_ddl(column, conn.dialect)}")
+
+    relaxed = [
+        column.name for column in table.columns
+        if column.name in existing and column.nullable and not existing[column.name]["nullable"]
+        and not column.primary_key
+    ]
+    if relaxed:
+        logger.info(f"数据库升级: {table.name} 放宽非空约束 {', '.join(relaxed)}")
+        if conn.dialect.name == "sqlite":
+            _rebuild_sqlite_table(conn, table)
+        else:
+            for name in relaxed:
+                conn.exec_driver_sql(f"ALTER TABLE {table.name} ALTER COLUMN {name} DROP NOT NULL")
+
+    for index in table.indexes:
+        index.create(conn, checkfirst=True)
+
+
+def init_db(bind: Engine = engine) -> None:
+    Base.metadata.create_all(bind=bind)
+    upgrade_schema(bind)
 
 
 if __name__ == "__main__":
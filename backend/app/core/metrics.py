@@ -0,0 +1,227 @@
+"""Prometheus 指标
+
+HTTP 请求（按路由模板）、SQL 语句（SQLAlchemy 引擎事件）、LLM 调用和后台任务的计数与耗时，通过 /metrics 暴露。
+每次记录只是一次进程内的计数器 / 直方图更新，可以在生产环境常开。
+
+多进程部署（python -m backend.serve）时各 worker 通过 PROMETHEUS_MULTIPROC_DIR 目录共享指标，
+该环境变量必须在导入 prometheus_client 之前设置（serve 会自动设置）
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from .config import settings
+
+MULTIPROCESS = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+SQL_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LLM_BUCKETS = (0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0)
+JOB_BUCKETS = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0)
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP 请求数", ["method", "route", "status"]
+)
+HTTP_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP 请求耗时（到响应发送完毕）", ["method", "route"]
+)
+HTTP_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "正在处理的 HTTP 请求数", multiprocess_mode="livesum"
+)
+
+SQL_DURATION = Histogram(
+    "db_statement_duration_seconds", "SQL 语句执行耗时（_count 即语句数）", ["engine", "operation"], buckets=SQL_BUCKETS
+)
+SQL_ERRORS = Counter(
+    "db_statement_errors_total", "执行失败的 SQL 语句数", ["engine", "operation"]
+)
+SQL_SLOW = Counter(
+    "db_slow_statements_total", "执行超过 SLOW_QUERY_MS 的 SQL 语句数", ["engine", "operation"]
+)
+
+LLM_REQUESTS = Counter(
+    "llm_requests_total", "LLM 调用次数", ["model", "status"]
+)
+LLM_DURATION = Histogram(
+    "llm_request_duration_seconds", "单次 LLM 调用耗时", ["model"], buckets=LLM_BUCKETS
+)
+LLM_RETRIES = Counter(
+    "llm_retries_total", "上一次调用失败后重新发起的 LLM 调用次数", ["model"]
+)
+LLM_TOKENS = Counter(
+    "llm_tokens_total", "LLM 消耗的 token 数", ["model", "type"]
+)
+
+JOBS_IN_PROGRESS = Gauge(
+    "jobs_in_progress", "正在执行的任务数（生成问题、生成答案、导入、导出等）", ["job"], multiprocess_mode="livesum"
+)
+JOB_DURATION = Histogram(
+    "job_duration_seconds", "任务耗时", ["job", "status"], buckets=JOB_BUCKETS
+)
+
+
+def _cached_labels(metric):
+    """metric.labels 每次都要加锁查表，热路径上按标签值缓存子指标"""
+    children = {}
+
+    def labels(*values):
+        child = children.get(values)
+        if child is None:
+            child = children[values] = metric.labels(*values)
+        return child
+
+    return labels
+
+
+_http_duration = _cached_labels(HTTP_DURATION)
+_http_requests = _cached_labels(HTTP_REQUESTS)
+_sql_duration = _cached_labels(SQL_DURATION)
+
+
+class MetricsMiddleware:
+    """记录每个 HTTP 请求的次数和耗时
+
+    route 标签使用路由模板（如 /api/texts/chunks），而不是带参数的实际路径，避免标签数量无限增长；
+    没有匹配到路由的请求记为 unmatched
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_PROGRESS.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_IN_PROGRESS.dec()
+            route = scope.get("route")
+            route = getattr(route, "path_format", None) or getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            _http_duration(method, route).observe(time.perf_counter() - start)
+            _http_requests(method, route, status).inc()
+
+
+def _operation(statement: str) -> str:
+    """语句类型：SELECT / INSERT / UPDATE / DELETE 等第一个关键字"""
+    keyword = statement.lstrip()[:16].split(None, 1)
+    return keyword[0].upper() if keyword else "OTHER"
+
+
+def instrument_engine(engine: Engine, name: str) -> None:
+    """通过引擎事件统计 SQL 语句的次数和耗时（异步引擎传入 async_engine.sync_engine）
+
+    超过 SLOW_QUERY_MS 的语句同时记录慢查询日志
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._metrics_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, "_metrics_start", None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        operation = _operation(statement)
+        _sql_duration(name, operation).observe(elapsed)
+        if settings.SLOW_QUERY_MS and elapsed * 1000 >= settings.SLOW_QUERY_MS:
+            # 慢查询模块依赖 logger，而 logger 依赖本模块，只在出现慢查询时导入
+            from .slow_query import log_slow_query
+
+            SQL_SLOW.labels(name, operation).inc()
+            log_slow_query(name, statement, parameters, executemany, elapsed)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        SQL_ERRORS.labels(name, _operation(exception_context.statement or "")).inc()
+
+
+_llm_state = threading.local()
+
+
+@contextmanager
+def track_llm_call(model: str):
+    """记录一次 LLM 调用的耗时和结果
+
+    同一线程中上一次调用失败后再次调用记为一次重试（crewai 在同一线程中重试失败的任务）
+    """
+    if getattr(_llm_state, "failed", False):
+        LLM_RETRIES.labels(model).inc()
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        _llm_state.failed = True
+        LLM_REQUESTS.labels(model, type(e).__name__).inc()
+        raise
+    else:
+        _llm_state.failed = False
+        LLM_REQUESTS.labels(model, "ok").inc()
+    finally:
+        LLM_DURATION.labels(model).observe(time.perf_counter() - start)
+
+
+def instrument_llm(llm):
+    """包装 crewai LLM 实例的 call 方法，记录每次调用"""
+    call = llm.call
+
+    def instrumented_call(*args, **kwargs):
+        with track_llm_call(llm.model):
+            return call(*args, **kwargs)
+
+    llm.call = instrumented_call
+    return llm
+
+
+def record_llm_tokens(model: str, usage) -> None:
+    """记录一次 crew 执行消耗的 token（CrewOutput.token_usage）"""
+    if usage is None:
+        return
+    LLM_TOKENS.labels(model, "prompt").inc(usage.prompt_tokens)
+    LLM_TOKENS.labels(model, "completion").inc(usage.completion_tokens)
+    LLM_TOKENS.labels(model, "cached_prompt").inc(usage.cached_prompt_tokens)
+
+
+@contextmanager
+def track_job(job: str):
+    """记录任务的并发数和耗时，status 为 ok 或异常类型名"""
+    JOBS_IN_PROGRESS.labels(job).inc()
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        yield
+    except Exception as e:
+        status = type(e).__name__
+        raise
+    finally:
+        JOBS_IN_PROGRESS.labels(job).dec()
+        JOB_DURATION.labels(job, status).observe(time.perf_counter() - start)
+
+
+def render_metrics():
+    """返回 (文本格式的指标, Content-Type)；多进程时汇总所有 worker 的指标"""
+    if MULTIPROCESS:
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,139 @@
+import hmac
+import re
+import time
+import uuid
+from anyio import to_thread
+from backend.core.logger import logger
+from .config import settings
+
+PROFILE_TOKEN_HEADER = b"x-profile-token"
+PROFILE_OUTPUT_HEADER = b"x-profile-output"
+PROFILE_FILE_HEADER = b"x-profile-file"
+
+# X-Profile-Output 可选值：store 保存到 PROFILE_DIR（默认），html / speedscope 直接作为响应返回（替代原响应）
+OUTPUT_TYPES = {
+    "html": "text/html; charset=utf-8",
+    "speedscope": "application/json",
+}
+
+
+def _render(profiler, output: str) -> bytes:
+    if output == "speedscope":
+        from pyinstrument.renderers import SpeedscopeRenderer
+        return profiler.output(SpeedscopeRenderer()).encode()
+    return profiler.output_html().encode()
+
+
+def _profile_name(method: str, path: str) -> str:
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", path).strip("_")[:60] or "root"
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{method}-{slug}-{uuid.uuid4().hex[:8]}.html"
+
+
+def _store(profiler, name: str) -> None:
+    """保存为 HTML"""
+    settings.PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    (settings.PROFILE_DIR / name).write_bytes(_render(profiler, "html"))
+
+
+class ProfilingMiddleware:
+    """按需对单个请求做采样分析（pyinstrument），用于排查线上慢请求耗时在 SQL、序列化还是日志上
+
+    两种开启方式，都不影响其他请求：
+    - 请求头 X-Profile-Token 与 PROFILE_TOKEN 相同（管理员手动发起），X-Profile-Output 指定结果返回还是保存
+    - 路径匹配 PROFILE_PATHS 中的前缀（临时开启），结果保存到 PROFILE_DIR
+    保存时响应照常流式发出（导出、下载等大响应不会缓存在内存中），文件名在请求开始时确定并通过 X-Profile-File 响应头返回，
+    分析结果在响应结束后写入，同时记录到日志。只采样事件循环所在线程，线程池中执行的部分显示为等待时间
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.token = settings.PROFILE_TOKEN.encode()
+        self.paths = tuple(filter(None, (part.strip() for part in settings.PROFILE_PATHS.split(","))))
+        self.available = None
+
+    def _requested_output(self, scope):
+        """需要分析时返回结果的输出方式，否则返回 None"""
+        output = None
+        if self.token:
+            headers = dict(scope["headers"])
+            token = headers.get(PROFILE_TOKEN_HEADER)
+            if token is not None and hmac.compare_digest(token, self.token):
+                output = headers.get(PROFILE_OUTPUT_HEADER, b"store").decode("latin-1").lower()
+        if output is None and self.paths and scope["path"].startswith(self.paths):
+            output = "store"
+        if output is None or not self._load_profiler():
+            return None
+        return output if output in OUTPUT_TYPES else "store"
+
+    def _load_profiler(self) -> bool:
+        if self.available is None:
+            try:
+                import pyinstrument  # noqa: F401
+                self.available = True
+            except ImportError:
+                logger.warning("未安装 pyinstrument，忽略性能分析请求")
+                self.available = False
+        return self.available
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not (self.token or self.paths):
+            await self.app(scope, receive, send)
+            return
+        output = self._requested_output(scope)
+        if output is None:
+            await self.app(scope, receive, send)
+            return
+
+        from pyinstrument import Profiler
+
+        profiler = Profiler(interval=settings.PROFILE_INTERVAL, async_mode="enabled")
+        if output == "store":
+            await self._profile_and_store(profiler, scope, receive, send)
+        else:
+            await self._profile_and_return(profiler, output, scope, receive, send)
+
+    async def _profile_and_store(self, profiler, scope, receive, send):
+        name = _profile_name(scope["method"], scope["path"])
+
+        async def send_with_profile_file(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (PROFILE_FILE_HEADER, name.encode())]
+            await send(message)
+
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_file)
+        finally:
+            # 保存失败只记录日志，不能替换请求本身的异常，也不能影响已经发出的响应
+            try:
+                profiler.stop()
+                await to_thread.run_sync(_store, profiler, name)
+                logger.info(f"请求性能分析已保存: {settings.PROFILE_DIR / name}，耗时 {profiler.last_session.duration:.3f}s")
+            except Exception:
+                logger.exception(f"保存请求性能分析失败: {settings.PROFILE_DIR / name}")
+
+    async def _profile_and_return(self, profiler, output, scope, receive, send):
+        # 原响应被丢弃，只保留状态码
+        status = 500
+
+        async def discard(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+        profiler.start()
+        try:
+            await self.app(scope, receive, discard)
+        finally:
+            profiler.stop()
+        body = await to_thread.run_sync(_render, profiler, output)
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", OUTPUT_TYPES[output].encode()),
+                (b"content-length", str(len(body)).encode()),
+                (b"x-profile-status", str(status).encode()),
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
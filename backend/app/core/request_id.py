@@ -0,0 +1,40 @@
+import re
+import uuid
+from backend.core.logger import logger
+
+REQUEST_ID_HEADER = "x-request-id"
+
+# 沿用调用方传入的请求ID时只接受简单字符，避免把任意内容写进日志
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+
+class RequestIdMiddleware:
+    """为每个请求分配 request_id，请求处理期间的日志都附带该字段，并通过 X-Request-ID 响应头返回
+
+    请求头中带有合法的 X-Request-ID 时沿用（便于和网关、前端日志关联）。
+    纯 ASGI 中间件，不像 BaseHTTPMiddleware 那样额外包装请求和响应
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == REQUEST_ID_HEADER.encode():
+                request_id = value.decode("latin-1")
+                break
+        if not request_id or not _VALID_REQUEST_ID.match(request_id):
+            request_id = uuid.uuid4().hex
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (REQUEST_ID_HEADER.encode(), request_id.encode())]
+            await send(message)
+
+        with logger.contextualize(request_id=request_id):
+            await self.app(scope, receive, send_with_request_id)
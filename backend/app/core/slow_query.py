@@ -0,0 +1,66 @@
+import os
+import reprlib
+import sys
+import greenlet
+from backend.core.logger import logger
+from .config import settings
+
+# 只记录项目自身代码（接口、服务层等）的调用位置，跳过 SQLAlchemy、事件循环以及中间件、数据库会话等基础设施
+_PROJECT_DIR = str(settings.BASE_DIR) + os.sep
+_SKIP_DIRS = tuple(os.path.join(str(settings.BASE_DIR), name) + os.sep for name in (os.path.join("app", "core"), "core"))
+
+# 参数中的长文本（如文本块内容）只保留开头，避免慢查询日志本身变成大 IO
+_repr = reprlib.Repr()
+_repr.maxstring = 200
+_repr.maxother = 200
+_repr.maxlist = _repr.maxtuple = _repr.maxdict = 20
+MAX_PARAMETERS_LENGTH = 2000
+
+
+def _frames():
+    """从当前帧向外遍历调用栈
+
+    异步会话中 SQL 在 SQLAlchemy 创建的 greenlet 里执行，调用栈在 greenlet 边界处断开，
+    接着从父 greenlet 挂起处继续，才能找到发起查询的服务层协程
+    """
+    frame = sys._getframe(1)
+    current = greenlet.getcurrent()
+    while True:
+        while frame is not None:
+            yield frame
+            frame = frame.f_back
+        current = current.parent
+        if current is None:
+            return
+        frame = current.gr_frame
+
+
+def call_sites(depth: int) -> list:
+    """最内层的 depth 个项目代码调用位置，格式为 "相对路径:行号 函数名" """
+    sites = []
+    for frame in _frames():
+        filename = frame.f_code.co_filename
+        if filename.startswith(_PROJECT_DIR) and not filename.startswith(_SKIP_DIRS) and "site-packages" not in filename:
+            sites.append(f"{filename[len(_PROJECT_DIR):]}:{frame.f_lineno} {frame.f_code.co_name}")
+            if len(sites) >= depth:
+                break
+    return sites
+
+
+def format_parameters(parameters, executemany: bool) -> str:
+    if executemany:
+        text = f"{len(parameters)} 组，第一组: {_repr.repr(parameters[0])}" if parameters else "0 组"
+    else:
+        text = _repr.repr(parameters)
+    return text[:MAX_PARAMETERS_LENGTH]
+
+
+def log_slow_query(engine: str, statement: str, parameters, executemany: bool, elapsed: float) -> None:
+    """记录一条慢查询：耗时、语句、绑定参数和调用位置（请求中执行时日志附带 request_id）"""
+    sites = call_sites(settings.SLOW_QUERY_STACK_DEPTH)
+    params = format_parameters(parameters, executemany) if settings.SLOW_QUERY_LOG_PARAMETERS else "（未记录）"
+    logger.bind(slow_query=True, engine=engine, duration_ms=round(elapsed * 1000, 1), call_sites=sites).warning(
+        f"慢查询 {elapsed * 1000:.0f}ms [{engine}] {' '.join(statement.split())}\n"
+        f"参数: {params}\n"
+        f"调用位置: {' <- '.join(sites) or '未知'}"
+    )
@@ -0,0 +1,144 @@
+import bisect
+import mmap
+import os
+import uuid
+from pathlib import Path
+from typing import List, Tuple
+from backend.app.core.cache import VersionedCache
+from backend.app.core.config import settings
+
+# 字符索引的分段大小：每段记录一次 (字节偏移, 字符偏移)，按字符定位时最多解码两段加上请求的长度
+INDEX_BLOCK_SIZE = 1024 * 1024
+
+# UTF-8 续字节 0x80-0xBF，删去续字节后剩下的字节数就是字符数
+_CONTINUATION_BYTES = bytes(range(0x80, 0xC0))
+
+# 文件路径 -> 字符索引，版本为文件的 (mtime, 大小)，文件被改写后自动失效
+_index_cache = VersionedCache("text_char_index", settings.CACHE_MAXSIZE, settings.CACHE_TTL_SECONDS)
+
+
+def _align(data, position: int) -> int:
+    """把字节偏移向后移到字符起始位置，避免把一个多字节字符从中间切开（data 为 mmap 或 bytes）"""
+    while position < len(data) and data[position] & 0xC0 == 0x80:
+        position += 1
+    return position
+
+
+def _byte_bounds(data, offset: int, length: int) -> Tuple[int, int]:
+    """按字节取区间：起点向后、终点向前对齐到字符边界，不超过请求的长度
+
+    请求的长度不足一个字符时至少返回一个字符，保证分页能向前推进
+    """
+    size = len(data)
+    start = _align(data, min(offset, size))
+    end = min(start + length, size)
+    while end > start and end < size and data[end] & 0xC0 == 0x80:
+        end -= 1
+    if end == start and start < size:
+        end = _align(data, start + 1)
+    return start, end
+
+
+def _char_index(mm, size: int) -> Tuple[List[int], List[int], int]:
+    """扫描一遍文件，返回 (各段起始字节偏移, 各段起始字符偏移, 总字符数)"""
+    byte_marks, char_marks = [], []
+    position = chars = 0
+    while position < size:
+        end = _align(mm, min(position + INDEX_BLOCK_SIZE, size))
+        byte_marks.append(position)
+        char_marks.append(chars)
+        chars += len(mm[position:end].translate(None, _CONTINUATION_BYTES))
+        position = end
+    return byte_marks, char_marks, chars
+
+
+def read_range(path: Path, offset: int, length: int, unit: str = "char") -> dict:
+    """通过 mmap 读取文本文件（UTF-8）的一段，不把整个文件读入内存
+
+    unit 为 char 时 offset / length 按字符计算，为 byte 时按字节计算（起止位置会对齐到字符边界）。
+    返回的 offset 为实际起始位置，next_offset 为下一段的起始位置，读到末尾时为 None
+    """
+    if unit not in ("char", "byte"):
+        raise ValueError(f"不支持的单位: {unit}，可选: char, byte")
+
+    stat = os.stat(path)
+    size = stat.st_size
+    if size == 0:
+        return {"unit": unit, "offset": 0, "length": 0, "total": 0, "next_offset": None, "content": ""}
+
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if unit == "byte":
+            start, end = _byte_bounds(mm, offset, length)
+            content = mm[start:end].decode("utf-8", errors="replace")
+            total = size
+        else:
+            version = (stat.st_mtime_ns, size)
+            index = _index_cache.get(str(path), version)
+            if index is None:
+                index = _char_index(mm, size)
+                _index_cache.set(str(path), version, index)
+            byte_marks, char_marks, total = index
+
+            start = min(offset, total)
+            end = min(start + length, total)
+            # 只解码覆盖 [start, end) 的若干段
+            first = bisect.bisect_right(char_marks, start) - 1
+            last = bisect.bisect_right(char_marks, end) - 1
+            byte_end = byte_marks[last + 1] if last + 1 < len(byte_marks) else size
+            text = mm[byte_marks[first]:byte_end].decode("utf-8", errors="replace")
+            content = text[start - char_marks[first]:end - char_marks[first]]
+
+    return {
+        "unit": unit,
+        "offset": start,
+        "length": end - start,
+        "total": total,
+        "next_offset": end if end < total else None,
+        "content": content
+    }
+
+
+def slice_range(content: str, offset: int, length: int, unit: str = "char") -> dict:
+    """对内存中的文本取与 read_range 相同格式的一段（文本没有落盘文件时使用）"""
+    if unit == "byte":
+        data = content.encode("utf-8")
+        start, end = _byte_bounds(data, offset, length)
+        piece, total = data[start:end].decode("utf-8"), len(data)
+    elif unit == "char":
+        start, end = min(offset, len(content)), min(offset + length, len(content))
+        piece, total = content[start:end], len(content)
+    else:
+        raise ValueError(f"不支持的单位: {unit}，可选: char, byte")
+
+    return {
+        "unit": unit,
+        "offset": start,
+        "length": end - start,
+        "total": total,
+        "next_offset": end if end < total else None,
+        "content": piece
+    }
+
+
+def stage_text_file(path: Path, content: str) -> Tuple[Path, int]:
+    """把正文写入 path 旁边的临时文件，返回 (临时文件路径, 字节数)
+
+    由调用方在合适的时候（例如数据库提交成功后）用 os.replace 换上，失败时删除临时文件。
+    临时文件名带随机后缀，同一文本的并发修改互不覆盖
+    """
+    data = content.encode("utf-8")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    return tmp_path, len(data)
+
+
+def write_text_file(path: Path, content: str) -> int:
+    """原子地写入文本文件（先写临时文件再替换），返回写入的字节数
+
+    替换而不是原地覆盖，正在通过 mmap 读取旧文件的请求不受影响
+    """
+    tmp_path, size = stage_text_file(path, content)
+    os.replace(tmp_path, path)
+    return size
@@ -0,0 +1,9 @@
+from uvicorn_worker import UvicornWorker
+
+
+class UvloopWorker(UvicornWorker):
+    """gunicorn 使用的 uvicorn worker，固定使用 uvloop 事件循环和 httptools 解析 HTTP
+
+    默认的 auto 在依赖缺失时会静默退回 asyncio / h11，这里缺少依赖时直接启动失败
+    """
+    CONFIG_KWARGS = {"loop": "uvloop", "http": "httptools"}
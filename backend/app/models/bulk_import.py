@@ -0,0 +1,18 @@
+from pydantic import BaseModel
+from typing import List, Dict, Optional
+
+
+class ImportRowError(BaseModel):
+    row: int  # 从 1 开始的行号（JSONL 为文件行号，Parquet 为记录序号）
+    reason: str
+
+
+class ImportReport(BaseModel):
+    target: str  # questions / dataset_items
+    format: str
+    total: int
+    imported: int
+    skipped: int
+    errors: Dict[str, int] = {}  # 跳过原因 -> 数量
+    samples: List[ImportRowError] = []  # 部分跳过的行，便于排查
+    elapsed_seconds: Optional[float] = None
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, JSON, Text as SQLAlchemyText, UUID
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, JSON, Text as SQLAlchemyText, UUID, Index, event
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
@@ -25,6 +25,9 @@ class Project(Base):
 
 class Chunk(Base):
     __tablename__ = "chunks"
+    __table_args__ = (
+        Index("ix_chunks_text_start", "text_id", "start_index"),
+    )
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     content = Column(Text, nullable=False)
@@ -41,6 +44,9 @@ class Chunk(Base):
 
 class Text(Base):
     __tablename__ = "texts"
+    __table_args__ = (
+        Index("ix_texts_project_id", "project_id"),
+    )
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     title = Column(String, nullable=False)
@@ -59,16 +65,27 @@ class Text(Base):
     chunks = relationship("Chunk", back_populates="text", cascade="all, delete-orphan")
 
 
+# 生成问题时答案的占位内容，统计已回答的问题时排除
+PLACEHOLDER_ANSWER = "暂无答案"
+
+
 class Question(Base):
     __tablename__ = "questions"
+    __table_args__ = (
+        # 按文本、分块统计和筛选问题
+        Index("ix_questions_text_chunk", "text_id", "chunk_index"),
+        Index("ix_questions_project_id", "project_id"),
+    )
 
     id = Column(String, primary_key=True)
     content = Column(String, nullable=False)
     answer = Column(String, nullable=False)
-    project_id = Column(String, ForeignKey("projects.id"), nullable=False)
-    text_id = Column(String, ForeignKey("texts.id"), nullable=False)
+    project_id = Column(String, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
+    text_id = Column(String, ForeignKey("texts.id", ondelete="CASCADE"), nullable=False)
     chunk_index = Column(Integer, nullable=False)
     question_metadata = Column(JSON, nullable=True)
+    # 审核状态，已有数据库升级时由列默认值补齐
+    status = Column(String, nullable=False, default="active", server_default="active")
     created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
     updated_at = Column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -80,13 +97,18 @@ class Question(Base):
 
 class Dataset(Base):
     __tablename__ = "datasets"
+    __table_args__ = (
+        Index("ix_datasets_project_id", "project_id"),
+        Index("ix_datasets_text_id", "text_id"),
+    )
 
     id = Column(String, primary_key=True)
     name = Column(String, nullable=False)
     description = Column(String)
-    project_id = Column(String, ForeignKey("projects.id"), nullable=False)
-    text_id = Column(String, ForeignKey("texts.id"), nullable=False)
-    chunk_index = Column(Integer, nullable=False)
+    project_id = Column(String, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
+    # 为空表示项目级数据集；数据集项是问题的副本，文本删除后数据集保留
+    text_id = Column(String, ForeignKey("texts.id", ondelete="SET NULL"), nullable=True)
+    chunk_index = Column(Integer, nullable=True)
     items = Column(JSON, default=list)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -105,9 +127,104 @@ class DatasetItem(Base):
     question = Column(SQLAlchemyText, nullable=False)
     answer = Column(SQLAlchemyText, nullable=False)
     item_metadata = Column(JSON)
+    record_hash = Column(String, nullable=True)  # 对应 qa_records 的内容哈希，提交版本时补齐
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # 关联关系
     dataset = relationship("Dataset", back_populates="items")
     question_ref = relationship("Question", back_populates="dataset_items")
+
+    __table_args__ = (
+        Index("ix_dataset_items_dataset_hash", "dataset_id", "record_hash"),
+        # 增量导出按 (updated_at, id) 游标读取
+        Index("ix_dataset_items_dataset_updated", "dataset_id", "updated_at", "id"),
+        # 删除问题时按问题ID查找数据集项（PostgreSQL 的外键检查也依赖该索引）
+        Index("ix_dataset_items_question_id", "question_id"),
+    )
+
+
+class DatasetItemTombstone(Base):
+    """数据集项的删除记录，增量导出据此输出删除操作"""
+    __tablename__ = "dataset_item_tombstones"
+
+    seq = Column(Integer, primary_key=True, autoincrement=True)  # 单调递增，作为删除记录的游标
+    dataset_id = Column(String, nullable=False)
+    item_id = Column(String, nullable=False)
+    deleted_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_dataset_item_tombstones_dataset_seq", "dataset_id", "seq"),
+    )
+
+
+@event.listens_for(DatasetItem, "after_delete")
+def _record_dataset_item_tombstone(mapper, connection, target):
+    """通过 ORM 删除（包括问题、文本、项目的级联删除）数据集项时写入删除记录
+
+    Query.delete() 等批量删除不会触发该事件，需要调用方自行写入（见 DeltaService.record_deletions）
+    """
+    connection.execute(DatasetItemTombstone.__table__.insert().values(
+        dataset_id=target.dataset_id,
+        item_id=target.id,
+        deleted_at=datetime.utcnow()
+    ))
+
+
+class EntityVersion(Base):
+    """项目/文本的单调递增版本号，每次写操作递增，用于 ETag 和缓存校验"""
+    __tablename__ = "entity_versions"
+
+    scope = Column(String, primary_key=True)  # project / text
+    entity_id = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class QARecord(Base):
+    """按内容寻址的问答记录，相同的问题/答案/元数据只保存一份"""
+    __tablename__ = "qa_records"
+
+    hash = Column(String, primary_key=True)  # sha256(question, answer, metadata)
+    question = Column(SQLAlchemyText, nullable=False)
+    answer = Column(SQLAlchemyText, nullable=False)
+    record_metadata = Column(JSON)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class DatasetVersion(Base):
+    """数据集的不可变版本"""
+    __tablename__ = "dataset_versions"
+
+    id = Column(String, primary_key=True)
+    dataset_id = Column(String, ForeignKey("datasets.id", ondelete="CASCADE"), nullable=False)
+    version = Column(Integer, nullable=False)
+    item_count = Column(Integer, nullable=False, default=0)
+    added_count = Column(Integer, nullable=False, default=0)
+    removed_count = Column(Integer, nullable=False, default=0)
+    note = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_dataset_versions_dataset_version", "dataset_id", "version", unique=True),
+    )
+
+
+class DatasetVersionItem(Base):
+    """版本成员关系
+
+    记录在 added_version 版本加入、在 removed_version 版本移除（为空表示仍存在），
+    版本 v 包含 added_version <= v 且 (removed_version 为空或 > v) 的记录，
+    因此新版本只需要写入变化的部分
+    """
+    __tablename__ = "dataset_version_items"
+
+    dataset_id = Column(String, ForeignKey("datasets.id", ondelete="CASCADE"), primary_key=True)
+    record_hash = Column(String, ForeignKey("qa_records.hash"), primary_key=True)
+    added_version = Column(Integer, primary_key=True)
+    removed_version = Column(Integer, nullable=True)
+
+    __table_args__ = (
+        Index("ix_dataset_version_items_live", "dataset_id", "removed_version", "record_hash"),
+        Index("ix_dataset_version_items_added", "dataset_id", "added_version"),
+    )
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 
@@ -19,7 +19,9 @@ class DatasetBase(BaseModel):
 
 
 class DatasetCreate(DatasetBase):
-    question_ids: List[str]
+    # 指定问题ID时只收录这些问题；为空时按 text_id / chunk_index 筛选项目下的问题
+    question_ids: List[str] = Field(default_factory=list)
+    text_id: Optional[str] = None
 
 
 class Dataset(DatasetBase):
@@ -27,6 +29,7 @@ class Dataset(DatasetBase):
     created_at: datetime
     updated_at: datetime
     items: List[DatasetItem] = []
+    item_count: Optional[int] = None
     status: str = "active"
     format: str = "json"
 
@@ -42,6 +45,53 @@ class DatasetUpdate(BaseModel):
     format: Optional[str] = None
 
 
+class DatasetVersion(BaseModel):
+    id: str
+    dataset_id: str
+    version: int
+    item_count: int
+    added_count: int
+    removed_count: int
+    note: Optional[str] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class DatasetVersionDiff(BaseModel):
+    dataset_id: str
+    from_version: int
+    to_version: int
+    added_count: int
+    removed_count: int
+    added: List[str] = []
+    removed: List[str] = []
+
+
+class DatasetFilter(BaseModel):
+    """数据集质量过滤规则，长度按字符计算，None 表示不限制"""
+    min_question_length: Optional[int] = Field(None, ge=0)
+    max_question_length: Optional[int] = Field(None, ge=0)
+    min_answer_length: Optional[int] = Field(None, ge=0)
+    max_answer_length: Optional[int] = Field(None, ge=0)
+    drop_empty_answers: bool = True  # 丢弃空答案以及占位答案
+    answer_placeholders: List[str] = Field(default_factory=lambda: ["暂无答案"])
+    language: Optional[str] = None  # zh / en，按问题内容判断
+    question_pattern: Optional[str] = None  # 问题必须匹配的正则（RE2 语法）
+    drop_duplicates: bool = True  # 问题、答案、元数据完全相同的只保留最早的一条
+
+
+class DatasetFilterReport(BaseModel):
+    dataset_id: str
+    dry_run: bool
+    total: int
+    kept: int
+    dropped: int
+    drops: Dict[str, int]  # 规则 -> 被该规则丢弃的数量（按规则顺序，每条只计入第一条命中的规则）
+    version: Optional[DatasetVersion] = None
+
+
 class ChunkDatasetResponse(BaseModel):
     chunk_content: str
     datasets: List[Dataset]
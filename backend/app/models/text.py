@@ -40,3 +40,27 @@ class Text(TextBase):
         json_encoders = {
             datetime: lambda v: v.isoformat()
         }
+
+
+class TextInfo(BaseModel):
+    """文本元数据（不含正文，正文通过区间读取接口分页获取）"""
+    id: str
+    title: str
+    project_id: str
+    file_path: str
+    file_size: Optional[int] = None
+    total_chunks: Optional[int] = None
+    status: str = "active"
+    created_at: datetime
+    updated_at: datetime
+
+
+class TextRange(BaseModel):
+    """文本正文的一段"""
+    text_id: str
+    unit: str  # char / byte
+    offset: int  # 实际起始位置（byte 时已对齐到字符边界）
+    length: int  # 返回内容的长度，单位同 unit
+    total: int  # 全文长度，单位同 unit
+    next_offset: Optional[int] = None  # 下一段的起始位置，已到末尾时为 None
+    content: str
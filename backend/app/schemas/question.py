@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional, Union
 from datetime import datetime
 
@@ -49,3 +49,23 @@ class AnswerGenerationResponse(BaseModel):
 
 class BatchDeleteRequest(BaseModel):
     question_ids: List[str]
+
+
+class QuestionPatch(QuestionUpdate):
+    id: str
+
+
+class BatchUpdateRequest(BaseModel):
+    items: List[QuestionPatch] = Field(..., min_length=1, max_length=5000, description="按问题ID的部分更新，只修改传入的字段")
+
+
+class BatchUpdateResult(BaseModel):
+    id: str
+    success: bool
+    error: str | None = None
+
+
+class BatchUpdateResponse(BaseModel):
+    updated: int
+    failed: int
+    results: List[BatchUpdateResult]
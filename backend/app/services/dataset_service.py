@@ -1,31 +1,43 @@
-from typing import List, Optional, Dict, Any
+from typing import TYPE_CHECKING, List, Optional, Dict, Any, Tuple
+from sqlalchemy import func, select, insert, delete, literal, DateTime
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from ..models.dataset import Dataset, DatasetCreate, ChunkDatasetResponse
-from ..models.database import Dataset as DatasetModel, DatasetItem as DatasetItemModel, Text as TextModel, Chunk as ChunkModel
+from ..models.database import Dataset as DatasetModel, DatasetItem as DatasetItemModel, Text as TextModel, Chunk as ChunkModel, Question as QuestionModel
 from ..services.question_service import QuestionService
 import uuid
 from datetime import datetime
-from crewai import Agent, Task, Crew
 from ..core.config import settings
 from ..services.text_service import TextService
+from ..services.version_service import VersionService
+from ..services.export_service import ExportService, ExportStream
+from ..services.sampling_service import SampleOptions
+from ..services.dataset_version_service import DatasetVersionService
+from ..services.delta_service import DeltaService
+
+# crewai 只在生成答案时导入，见 question_service
+if TYPE_CHECKING:
+    from crewai import Agent, Task
 
 
 class DatasetService:
     @staticmethod
-    def create_answer_generator_agent() -> Agent:
+    def create_answer_generator_agent() -> "Agent":
         """创建答案生成Agent"""
+        from crewai import Agent
         return Agent(
             role='答案生成专家',
             goal='根据问题生成准确、详细的答案',
             backstory="""你是一个专业的答案生成专家，擅长根据问题生成准确、详细的答案。
             你会确保答案准确、完整，并且易于理解。""",
-            verbose=True,
+            verbose=settings.CREW_VERBOSE,
             allow_delegation=False
         )
 
     @staticmethod
-    def create_answer_task(agent: Agent, question: str) -> Task:
+    def create_answer_task(agent: "Agent", question: str) -> "Task":
         """创建答案生成任务"""
+        from crewai import Task
         return Task(
             description=f"""请根据以下问题生成详细、准确的答案：
             
@@ -48,20 +60,23 @@ class DatasetService:
         )
 
     @staticmethod
-    async def create_dataset(db: Session, dataset_data: DatasetCreate) -> Dataset:
+    async def create_dataset(db: AsyncSession, dataset_data: DatasetCreate) -> Dataset:
         """创建新的数据集"""
         db_dataset = DatasetModel(
             id=str(uuid.uuid4()),
             name=dataset_data.name,
             description=dataset_data.description,
             project_id=dataset_data.project_id,
+            text_id=dataset_data.text_id,
+            chunk_index=dataset_data.chunk_index,
             created_at=datetime.utcnow(),
             updated_at=datetime.utcnow()
         )
 
         db.add(db_dataset)
-        db.commit()
-        db.refresh(db_dataset)
+        await db.run_sync(VersionService.bump_project, db_dataset.project_id)
+        await db.commit()
+        await db.refresh(db_dataset)
 
         return Dataset(
             id=db_dataset.id,
@@ -74,14 +89,17 @@ class DatasetService:
         )
 
     @staticmethod
-    async def get_dataset(db: Session, dataset_id: str) -> Optional[Dataset]:
+    async def get_dataset(db: AsyncSession, dataset_id: str) -> Optional[Dataset]:
         """获取数据集详情"""
-        db_dataset = db.query(DatasetModel).filter(DatasetModel.id == dataset_id).first()
+        db_dataset = await db.get(DatasetModel, dataset_id)
         if not db_dataset:
             return None
 
         # 获取数据集项
-        db_items = db.query(DatasetItemModel).filter(DatasetItemModel.dataset_id == dataset_id).all()
+        db_items = (await db.execute(
+            select(DatasetItemModel.question, DatasetItemModel.answer, DatasetItemModel.item_metadata)
+            .where(DatasetItemModel.dataset_id == dataset_id)
+        )).all()
         items = [
             {
                 "question": item.question,
@@ -102,204 +120,284 @@ class DatasetService:
         )
 
     @staticmethod
-    async def list_datasets(db: Session, project_id: str) -> List[Dataset]:
-        """获取项目下的所有数据集"""
-        db_datasets = db.query(DatasetModel).filter(DatasetModel.project_id == project_id).all()
-        datasets = []
-
-        for db_dataset in db_datasets:
-            # 获取数据集项
-            db_items = db.query(DatasetItemModel).filter(DatasetItemModel.dataset_id == db_dataset.id).all()
-            items = [
-                {
-                    "question": item.question,
-                    "answer": item.answer,
-                    "metadata": item.item_metadata
-                }
-                for item in db_items
-            ]
+    async def list_datasets(db: AsyncSession, project_id: str) -> List[Dataset]:
+        """获取项目下的所有数据集（仅元数据和数据项数量，数据项请分页获取）"""
+        rows = (await db.execute(select(
+            DatasetModel.id,
+            DatasetModel.name,
+            DatasetModel.description,
+            DatasetModel.project_id,
+            DatasetModel.chunk_index,
+            DatasetModel.created_at,
+            DatasetModel.updated_at,
+            func.count(DatasetItemModel.id).label("item_count")
+        ).outerjoin(
+            DatasetItemModel, DatasetItemModel.dataset_id == DatasetModel.id
+        ).where(
+            DatasetModel.project_id == project_id
+        ).group_by(DatasetModel.id))).all()
+
+        return [
+            Dataset(
+                id=row.id,
+                name=row.name,
+                description=row.description,
+                project_id=row.project_id,
+                chunk_index=row.chunk_index,
+                created_at=row.created_at,
+                updated_at=row.updated_at,
+                item_count=row.item_count
+            )
+            for row in rows
+        ]
 
-            datasets.append(Dataset(
-                id=db_dataset.id,
-                name=db_dataset.name,
-                description=db_dataset.description,
-                project_id=db_dataset.project_id,
-                created_at=db_dataset.created_at.isoformat(),
-                updated_at=db_dataset.updated_at.isoformat(),
-                items=items
-            ))
+    @staticmethod
+    async def list_dataset_items(
+        db: AsyncSession,
+        dataset_id: str,
+        page: int = 1,
+        page_size: int = 20
+    ) -> Optional[Tuple[List[Dict[str, Any]], int]]:
+        """分页获取数据集项，数据集不存在时返回 None"""
+        if not await db.scalar(select(DatasetModel.id).where(DatasetModel.id == dataset_id)):
+            return None
 
-        return datasets
+        total = await db.scalar(
+            select(func.count(DatasetItemModel.id)).where(DatasetItemModel.dataset_id == dataset_id)
+        ) or 0
+        rows = (await db.execute(select(
+            DatasetItemModel.id,
+            DatasetItemModel.question_id,
+            DatasetItemModel.question,
+            DatasetItemModel.answer,
+            DatasetItemModel.item_metadata.label("metadata"),
+            DatasetItemModel.created_at,
+            DatasetItemModel.updated_at
+        ).where(
+            DatasetItemModel.dataset_id == dataset_id
+        ).order_by(
+            DatasetItemModel.created_at, DatasetItemModel.id
+        ).offset((page - 1) * page_size).limit(page_size))).all()
+
+        return [row._asdict() for row in rows], total
 
     @staticmethod
-    async def delete_dataset(db: Session, dataset_id: str) -> bool:
-        """删除数据集"""
-        db_dataset = db.query(DatasetModel).filter(DatasetModel.id == dataset_id).first()
-        if not db_dataset:
+    async def delete_dataset(db: AsyncSession, dataset_id: str) -> bool:
+        """删除数据集（按条件批量删除，不把数据集项加载到会话中）"""
+        project_id = await db.scalar(select(DatasetModel.project_id).where(DatasetModel.id == dataset_id))
+        if not project_id:
             return False
 
-        # 删除数据集项
-        db.query(DatasetItemModel).filter(DatasetItemModel.dataset_id == dataset_id).delete()
+        # 删除数据集项、版本信息和删除记录（数据集本身不存在了，增量导出也就无从谈起）
+        await db.execute(
+            delete(DatasetItemModel).where(DatasetItemModel.dataset_id == dataset_id)
+            .execution_options(synchronize_session=False)
+        )
+        await db.run_sync(DatasetVersionService.delete_versions, dataset_id)
+        await db.run_sync(DeltaService.delete_tombstones, dataset_id)
 
         # 删除数据集
-        db.delete(db_dataset)
-        db.commit()
+        await db.execute(delete(DatasetModel).where(DatasetModel.id == dataset_id).execution_options(synchronize_session=False))
+        await db.run_sync(VersionService.bump_project, project_id)
+        await db.commit()
         return True
 
+    # INSERT ... SELECT 时每条语句绑定的问题ID数量上限（SQLite 单条语句的参数个数有限）
+    ID_BATCH_SIZE = 500
+
     @staticmethod
-    async def generate_dataset(db: Session, dataset_data: DatasetCreate) -> Dataset:
-        """生成数据集"""
-        # 创建数据集
-        dataset = await DatasetService.create_dataset(db, dataset_data)
-
-        # 获取所有问题
-        questions = await QuestionService.list_questions(db, dataset_data.project_id)
-
-        # 创建数据集项
-        for question in questions:
-            db_item = DatasetItemModel(
-                id=str(uuid.uuid4()),
-                dataset_id=dataset.id,
-                question=question.content,
-                answer=question.answer,
-                item_metadata=question.metadata,
-                created_at=datetime.utcnow(),
-                updated_at=datetime.utcnow()
+    def materialize_items(
+        db: Session,
+        dataset_id: str,
+        project_id: str,
+        question_ids: Optional[List[str]] = None,
+        text_id: Optional[str] = None,
+        chunk_index: Optional[int] = None
+    ) -> int:
+        """在数据库端把问题复制为数据集项（INSERT ... SELECT），不提交，返回写入的行数
+
+        数据集项ID由数据集ID和问题ID拼接而成，无需在 Python 中逐行生成
+        """
+        now = datetime.utcnow()
+
+        def insert_from(*filters) -> int:
+            source = select(
+                literal(f"{dataset_id}:") + QuestionModel.id,
+                literal(dataset_id),
+                QuestionModel.id,
+                QuestionModel.content,
+                QuestionModel.answer,
+                QuestionModel.question_metadata,
+                literal(now, DateTime),
+                literal(now, DateTime)
+            ).where(QuestionModel.project_id == project_id, *filters)
+            stmt = insert(DatasetItemModel).from_select(
+                ["id", "dataset_id", "question_id", "question", "answer", "item_metadata", "created_at", "updated_at"],
+                source
+            )
+            return db.execute(stmt).rowcount
+
+        if question_ids:
+            # 去重并保持顺序，按批次绑定参数
+            ids = list(dict.fromkeys(question_ids))
+            batch_size = DatasetService.ID_BATCH_SIZE
+            return sum(
+                insert_from(QuestionModel.id.in_(ids[start:start + batch_size]))
+                for start in range(0, len(ids), batch_size)
             )
-            db.add(db_item)
-
-        db.commit()
 
-        # 返回完整的数据集
-        return await DatasetService.get_dataset(db, dataset.id)
+        filters = []
+        if text_id:
+            filters.append(QuestionModel.text_id == text_id)
+        if chunk_index is not None:
+            filters.append(QuestionModel.chunk_index == chunk_index)
+        return insert_from(*filters)
 
     @staticmethod
-    async def export_dataset(db: Session, dataset_id: str) -> dict:
-        """导出数据集"""
-        dataset = await DatasetService.get_dataset(db, dataset_id)
-        if not dataset:
-            return None
+    async def generate_dataset(db: AsyncSession, dataset_data: DatasetCreate) -> Dataset:
+        """生成数据集
 
-        return {
-            "name": dataset.name,
-            "description": dataset.description,
-            "items": dataset.items
-        }
+        按 question_ids 或 text_id / chunk_index 筛选问题，数据集和数据集项在同一个事务中写入
+        """
+        now = datetime.utcnow()
+        db_dataset = DatasetModel(
+            id=str(uuid.uuid4()),
+            name=dataset_data.name,
+            description=dataset_data.description,
+            project_id=dataset_data.project_id,
+            text_id=dataset_data.text_id,
+            chunk_index=dataset_data.chunk_index,
+            created_at=now,
+            updated_at=now
+        )
+        db.add(db_dataset)
+        await db.flush()
+
+        item_count = await db.run_sync(
+            DatasetService.materialize_items,
+            db_dataset.id,
+            dataset_data.project_id,
+            question_ids=dataset_data.question_ids,
+            text_id=dataset_data.text_id,
+            chunk_index=dataset_data.chunk_index
+        )
+
+        await db.run_sync(VersionService.bump_project, db_dataset.project_id)
+        await db.commit()
+
+        return Dataset(
+            id=db_dataset.id,
+            name=db_dataset.name,
+            description=db_dataset.description,
+            project_id=db_dataset.project_id,
+            chunk_index=db_dataset.chunk_index,
+            created_at=now,
+            updated_at=now,
+            item_count=item_count
+        )
+
+    @staticmethod
+    async def export_dataset(
+        db: AsyncSession,
+        dataset_id: str,
+        format: str = "json",
+        version: Optional[int] = None,
+        options: Optional[SampleOptions] = None,
+        compression: str = "none"
+    ) -> Optional[ExportStream]:
+        """导出数据集（流式，按批次读取数据集项），指定 version 时导出该版本"""
+        return await ExportService.export_dataset(db, dataset_id, format, version, options, compression)
 
     @staticmethod
-    async def generate_dataset_from_text(db: Session, text_id: str, project_id: str) -> Dataset:
+    async def generate_dataset_from_text(db: AsyncSession, text_id: str, project_id: str) -> Dataset:
         """从文本生成数据集"""
         # 获取文本内容
         text = await TextService.get_text(db, text_id)
         if not text:
             raise ValueError("文本不存在")
 
-        # 创建数据集
+        # 生成问题
+        questions = await QuestionService().generate_questions(db, text)
+        if isinstance(questions, dict):
+            raise ValueError(questions["error"])
+
+        # 创建数据集并收录生成的问题
         dataset_data = DatasetCreate(
             name=f"从文本生成的数据集 - {text.title}",
             description=f"基于文本 '{text.title}' 自动生成的数据集",
             project_id=project_id,
-            question_ids=[]  # 暂时为空，后续会添加问题ID
+            text_id=text_id,
+            question_ids=[question.id for question in questions]
         )
-        dataset = await DatasetService.create_dataset(db, dataset_data)
-
-        # 生成问题
-        questions = await QuestionService.generate_questions(db, text)
-        
-        # 创建数据集项
-        for question in questions:
-            db_item = DatasetItemModel(
-                id=str(uuid.uuid4()),
-                dataset_id=dataset.id,
-                question=question.content,
-                answer=question.answer,
-                item_metadata=question.metadata,
-                created_at=datetime.utcnow(),
-                updated_at=datetime.utcnow()
-            )
-            db.add(db_item)
-
-        db.commit()
-
-        # 返回完整的数据集
-        return await DatasetService.get_dataset(db, dataset.id)
+        return await DatasetService.generate_dataset(db, dataset_data)
 
     @staticmethod
-    async def list_chunk_datasets(db: Session, project_id: str, chunk_index: int) -> ChunkDatasetResponse:
+    async def list_chunk_datasets(db: AsyncSession, project_id: str, chunk_index: int) -> ChunkDatasetResponse:
         """获取特定分块的数据集列表"""
         # 获取项目下的所有文本
-        texts = db.query(TextModel).filter(TextModel.project_id == project_id).all()
-        if not texts:
+        text_id = await db.scalar(select(TextModel.id).where(TextModel.project_id == project_id).limit(1))
+        if not text_id:
             return ChunkDatasetResponse(
                 chunk_content="",
                 datasets=[]
             )
 
         # 获取第一个文本的指定分块内容
-        text = texts[0]
-        chunks = db.query(ChunkModel).filter(ChunkModel.text_id == text.id).all()
+        chunks = (await db.scalars(select(ChunkModel.content).where(ChunkModel.text_id == text_id))).all()
         if not chunks or chunk_index >= len(chunks):
             return ChunkDatasetResponse(
                 chunk_content="",
                 datasets=[]
             )
 
-        chunk = chunks[chunk_index]
-        chunk_content = chunk.content
+        chunk_content = chunks[chunk_index]
 
-        # 获取该分块的所有数据集
-        datasets = db.query(DatasetModel).filter(
+        # 获取该分块的所有数据集（不加载数据集项：异步会话中访问未加载的关系会触发隐式 IO）
+        datasets = (await db.scalars(select(DatasetModel).where(
             DatasetModel.project_id == project_id,
             DatasetModel.chunk_index == chunk_index
-        ).all()
+        ))).all()
 
         return ChunkDatasetResponse(
             chunk_content=chunk_content,
-            datasets=[Dataset.from_orm(dataset) for dataset in datasets]
+            datasets=[
+                Dataset(
+                    id=dataset.id,
+                    name=dataset.name,
+                    description=dataset.description,
+                    project_id=dataset.project_id,
+                    chunk_index=dataset.chunk_index,
+                    created_at=dataset.created_at,
+                    updated_at=dataset.updated_at
+                )
+                for dataset in datasets
+            ]
         )
 
     @staticmethod
-    async def generate_dataset_from_chunk(db: Session, text_id: str, chunk_index: int, project_id: str) -> Dataset:
+    async def generate_dataset_from_chunk(db: AsyncSession, text_id: str, chunk_index: int, project_id: str) -> Dataset:
         """从特定分块生成数据集"""
         # 获取文本内容
         text = await TextService.get_text(db, text_id)
         if not text:
             raise ValueError("文本不存在")
         
-        if not text.chunks or chunk_index >= len(text.chunks):
+        chunks = await TextService.get_text_chunks(db, text_id)
+        if not chunks or chunk_index >= len(chunks):
             raise ValueError("分块不存在")
 
-        # 获取指定分块
-        chunk = text.chunks[chunk_index]
+        # 生成问题
+        questions = await QuestionService().generate_questions(db, text, chunk_index)
+        if isinstance(questions, dict):
+            raise ValueError(questions["error"])
 
-        # 创建数据集
+        # 创建数据集并收录生成的问题
         dataset_data = DatasetCreate(
             name=f"从文本生成的数据集 - {text.title} (分块 {chunk_index + 1})",
             description=f"基于文本 '{text.title}' 的第 {chunk_index + 1} 个分块自动生成的数据集",
             project_id=project_id,
+            text_id=text_id,
             chunk_index=chunk_index,
-            question_ids=[]  # 暂时为空，后续会添加问题ID
+            question_ids=[question.id for question in questions]
         )
-        dataset = await DatasetService.create_dataset(db, dataset_data)
-
-        # 生成问题
-        questions = await QuestionService.generate_questions(db, text, chunk_index)
-        
-        # 创建数据集项
-        for question in questions:
-            db_item = DatasetItemModel(
-                id=str(uuid.uuid4()),
-                dataset_id=dataset.id,
-                question=question.content,
-                answer=question.answer,
-                item_metadata=question.metadata,
-                chunk_index=chunk_index,
-                created_at=datetime.utcnow(),
-                updated_at=datetime.utcnow()
-            )
-            db.add(db_item)
-
-        db.commit()
-
-        # 返回完整的数据集
-        return await DatasetService.get_dataset(db, dataset.id)
+        return await DatasetService.generate_dataset(db, dataset_data)
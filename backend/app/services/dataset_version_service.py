@@ -0,0 +1,299 @@
+import hashlib
+import uuid
+from datetime import datetime
+from typing import Any, List, Optional
+import orjson
+from sqlalchemy import and_, func, insert, literal, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased
+from ..models.dataset import DatasetVersion, DatasetVersionDiff
+from ..models.database import (
+    Dataset as DatasetModel,
+    DatasetItem as DatasetItemModel,
+    DatasetVersion as DatasetVersionModel,
+    DatasetVersionItem as DatasetVersionItemModel,
+    QARecord as QARecordModel,
+)
+from .version_service import VersionService
+
+
+class DatasetVersionService:
+    BATCH_SIZE = 500  # 补齐内容哈希时每批处理的数据集项数量
+
+    @staticmethod
+    def record_hash(question: str, answer: str, metadata: Any) -> str:
+        """问答记录的内容哈希，元数据按键排序后参与计算"""
+        payload = orjson.dumps([question, answer, metadata], option=orjson.OPT_SORT_KEYS)
+        return hashlib.sha256(payload).hexdigest()
+
+    @staticmethod
+    def hash_pending_items(db: Session, dataset_id: str) -> int:
+        """为尚未计算哈希的数据集项补齐 record_hash，并把新内容写入 qa_records（不提交）
+
+        已存在的记录不会重复写入，返回本次处理的数据集项数量
+        """
+        processed = 0
+        while True:
+            rows = db.query(
+                DatasetItemModel.id,
+                DatasetItemModel.question,
+                DatasetItemModel.answer,
+                DatasetItemModel.item_metadata,
+                DatasetItemModel.updated_at
+            ).filter(
+                DatasetItemModel.dataset_id == dataset_id,
+                DatasetItemModel.record_hash.is_(None)
+            ).limit(DatasetVersionService.BATCH_SIZE).all()
+            if not rows:
+                return processed
+
+            records = {}
+            updates = []
+            for row in rows:
+                digest = DatasetVersionService.record_hash(row.question, row.answer, row.item_metadata)
+                records[digest] = {
+                    "hash": digest,
+                    "question": row.question,
+                    "answer": row.answer,
+                    "record_metadata": row.item_metadata,
+                }
+                # 哈希不属于导出内容，保留原 updated_at，避免增量导出把这些行当作修改
+                updates.append({"id": row.id, "record_hash": digest, "updated_at": row.updated_at})
+
+            existing = {
+                digest for (digest,) in
+                db.query(QARecordModel.hash).filter(QARecordModel.hash.in_(list(records)))
+            }
+            missing = [record for digest, record in records.items() if digest not in existing]
+            if missing:
+                db.execute(DatasetVersionService.insert_records(db), missing)
+            db.execute(update(DatasetItemModel), updates)
+            processed += len(rows)
+
+    @staticmethod
+    def insert_records(db: Session):
+        """写入 qa_records 的 INSERT 语句
+
+        记录按内容共享，其它数据集可能同时写入相同的记录，支持 ON CONFLICT 的方言上跳过已存在的记录
+        """
+        dialect = db.get_bind(clause=QARecordModel.__table__.insert()).dialect.name
+        upsert = VersionService.UPSERT_DIALECTS.get(dialect)
+        if upsert is None:
+            return insert(QARecordModel)
+        return upsert(QARecordModel).on_conflict_do_nothing(index_elements=[QARecordModel.hash])
+
+    @staticmethod
+    def live_at(version: int):
+        """版本 version 中存在的成员关系条件"""
+        return and_(
+            DatasetVersionItemModel.added_version <= version,
+            or_(
+                DatasetVersionItemModel.removed_version.is_(None),
+                DatasetVersionItemModel.removed_version > version
+            )
+        )
+
+    @staticmethod
+    def member_exists(dataset_id: str, version: int):
+        """同一记录在版本 version 中存在（记录可能被移除后重新加入，对应多行成员关系）"""
+        other = aliased(DatasetVersionItemModel)
+        return select(other.record_hash).where(
+            other.dataset_id == dataset_id,
+            other.record_hash == DatasetVersionItemModel.record_hash,
+            other.added_version <= version,
+            or_(other.removed_version.is_(None), other.removed_version > version)
+        ).exists()
+
+    @staticmethod
+    def latest_version(db: Session, dataset_id: str) -> Optional[DatasetVersionModel]:
+        return db.query(DatasetVersionModel).filter(
+            DatasetVersionModel.dataset_id == dataset_id
+        ).order_by(DatasetVersionModel.version.desc()).first()
+
+    @staticmethod
+    def lock_dataset(db: Session, dataset_id: str) -> None:
+        """在当前事务中锁住数据集，直到提交或回滚
+
+        用一条不改变内容的 UPDATE 实现：PostgreSQL 上锁住该行，SQLite 上拿到写锁，
+        之后的查询也改用写连接。updated_at 显式保持原值，避免触发 onupdate
+        """
+        db.execute(
+            update(DatasetModel).where(DatasetModel.id == dataset_id).values(
+                id=DatasetModel.id,
+                updated_at=DatasetModel.updated_at
+            ).execution_options(synchronize_session=False)
+        )
+
+    @staticmethod
+    async def create_version(db: AsyncSession, dataset_id: str, note: Optional[str] = None) -> Optional[DatasetVersion]:
+        """把数据集当前的数据项提交为新版本，数据集不存在时返回 None"""
+        return await db.run_sync(DatasetVersionService.commit_version, dataset_id, note)
+
+    @staticmethod
+    def commit_version(db: Session, dataset_id: str, note: Optional[str] = None) -> Optional[DatasetVersion]:
+        """create_version 的同步实现，供线程池中的任务直接使用
+
+        只写入与上一个版本相比新增的成员、标记被移除的成员；
+        内容没有变化时直接返回最新版本。数据集不存在时返回 None
+        """
+        if not db.query(DatasetModel.id).filter(DatasetModel.id == dataset_id).first():
+            return None
+
+        # 先拿锁再补齐哈希、读取最新版本号，并发提交（例如过滤任务与接口同时提交）依次执行，不会撞上唯一索引
+        DatasetVersionService.lock_dataset(db, dataset_id)
+        DatasetVersionService.hash_pending_items(db, dataset_id)
+
+        latest = DatasetVersionService.latest_version(db, dataset_id)
+        version = (latest.version if latest else 0) + 1
+
+        current_hashes = select(DatasetItemModel.record_hash).where(
+            DatasetItemModel.dataset_id == dataset_id
+        ).distinct().subquery()
+        live_hashes = select(DatasetVersionItemModel.record_hash).where(
+            DatasetVersionItemModel.dataset_id == dataset_id,
+            DatasetVersionItemModel.removed_version.is_(None)
+        )
+
+        added = db.execute(
+            insert(DatasetVersionItemModel).from_select(
+                ["dataset_id", "record_hash", "added_version"],
+                select(literal(dataset_id), current_hashes.c.record_hash, literal(version)).where(
+                    current_hashes.c.record_hash.not_in(live_hashes)
+                )
+            )
+        ).rowcount
+        removed = db.execute(
+            update(DatasetVersionItemModel).where(
+                DatasetVersionItemModel.dataset_id == dataset_id,
+                DatasetVersionItemModel.removed_version.is_(None),
+                DatasetVersionItemModel.added_version < version,
+                DatasetVersionItemModel.record_hash.not_in(select(current_hashes.c.record_hash))
+            ).values(removed_version=version).execution_options(synchronize_session=False)
+        ).rowcount
+
+        if latest and not added and not removed:
+            # 内容没有变化，只保留补齐的哈希
+            db.commit()
+            return DatasetVersion.model_validate(latest)
+
+        item_count = db.query(func.count()).select_from(DatasetVersionItemModel).filter(
+            DatasetVersionItemModel.dataset_id == dataset_id,
+            DatasetVersionItemModel.removed_version.is_(None)
+        ).scalar()
+        db_version = DatasetVersionModel(
+            id=str(uuid.uuid4()),
+            dataset_id=dataset_id,
+            version=version,
+            item_count=item_count,
+            added_count=added,
+            removed_count=removed,
+            note=note,
+            created_at=datetime.utcnow()
+        )
+        db.add(db_version)
+        db.commit()
+        db.refresh(db_version)
+        return DatasetVersion.model_validate(db_version)
+
+    @staticmethod
+    async def list_versions(db: AsyncSession, dataset_id: str) -> List[DatasetVersion]:
+        """获取数据集的所有版本"""
+        versions = (await db.scalars(
+            select(DatasetVersionModel).where(
+                DatasetVersionModel.dataset_id == dataset_id
+            ).order_by(DatasetVersionModel.version)
+        )).all()
+        return [DatasetVersion.model_validate(version) for version in versions]
+
+    @staticmethod
+    async def diff_versions(
+        db: AsyncSession,
+        dataset_id: str,
+        from_version: int,
+        to_version: int,
+        limit: int = 1000
+    ) -> Optional[DatasetVersionDiff]:
+        """比较两个版本，版本不存在时返回 None"""
+        return await db.run_sync(DatasetVersionService.compute_diff, dataset_id, from_version, to_version, limit)
+
+    @staticmethod
+    def compute_diff(
+        db: Session,
+        dataset_id: str,
+        from_version: int,
+        to_version: int,
+        limit: int = 1000
+    ) -> Optional[DatasetVersionDiff]:
+        """比较两个版本，返回新增/移除的记录哈希
+
+        成员关系按版本区间保存，只需扫描两个版本之间发生变化的行
+        """
+        known = {
+            version for (version,) in db.query(DatasetVersionModel.version).filter(
+                DatasetVersionModel.dataset_id == dataset_id,
+                DatasetVersionModel.version.in_([from_version, to_version])
+            )
+        }
+        if {from_version, to_version} - known:
+            return None
+
+        low, high = sorted((from_version, to_version))
+        base = db.query(DatasetVersionItemModel.record_hash).filter(DatasetVersionItemModel.dataset_id == dataset_id)
+        # high 中存在而 low 中不存在
+        appeared = base.filter(
+            DatasetVersionService.live_at(high),
+            DatasetVersionItemModel.added_version > low,
+            ~DatasetVersionService.member_exists(dataset_id, low)
+        )
+        # low 中存在而 high 中不存在
+        disappeared = base.filter(
+            DatasetVersionService.live_at(low),
+            DatasetVersionItemModel.removed_version > low,
+            DatasetVersionItemModel.removed_version <= high,
+            ~DatasetVersionService.member_exists(dataset_id, high)
+        )
+        if from_version > to_version:
+            appeared, disappeared = disappeared, appeared
+
+        return DatasetVersionDiff(
+            dataset_id=dataset_id,
+            from_version=from_version,
+            to_version=to_version,
+            added_count=appeared.count(),
+            removed_count=disappeared.count(),
+            added=[digest for (digest,) in appeared.limit(limit)],
+            removed=[digest for (digest,) in disappeared.limit(limit)]
+        )
+
+    @staticmethod
+    def version_rows(db: Session, dataset_id: str, version: int, batch_size: int = 1000):
+        """按批次流式读取指定版本的记录，列与 ExportService.item_rows 保持一致"""
+        query = (
+            select(
+                QARecordModel.hash.label("id"),
+                QARecordModel.question,
+                QARecordModel.answer,
+                QARecordModel.record_metadata.label("item_metadata"),
+                literal(None).label("question_id"),
+                literal(None).label("text_id"),
+                literal(None).label("chunk_index"),
+            )
+            .join(DatasetVersionItemModel, DatasetVersionItemModel.record_hash == QARecordModel.hash)
+            .where(DatasetVersionItemModel.dataset_id == dataset_id, DatasetVersionService.live_at(version))
+            .execution_options(yield_per=batch_size)
+        )
+        return db.execute(query)
+
+    @staticmethod
+    def delete_versions(db: Session, dataset_id) -> None:
+        """删除数据集的所有版本信息（不提交），qa_records 由多个数据集共享因此保留
+
+        dataset_id 也可以是数据集ID的子查询，删除项目时一次删除其下所有数据集的版本
+        """
+        dataset_ids = [dataset_id] if isinstance(dataset_id, str) else dataset_id
+        db.query(DatasetVersionItemModel).filter(
+            DatasetVersionItemModel.dataset_id.in_(dataset_ids)
+        ).delete(synchronize_session=False)
+        db.query(DatasetVersionModel).filter(
+            DatasetVersionModel.dataset_id.in_(dataset_ids)
+        ).delete(synchronize_session=False)
@@ -0,0 +1,434 @@
+import hashlib
+import os
+import uuid
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, NamedTuple, Optional
+import orjson
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..models.database import (
+    Dataset as DatasetModel,
+    DatasetItem as DatasetItemModel,
+    DatasetVersion as DatasetVersionModel,
+    Question as QuestionModel,
+)
+from .dataset_version_service import DatasetVersionService
+from .sampling_service import SampleOptions, SamplingService
+from backend.core.logger import with_job
+
+
+class ExportStream(NamedTuple):
+    """流式导出结果"""
+    filename: str  # 下载时展示的文件名（含数据集名称等用户输入），只用于 Content-Disposition
+    media_type: str
+    content: Iterator[bytes]
+    extension: str = ""  # 扩展名（含压缩后缀），保存到磁盘时与导出ID组成文件名
+
+
+class ExportService:
+    # 支持的导出格式 -> (文件扩展名, MIME 类型)
+    FORMATS = {
+        "json": ("json", "application/json"),
+        "jsonl": ("jsonl", "application/x-ndjson"),
+        "alpaca": ("json", "application/json"),
+        "sharegpt": ("json", "application/json"),
+    }
+    BATCH_SIZE = 1000  # 每批从数据库读取、写出的行数
+
+    # 列式分片导出格式 -> (文件扩展名, 支持的压缩算法)
+    SHARD_FORMATS = {
+        "parquet": ("parquet", ("zstd", "snappy", "gzip", "brotli", "lz4", "none")),
+        "arrow": ("arrow", ("zstd", "lz4", "none")),
+    }
+    MANIFEST_NAME = "manifest.json"
+
+    # 流式压缩算法 -> (文件扩展名后缀, MIME 类型)
+    COMPRESSIONS = {
+        "none": ("", None),
+        "gzip": (".gz", "application/gzip"),
+        "zstd": (".zst", "application/zstd"),
+    }
+
+    @staticmethod
+    def item_rows(db: Session, dataset_id: str, batch_size: int = BATCH_SIZE):
+        """按批次流式读取数据集项，只查询导出需要的列，并带上来源分块信息"""
+        query = (
+            select(
+                DatasetItemModel.id,
+                DatasetItemModel.question,
+                DatasetItemModel.answer,
+                DatasetItemModel.item_metadata,
+                DatasetItemModel.question_id,
+                QuestionModel.text_id,
+                QuestionModel.chunk_index,
+            )
+            .outerjoin(QuestionModel, QuestionModel.id == DatasetItemModel.question_id)
+            .where(DatasetItemModel.dataset_id == dataset_id)
+            .execution_options(yield_per=batch_size)
+        )
+        return db.execute(query)
+
+    @staticmethod
+    def format_item(row, format: str, split: Optional[str] = None) -> dict:
+        """把一行数据集项转换为目标格式的记录，split 不为空时附带所属划分"""
+        if format == "alpaca":
+            record = {"instruction": row.question, "input": "", "output": row.answer}
+        elif format == "sharegpt":
+            record = {
+                "conversations": [
+                    {"from": "human", "value": row.question},
+                    {"from": "gpt", "value": row.answer},
+                ]
+            }
+        else:
+            record = {"question": row.question, "answer": row.answer, "metadata": row.item_metadata}
+        if split is not None:
+            record["split"] = split
+        return record
+
+    @staticmethod
+    def iter_records(items, format: str, header: bytes = b"[", footer: bytes = b"]",
+                     batch_size: int = BATCH_SIZE) -> Iterator[bytes]:
+        """把 (行, 划分名) 序列化为字节流
+
+        jsonl 每行一条记录；其余格式写成 JSON 数组，header/footer 用来包裹数组。
+        每攒够 batch_size 条记录输出一次，内存占用与数据集大小无关。
+        """
+        if format == "jsonl":
+            buffer = []
+            for row, split in items:
+                buffer.append(orjson.dumps(ExportService.format_item(row, format, split)))
+                if len(buffer) >= batch_size:
+                    yield b"\n".join(buffer) + b"\n"
+                    buffer = []
+            if buffer:
+                yield b"\n".join(buffer) + b"\n"
+            return
+
+        buffer = [header]
+        first = True
+        for row, split in items:
+            record = orjson.dumps(ExportService.format_item(row, format, split))
+            buffer.append(record if first else b"," + record)
+            first = False
+            if len(buffer) >= batch_size:
+                yield b"".join(buffer)
+                buffer = []
+        buffer.append(footer)
+        yield b"".join(buffer)
+
+    @staticmethod
+    def check_compression(compression: str) -> None:
+        if compression not in ExportService.COMPRESSIONS:
+            raise ValueError(f"不支持的压缩算法: {compression}，可选: {', '.join(ExportService.COMPRESSIONS)}")
+        if compression == "zstd":
+            try:
+                import zstandard  # noqa: F401
+            except ImportError:
+                raise ValueError("zstd 压缩需要安装 zstandard")
+
+    @staticmethod
+    def compress(chunks: Iterator[bytes], compression: str, level: Optional[int] = None) -> Iterator[bytes]:
+        """对字节流做增量压缩，只缓存压缩器内部的窗口，内存占用与数据大小无关"""
+        if compression == "none":
+            yield from chunks
+            return
+        if compression == "gzip":
+            # wbits=31 输出带 gzip 头和校验的格式
+            compressor = zlib.compressobj(6 if level is None else level, zlib.DEFLATED, 31)
+        else:
+            import zstandard
+
+            compressor = zstandard.ZstdCompressor(level=3 if level is None else level).compressobj()
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+
+    @staticmethod
+    def stream_dataset(
+        dataset_id: str,
+        format: str,
+        name: str,
+        description: Optional[str],
+        version: Optional[int] = None,
+        options: Optional[SampleOptions] = None
+    ) -> Iterator[bytes]:
+        """生成导出字节流
+
+        FastAPI 会在响应体发送前关闭依赖注入的会话，因此这里使用独立的会话。
+        划分与抽样在读取数据的同一次遍历中完成（见 SamplingService）
+        """
+        db = SessionLocal()
+        try:
+            if version is None:
+                rows = ExportService.item_rows(db, dataset_id)
+            else:
+                rows = DatasetVersionService.version_rows(db, dataset_id, version, ExportService.BATCH_SIZE)
+            if options is not None and options.active:
+                items = SamplingService.apply(rows, options)
+            else:
+                items = ((row, None) for row in rows)
+            if format == "json":
+                header = b'{"name":' + orjson.dumps(name) + b',"description":' + orjson.dumps(description) + b',"items":['
+                yield from ExportService.iter_records(items, format, header=header, footer=b"]}")
+            else:
+                yield from ExportService.iter_records(items, format)
+        finally:
+            db.close()
+
+    @staticmethod
+    async def export_dataset(
+        db: AsyncSession,
+        dataset_id: str,
+        format: str = "json",
+        version: Optional[int] = None,
+        options: Optional[SampleOptions] = None,
+        compression: str = "none"
+    ) -> Optional[ExportStream]:
+        """导出数据集为流式响应内容，数据集（或指定版本）不存在时返回 None
+
+        options 用于按种子划分训练/验证/测试集或抽取固定大小的子集；
+        compression 为 gzip / zstd 时输出压缩后的文件（.gz / .zst）
+        """
+        if format not in ExportService.FORMATS:
+            raise ValueError(f"不支持的导出格式: {format}，可选: {', '.join(ExportService.FORMATS)}")
+        ExportService.check_compression(compression)
+        if version is not None and options is not None and options.stratify_by:
+            # 版本记录按内容哈希保存（见 DatasetVersionService.version_rows），不包含文本和分块，
+            # 分层时所有记录会落入同一层，结果等同于不分层
+            raise ValueError("按版本导出时不支持分层抽样（版本记录不包含文本和分块信息），请去掉 stratify_by 或导出当前数据")
+
+        dataset = (await db.execute(
+            select(DatasetModel.name, DatasetModel.description).where(DatasetModel.id == dataset_id)
+        )).first()
+        if not dataset:
+            return None
+        if version is not None and not await db.scalar(select(DatasetVersionModel.id).where(
+            DatasetVersionModel.dataset_id == dataset_id,
+            DatasetVersionModel.version == version
+        )):
+            return None
+
+        extension, media_type = ExportService.FORMATS[format]
+        suffix, compressed_type = ExportService.COMPRESSIONS[compression]
+        stem = dataset.name
+        if options is not None and options.split_name:
+            stem = f"{stem}.{options.split_name}"
+        extension = f".{format}.{extension}" if format in ("alpaca", "sharegpt") else f".{extension}"
+        content = ExportService.stream_dataset(dataset_id, format, dataset.name, dataset.description, version, options)
+        return ExportStream(
+            filename=stem + extension + suffix,
+            media_type=compressed_type or media_type,
+            content=ExportService.compress(content, compression),
+            extension=extension + suffix
+        )
+
+    @staticmethod
+    @with_job("export")
+    def save_export(dataset_id: str, export: ExportStream) -> dict:
+        """把导出流写入导出目录，供支持断点续传（Range）的文件下载使用
+
+        先写临时文件，完成后再改名，下载方不会读到写了一半的文件。
+        磁盘上的文件名由导出ID和扩展名组成，不使用包含数据集名称的 export.filename（可能含有 / 或 ..），
+        展示用的文件名记录在同目录的 manifest 中，下载时用于 Content-Disposition。
+        同步方法，调用方应放到线程池中执行
+        """
+        export_id = f"{datetime.utcnow().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        output_dir = ExportService.export_dir(dataset_id, export_id)
+        file_name = f"{export_id}{export.extension}"
+        path = output_dir / file_name
+        partial = output_dir / f"{file_name}.part"
+        if path.resolve().parent != output_dir.resolve():
+            raise ValueError(f"非法的导出路径: {path}")
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        digest = hashlib.sha256()
+        size = 0
+        with open(partial, "wb") as f:
+            for chunk in export.content:
+                f.write(chunk)
+                digest.update(chunk)
+                size += len(chunk)
+        partial.replace(path)
+        manifest = {
+            "export_id": export_id,
+            "dataset_id": dataset_id,
+            "file": file_name,
+            "filename": export.filename,
+            "media_type": export.media_type,
+            "bytes": size,
+            "sha256": digest.hexdigest(),
+            "created_at": datetime.utcnow().isoformat(),
+        }
+        (output_dir / ExportService.MANIFEST_NAME).write_bytes(orjson.dumps(manifest, option=orjson.OPT_INDENT_2))
+        return manifest
+
+    @staticmethod
+    def shard_schema():
+        """列式分片的表结构，metadata 以 JSON 字符串保存，避免不同行的字段不一致"""
+        import pyarrow as pa
+
+        return pa.schema([
+            ("id", pa.string()),
+            ("question", pa.string()),
+            ("answer", pa.string()),
+            ("metadata", pa.string()),
+            ("question_id", pa.string()),
+            ("text_id", pa.string()),
+            ("chunk_index", pa.int32()),
+        ])
+
+    @staticmethod
+    def record_batches(rows, schema, batch_size: int = BATCH_SIZE):
+        """把数据库行按批次转换为 Arrow RecordBatch"""
+        import pyarrow as pa
+
+        columns = {name: [] for name in schema.names}
+        for row in rows:
+            columns["id"].append(row.id)
+            columns["question"].append(row.question)
+            columns["answer"].append(row.answer)
+            columns["metadata"].append(orjson.dumps(row.item_metadata).decode() if row.item_metadata is not None else None)
+            columns["question_id"].append(row.question_id)
+            columns["text_id"].append(row.text_id)
+            columns["chunk_index"].append(row.chunk_index)
+            if len(columns["id"]) >= batch_size:
+                yield pa.RecordBatch.from_pydict(columns, schema=schema)
+                columns = {name: [] for name in schema.names}
+        if columns["id"]:
+            yield pa.RecordBatch.from_pydict(columns, schema=schema)
+
+    @staticmethod
+    def export_dir(dataset_id: str, export_id: str) -> Path:
+        """分片导出目录"""
+        return settings.EXPORT_DIR / dataset_id / export_id
+
+    @staticmethod
+    def write_shards(
+        dataset_id: str,
+        format: str = "parquet",
+        compression: str = "zstd",
+        max_shard_bytes: int = 256 * 1024 * 1024,
+        batch_size: int = BATCH_SIZE
+    ) -> Optional[dict]:
+        """把数据集写成大小受限的 Parquet / Arrow IPC 分片，并生成 manifest
+
+        按 RecordBatch 流式写入，当前分片达到 max_shard_bytes 后切换到下一个文件（超出部分不超过一个批次）。
+        同步方法，调用方应放到线程池中执行。数据集不存在时返回 None
+        """
+        if format not in ExportService.SHARD_FORMATS:
+            raise ValueError(f"不支持的分片格式: {format}，可选: {', '.join(ExportService.SHARD_FORMATS)}")
+        extension, compressions = ExportService.SHARD_FORMATS[format]
+        if compression not in compressions:
+            raise ValueError(f"{format} 不支持压缩算法 {compression}，可选: {', '.join(compressions)}")
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("分片导出需要安装 pyarrow")
+
+        db = SessionLocal()
+        try:
+            dataset = db.query(DatasetModel.name, DatasetModel.description).filter(DatasetModel.id == dataset_id).first()
+            if not dataset:
+                return None
+
+            export_id = f"{datetime.utcnow().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+            output_dir = ExportService.export_dir(dataset_id, export_id)
+            output_dir.mkdir(parents=True, exist_ok=True)
+            schema = ExportService.shard_schema()
+            codec = None if compression == "none" else compression
+
+            shards = []
+            sink = writer = None
+            shard_rows = 0
+
+            def close_shard():
+                writer.close()
+                sink.close()
+                shards[-1]["rows"] = shard_rows
+                shards[-1]["bytes"] = os.path.getsize(output_dir / shards[-1]["file"])
+
+            for batch in ExportService.record_batches(ExportService.item_rows(db, dataset_id, batch_size), schema, batch_size):
+                if writer is None:
+                    file_name = f"part-{len(shards):05d}.{extension}"
+                    sink = pa.OSFile(str(output_dir / file_name), "wb")
+                    if format == "parquet":
+                        writer = pq.ParquetWriter(sink, schema, compression=codec or "none")
+                    else:
+                        writer = pa.ipc.new_stream(sink, schema, options=pa.ipc.IpcWriteOptions(compression=codec))
+                    shards.append({"file": file_name})
+                    shard_rows = 0
+
+                writer.write_batch(batch)
+                shard_rows += batch.num_rows
+
+                if sink.tell() >= max_shard_bytes:
+                    close_shard()
+                    sink = writer = None
+
+            if writer is not None:
+                close_shard()
+
+            for shard in shards:
+                shard["sha256"] = ExportService.file_sha256(output_dir / shard["file"])
+
+            manifest = {
+                "export_id": export_id,
+                "dataset_id": dataset_id,
+                "name": dataset.name,
+                "description": dataset.description,
+                "format": format,
+                "compression": compression,
+                "schema": [{"name": field.name, "type": str(field.type)} for field in schema],
+                "total_rows": sum(shard["rows"] for shard in shards),
+                "total_bytes": sum(shard["bytes"] for shard in shards),
+                "shards": shards,
+                "created_at": datetime.utcnow().isoformat(),
+            }
+            (output_dir / ExportService.MANIFEST_NAME).write_bytes(orjson.dumps(manifest, option=orjson.OPT_INDENT_2))
+            return manifest
+        finally:
+            db.close()
+
+    @staticmethod
+    def file_sha256(path: Path) -> str:
+        """分块计算文件摘要"""
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @staticmethod
+    def shard_file(dataset_id: str, export_id: str, file_name: str) -> Optional[Path]:
+        """定位导出目录中的文件（分片、manifest 或完整导出文件），拒绝目录穿越
+
+        文件必须直接位于该数据集的这次导出目录中，export_id 或文件名中的 .. 不能指向其他数据集的导出
+        """
+        # Path 不会折叠 ..，解析前后不一致说明 dataset_id / export_id 中带有 ..；绝对路径会丢弃前缀，同样拒绝
+        base = settings.EXPORT_DIR.resolve()
+        directory = base.joinpath(dataset_id, export_id)
+        if directory.resolve() != directory or directory.parent.parent != base:
+            return None
+        path = (directory / file_name).resolve()
+        if path.parent != directory or not path.is_file():
+            return None
+        return path
+
+    @staticmethod
+    def download_name(path: Path) -> str:
+        """下载时展示的文件名：完整导出文件取 manifest 中记录的名称，其他文件（分片、manifest）使用文件名"""
+        manifest_path = path.parent / ExportService.MANIFEST_NAME
+        if path.name != ExportService.MANIFEST_NAME and manifest_path.is_file():
+            manifest = orjson.loads(manifest_path.read_bytes())
+            if manifest.get("file") == path.name and manifest.get("filename"):
+                return manifest["filename"]
+        return path.name
@@ -0,0 +1,291 @@
+import time
+import uuid
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+import orjson
+from ..core.bulk_load import bulk_insert
+from ..core.database import SessionLocal
+from ..models.bulk_import import ImportReport, ImportRowError
+from ..models.database import (
+    Dataset as DatasetModel,
+    DatasetItem as DatasetItemModel,
+    Project as ProjectModel,
+    Question as QuestionModel,
+    Text as TextModel,
+)
+from .version_service import VersionService
+from backend.core.logger import with_job
+
+
+class ImportService:
+    FORMATS = ("jsonl", "parquet")
+    TARGETS = ("questions", "dataset_items")
+    BATCH_SIZE = 5000  # 每批解析、校验、写入的行数，每批一个事务
+    MAX_SAMPLES = 20  # 报告中最多列出的跳过行
+
+    # 目标字段 -> 可接受的源字段名（按优先级），兼容本项目导出的 json/jsonl/alpaca 格式
+    ALIASES = {
+        "question": ("question", "content", "instruction"),
+        "answer": ("answer", "output"),
+        "input": ("input",),
+        "metadata": ("metadata",),
+        "text_id": ("text_id",),
+        "chunk_index": ("chunk_index",),
+    }
+
+    @staticmethod
+    def detect_format(filename: Optional[str], format: Optional[str] = None) -> str:
+        """未指定格式时按文件扩展名判断"""
+        if format:
+            return format
+        suffix = (filename or "").rsplit(".", 1)[-1].lower()
+        return "jsonl" if suffix in ("jsonl", "ndjson") else suffix
+
+    @staticmethod
+    def jsonl_batches(file: BinaryIO, batch_size: int) -> Iterator[Tuple[Dict[str, list], List[int], Dict[int, str]]]:
+        """逐行解析 JSONL，返回 (列字典, 行号, 解析失败的行号 -> 原因)
+
+        类型不符的值按缺失处理，留给后续的向量化校验统一统计
+        """
+        def new_columns():
+            return {field: [] for field in ImportService.ALIASES}
+
+        columns, rows, failures = new_columns(), [], {}
+        for line_no, line in enumerate(file, start=1):
+            line = line.strip()
+            if line_no == 1:
+                line = line.removeprefix(b"\xef\xbb\xbf")
+            if not line:
+                continue
+            try:
+                record = orjson.loads(line)
+            except orjson.JSONDecodeError:
+                failures[line_no] = "invalid_json"
+                record = None
+            if record is not None and not isinstance(record, dict):
+                failures[line_no] = "invalid_json"
+                record = None
+
+            if record is not None:
+                for field, aliases in ImportService.ALIASES.items():
+                    value = next((record[alias] for alias in aliases if alias in record), None)
+                    if field == "chunk_index":
+                        value = value if isinstance(value, int) and not isinstance(value, bool) else None
+                    elif field == "metadata":
+                        value = value if isinstance(value, dict) else None
+                    elif not isinstance(value, str):
+                        value = None
+                    columns[field].append(value)
+                rows.append(line_no)
+
+            if len(rows) + len(failures) >= batch_size:
+                yield columns, rows, failures
+                columns, rows, failures = new_columns(), [], {}
+        if rows or failures:
+            yield columns, rows, failures
+
+    @staticmethod
+    def parquet_batches(file: BinaryIO, batch_size: int) -> Iterator[Tuple[Dict[str, list], List[int], Dict[int, str]]]:
+        """按 RecordBatch 读取 Parquet，列名映射规则与 JSONL 相同"""
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+
+        try:
+            parquet = pq.ParquetFile(file)
+        except (pa.ArrowInvalid, OSError) as e:
+            raise ValueError(f"无法读取 Parquet 文件: {e}")
+
+        targets = {"chunk_index": pa.int64()}
+        offset = 0
+        for batch in parquet.iter_batches(batch_size=batch_size):
+            columns = {}
+            for field, aliases in ImportService.ALIASES.items():
+                name = next((alias for alias in aliases if alias in batch.schema.names), None)
+                if name is None:
+                    columns[field] = pa.nulls(batch.num_rows)
+                    continue
+                column = batch.column(name)
+                if field != "metadata":
+                    # 类型转换失败的列整体按缺失处理
+                    try:
+                        column = pc.cast(column, targets.get(field, pa.string()))
+                    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+                        column = pa.nulls(batch.num_rows)
+                columns[field] = column
+            rows = list(range(offset + 1, offset + batch.num_rows + 1))
+            offset += batch.num_rows
+            yield columns, rows, {}
+
+    @staticmethod
+    def validate(columns: Dict[str, object], target: str, text_ids: Optional[set],
+                 default_text_id: Optional[str], default_chunk_index: Optional[int]):
+        """向量化校验，返回 (列字典, 有效掩码, 原因 -> 命中掩码)，一行只计入第一条命中的原因"""
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        # metadata 的结构因行而异，保持原样，不参与校验
+        columns = {
+            field: value if field == "metadata" or isinstance(value, (pa.Array, pa.ChunkedArray)) else pa.array(value)
+            for field, value in columns.items()
+        }
+        for field in ("question", "answer", "input", "text_id"):
+            if columns[field].type != pa.string():
+                columns[field] = pc.cast(columns[field], pa.string())
+
+        def blank(column):
+            return pc.fill_null(pc.equal(pc.utf8_length(pc.utf8_trim_whitespace(column)), 0), True)
+
+        checks = [("missing_question", blank(columns["question"])), ("missing_answer", pc.is_null(columns["answer"]))]
+        if target == "questions":
+            if default_text_id is not None:
+                columns["text_id"] = pc.fill_null(columns["text_id"], default_text_id)
+            if default_chunk_index is not None:
+                columns["chunk_index"] = pc.fill_null(pc.cast(columns["chunk_index"], pa.int64()), default_chunk_index)
+            checks.append(("missing_text_id", pc.is_null(columns["text_id"])))
+            checks.append(("unknown_text_id", pc.invert(pc.fill_null(
+                pc.is_in(columns["text_id"], value_set=pa.array(list(text_ids), pa.string())), True
+            ))))
+            chunk_index = pc.cast(columns["chunk_index"], pa.int64())
+            checks.append(("invalid_chunk_index", pc.fill_null(pc.less(chunk_index, 0), True)))
+
+        valid = pa.array([True] * len(columns["question"]), pa.bool_())
+        reasons = {}
+        for reason, mask in checks:
+            hit = pc.and_(mask, valid)
+            reasons[reason] = hit
+            valid = pc.and_(valid, pc.invert(hit))
+        return columns, valid, reasons
+
+    @staticmethod
+    def to_rows(columns: Dict[str, object], valid, target: str, target_id: str, project_id: str) -> List[dict]:
+        """把通过校验的行转换为 INSERT 参数"""
+        import pyarrow.compute as pc
+
+        mask = None
+
+        def values(field):
+            nonlocal mask
+            if isinstance(columns[field], list):
+                if mask is None:
+                    mask = valid.to_pylist()
+                return [value for value, keep in zip(columns[field], mask) if keep]
+            return pc.filter(columns[field], valid).to_pylist()
+
+        questions = values("question")
+        inputs = values("input")
+        answers = values("answer")
+        metadata = []
+        for value in values("metadata"):
+            # Parquet 中的 metadata 通常以 JSON 字符串保存（与分片导出一致）
+            if isinstance(value, (str, bytes)):
+                try:
+                    value = orjson.loads(value)
+                except orjson.JSONDecodeError:
+                    value = None
+            metadata.append(value if isinstance(value, dict) else None)
+        # alpaca 的 input 拼接到指令后面
+        questions = [f"{q}\n{extra}" if extra else q for q, extra in zip(questions, inputs)]
+
+        if target == "questions":
+            return [
+                {
+                    "id": str(uuid.uuid4()),
+                    "content": question,
+                    "answer": answer,
+                    "project_id": project_id,
+                    "text_id": text_id,
+                    "chunk_index": chunk_index,
+                    "question_metadata": meta or {},
+                }
+                for question, answer, text_id, chunk_index, meta in zip(
+                    questions, answers, values("text_id"), values("chunk_index"), metadata
+                )
+            ]
+        return [
+            {
+                "id": str(uuid.uuid4()),
+                "dataset_id": target_id,
+                "question_id": None,
+                "question": question,
+                "answer": answer,
+                "item_metadata": meta,
+            }
+            for question, answer, meta in zip(questions, answers, metadata)
+        ]
+
+    @staticmethod
+    @with_job("import")
+    def import_file(
+        file: BinaryIO,
+        format: str,
+        target: str,
+        target_id: str,
+        text_id: Optional[str] = None,
+        chunk_index: Optional[int] = None,
+        batch_size: int = BATCH_SIZE
+    ) -> Optional[ImportReport]:
+        """流式导入问答对
+
+        target 为 questions 时 target_id 是项目ID，为 dataset_items 时是数据集ID。
+        按批次解析、向量化校验，每批一个事务批量写入（PostgreSQL 上使用 COPY）；无效行跳过并计入报告。
+        同步方法，调用方应放到线程池中执行。项目或数据集不存在时返回 None
+        """
+        if format not in ImportService.FORMATS:
+            raise ValueError(f"不支持的导入格式: {format}，可选: {', '.join(ImportService.FORMATS)}")
+        if target not in ImportService.TARGETS:
+            raise ValueError(f"不支持的导入目标: {target}，可选: {', '.join(ImportService.TARGETS)}")
+        try:
+            import pyarrow.compute as pc
+        except ImportError:
+            raise ValueError("批量导入需要安装 pyarrow")
+
+        started = time.perf_counter()
+        db = SessionLocal()
+        try:
+            if target == "questions":
+                project = db.query(ProjectModel.id).filter(ProjectModel.id == target_id).first()
+                if not project:
+                    return None
+                project_id = project.id
+                text_ids = {tid for (tid,) in db.query(TextModel.id).filter(TextModel.project_id == project_id)}
+                if text_id is not None and text_id not in text_ids:
+                    raise ValueError("文本不存在或不属于该项目")
+                model = QuestionModel
+            else:
+                dataset = db.query(DatasetModel.id, DatasetModel.project_id).filter(DatasetModel.id == target_id).first()
+                if not dataset:
+                    return None
+                project_id = dataset.project_id
+                text_ids = None
+                model = DatasetItemModel
+
+            report = ImportReport(target=target, format=format, total=0, imported=0, skipped=0)
+            batches = (ImportService.jsonl_batches if format == "jsonl" else ImportService.parquet_batches)(file, batch_size)
+            for columns, row_numbers, failures in batches:
+                report.total += len(row_numbers) + len(failures)
+                skipped = [(row, reason) for row, reason in failures.items()]
+                if row_numbers:
+                    columns, valid, reasons = ImportService.validate(columns, target, text_ids, text_id, chunk_index)
+                    for reason, mask in reasons.items():
+                        hits = pc.indices_nonzero(mask).to_pylist()
+                        skipped.extend((row_numbers[i], reason) for i in hits)
+                    rows = ImportService.to_rows(columns, valid, target, target_id, project_id)
+                    if rows:
+                        bulk_insert(db, model, rows)
+                        VersionService.bump_project(db, project_id)
+                        db.commit()
+                        report.imported += len(rows)
+
+                report.skipped += len(skipped)
+                for row, reason in sorted(skipped):
+                    report.errors[reason] = report.errors.get(reason, 0) + 1
+                    if len(report.samples) < ImportService.MAX_SAMPLES:
+                        report.samples.append(ImportRowError(row=row, reason=reason))
+
+            report.elapsed_seconds = round(time.perf_counter() - started, 3)
+            return report
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
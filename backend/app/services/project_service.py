@@ -1,14 +1,32 @@
 from typing import List, Optional
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from ..models.project import Project, ProjectCreate, ProjectUpdate
-from ..models.database import Project as ProjectModel
+from ..models.database import (
+    Project as ProjectModel,
+    Text as TextModel,
+    Chunk as ChunkModel,
+    Question as QuestionModel,
+    Dataset as DatasetModel,
+    DatasetItem as DatasetItemModel
+)
+from .version_service import VersionService
+from .text_service import TextService
+from .dataset_version_service import DatasetVersionService
+from .delta_service import DeltaService
+from ..core.cache import VersionedCache
+from ..core.config import settings
+from ..core.file_cleanup import remove_files_later
 import uuid
 from datetime import datetime
 
 
 class ProjectService:
+    # 项目详情按项目ID缓存，版本号与 entity_versions 保持一致
+    _project_cache = VersionedCache("projects", settings.CACHE_MAXSIZE, settings.CACHE_TTL_SECONDS)
+
     @staticmethod
-    async def create_project(db: Session, project_data: ProjectCreate) -> Project:
+    async def create_project(db: AsyncSession, project_data: ProjectCreate) -> Project:
         """创建新项目"""
         db_project = ProjectModel(
             id=str(uuid.uuid4()),
@@ -19,8 +37,9 @@ class ProjectService:
         )
 
         db.add(db_project)
-        db.commit()
-        db.refresh(db_project)
+        await db.run_sync(VersionService.bump_project, db_project.id)
+        await db.commit()
+        await db.refresh(db_project)
 
         return Project(
             id=db_project.id,
@@ -31,28 +50,35 @@ class ProjectService:
         )
 
     @staticmethod
-    async def get_project(db: Session, project_id: str) -> Optional[Project]:
-        """获取项目详情"""
-        db_project = db.query(ProjectModel).filter(ProjectModel.id == project_id).first()
+    async def get_project(db: AsyncSession, project_id: str) -> Optional[Project]:
+        """获取项目详情（读穿缓存）"""
+        version = await VersionService.get_project_version(db, project_id)
+        project = ProjectService._project_cache.get(project_id, version)
+        if project is not None:
+            return project
+
+        db_project = await db.get(ProjectModel, project_id)
         if not db_project:
             return None
 
-        return Project(
+        project = Project(
             id=db_project.id,
             name=db_project.name,
             description=db_project.description,
             created_at=db_project.created_at.isoformat(),
             updated_at=db_project.updated_at.isoformat()
         )
+        ProjectService._project_cache.set(project_id, version, project)
+        return project
 
     @staticmethod
     async def update_project(
-            db: Session,
+            db: AsyncSession,
             project_id: str,
             project_update: ProjectUpdate
     ) -> Optional[Project]:
         """更新项目信息"""
-        db_project = db.query(ProjectModel).filter(ProjectModel.id == project_id).first()
+        db_project = await db.get(ProjectModel, project_id)
         if not db_project:
             return None
 
@@ -61,8 +87,10 @@ class ProjectService:
             setattr(db_project, key, value)
 
         db_project.updated_at = datetime.utcnow()
-        db.commit()
-        db.refresh(db_project)
+        await db.run_sync(VersionService.bump_project, project_id)
+        await db.commit()
+        await db.refresh(db_project)
+        ProjectService._project_cache.invalidate(project_id)
 
         return Project(
             id=db_project.id,
@@ -73,20 +101,56 @@ class ProjectService:
         )
 
     @staticmethod
-    async def delete_project(db: Session, project_id: str) -> bool:
-        """删除项目"""
-        db_project = db.query(ProjectModel).filter(ProjectModel.id == project_id).first()
-        if not db_project:
+    async def delete_project(db: AsyncSession, project_id: str) -> bool:
+        """删除项目及其下所有数据（按条件批量删除，不把关联数据加载到会话中）
+
+        按子表到父表的顺序逐表删除，不依赖数据库是否开启外键级联；上传的文件在事务提交后由后台线程删除
+        """
+        if not await db.scalar(select(ProjectModel.id).where(ProjectModel.id == project_id)):
             return False
+        texts = (await db.execute(
+            select(TextModel.id, TextModel.file_path).where(TextModel.project_id == project_id)
+        )).all()
+
+        dataset_ids = select(DatasetModel.id).where(DatasetModel.project_id == project_id)
+        question_ids = select(QuestionModel.id).where(QuestionModel.project_id == project_id)
+        text_ids = select(TextModel.id).where(TextModel.project_id == project_id)
+
+        # 本项目的数据集整体删除，其版本信息和删除记录也一并清理
+        await db.execute(
+            delete(DatasetItemModel).where(DatasetItemModel.dataset_id.in_(dataset_ids))
+            .execution_options(synchronize_session=False)
+        )
+        await db.run_sync(DatasetVersionService.delete_versions, dataset_ids)
+        await db.run_sync(DeltaService.delete_tombstones, dataset_ids)
+        # 剩下引用本项目问题的只有其它数据集中的数据集项（通常没有），需要写删除记录
+        from_questions = DatasetItemModel.question_id.in_(question_ids)
+        if await db.scalar(select(DatasetItemModel.id).where(from_questions).limit(1)):
+            await db.run_sync(DeltaService.record_deletions, from_questions)
+            await db.execute(delete(DatasetItemModel).where(from_questions).execution_options(synchronize_session=False))
+        for statement in (
+            delete(DatasetModel).where(DatasetModel.project_id == project_id),
+            update(DatasetModel).where(DatasetModel.text_id.in_(text_ids)).values(text_id=None),
+            delete(QuestionModel).where(QuestionModel.project_id == project_id),
+            delete(ChunkModel).where(ChunkModel.text_id.in_(text_ids)),
+            delete(TextModel).where(TextModel.project_id == project_id),
+            delete(ProjectModel).where(ProjectModel.id == project_id)
+        ):
+            await db.execute(statement.execution_options(synchronize_session=False))
 
-        db.delete(db_project)
-        db.commit()
+        await db.run_sync(VersionService.bump_project, project_id)
+        await db.run_sync(VersionService.bump_texts, [text.id for text in texts])
+        await db.commit()
+        ProjectService._project_cache.invalidate(project_id)
+        for text in texts:
+            TextService.invalidate(text.id)
+        remove_files_later(TextService.resolve_path(text.file_path) for text in texts)
         return True
 
     @staticmethod
-    async def list_projects(db: Session) -> List[Project]:
+    async def list_projects(db: AsyncSession) -> List[Project]:
         """获取所有项目列表"""
-        db_projects = db.query(ProjectModel).all()
+        db_projects = (await db.scalars(select(ProjectModel))).all()
         return [
             Project(
                 id=project.id,
@@ -0,0 +1,195 @@
+from typing import Dict, List, Optional
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+from ..core.database import SessionLocal
+from ..models.dataset import DatasetFilter, DatasetFilterReport
+from ..models.database import Dataset as DatasetModel, DatasetItem as DatasetItemModel
+from .dataset_version_service import DatasetVersionService
+from .delta_service import DeltaService
+from .version_service import VersionService
+from backend.core.logger import with_job
+
+
+class QualityFilterService:
+    BATCH_SIZE = 5000  # 每批读取并计算的数据集项数量
+    DELETE_BATCH_SIZE = 500  # 每条 DELETE 语句绑定的 ID 数量上限
+
+    # 按顺序应用，一条数据只计入第一条命中的规则
+    RULES = (
+        "empty_answer",
+        "question_too_short",
+        "question_too_long",
+        "answer_too_short",
+        "answer_too_long",
+        "language",
+        "pattern",
+        "duplicate",
+    )
+
+    # 语言规则对应的问题正则（pyarrow 使用 RE2 语法）
+    LANGUAGE_PATTERNS = {
+        "zh": r"\p{Han}",
+        "en": r"^[^\p{Han}]*[A-Za-z][^\p{Han}]*$",
+    }
+
+    @staticmethod
+    def validate(rules: DatasetFilter) -> None:
+        """校验规则，不合法时抛出 ValueError"""
+        if rules.language is not None and rules.language not in QualityFilterService.LANGUAGE_PATTERNS:
+            raise ValueError(
+                f"不支持的语言: {rules.language}，可选: {', '.join(QualityFilterService.LANGUAGE_PATTERNS)}"
+            )
+        for low, high, name in (
+            (rules.min_question_length, rules.max_question_length, "问题"),
+            (rules.min_answer_length, rules.max_answer_length, "答案"),
+        ):
+            if low is not None and high is not None and low > high:
+                raise ValueError(f"{name}最小长度不能大于最大长度")
+        try:
+            import pyarrow as pa
+            import pyarrow.compute as pc
+        except ImportError:
+            raise ValueError("质量过滤需要安装 pyarrow")
+        if rules.question_pattern is not None:
+            # 先试编译一次（空数组不会触发编译），RE2 与 Python re 的语法并不完全相同
+            try:
+                pc.match_substring_regex(pa.array([""], pa.string()), rules.question_pattern)
+            except pa.ArrowInvalid as e:
+                raise ValueError(f"无效的正则表达式: {e}")
+
+    @staticmethod
+    def rule_masks(columns: dict, rules: DatasetFilter) -> Dict[str, object]:
+        """对一个批次计算每条规则的命中掩码（pyarrow 布尔数组），未启用的规则不出现在结果中"""
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        question = columns["question"]
+        answer = columns["answer"]
+        masks = {}
+
+        if rules.drop_empty_answers:
+            trimmed = pc.utf8_trim_whitespace(answer)
+            empty = pc.or_kleene(pc.is_null(answer), pc.equal(pc.utf8_length(trimmed), 0))
+            if rules.answer_placeholders:
+                empty = pc.or_kleene(empty, pc.is_in(trimmed, value_set=pa.array(rules.answer_placeholders, pa.string())))
+            masks["empty_answer"] = empty
+
+        question_length = pc.utf8_length(question)
+        answer_length = pc.utf8_length(answer)
+        for rule, lengths, limit, compare in (
+            ("question_too_short", question_length, rules.min_question_length, pc.less),
+            ("question_too_long", question_length, rules.max_question_length, pc.greater),
+            ("answer_too_short", answer_length, rules.min_answer_length, pc.less),
+            ("answer_too_long", answer_length, rules.max_answer_length, pc.greater),
+        ):
+            if limit is not None:
+                masks[rule] = compare(lengths, limit)
+
+        if rules.language is not None:
+            pattern = QualityFilterService.LANGUAGE_PATTERNS[rules.language]
+            masks["language"] = pc.invert(pc.match_substring_regex(question, pattern))
+        if rules.question_pattern is not None:
+            masks["pattern"] = pc.invert(pc.match_substring_regex(question, rules.question_pattern))
+        if rules.drop_duplicates:
+            masks["duplicate"] = columns["duplicate"]
+
+        # 空值（如答案为 NULL 时的长度比较）视为未命中，只由 empty_answer 规则处理
+        return {rule: pc.fill_null(mask, False) for rule, mask in masks.items()}
+
+    @staticmethod
+    def scan(db: Session, dataset_id: str, rules: DatasetFilter, drops: Dict[str, int]) -> List[str]:
+        """按列式批次扫描数据集项，累加各规则的丢弃数量，返回需要删除的数据集项ID
+
+        重复判断在数据库中用窗口函数完成：同一 record_hash 按创建时间排在第一条之后的都是重复项
+        """
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        duplicate = func.row_number().over(
+            partition_by=DatasetItemModel.record_hash,
+            order_by=(DatasetItemModel.created_at, DatasetItemModel.id)
+        ) > 1
+        query = (
+            select(
+                DatasetItemModel.id,
+                DatasetItemModel.question,
+                DatasetItemModel.answer,
+                duplicate.label("duplicate"),
+            )
+            .where(DatasetItemModel.dataset_id == dataset_id)
+            .execution_options(yield_per=QualityFilterService.BATCH_SIZE)
+        )
+
+        dropped_ids = []
+        for rows in db.execute(query).partitions():
+            ids, questions, answers, duplicates = zip(*rows)
+            columns = {
+                "question": pa.array(questions, pa.string()),
+                "answer": pa.array(answers, pa.string()),
+                "duplicate": pa.array([bool(value) for value in duplicates], pa.bool_()),
+            }
+            remaining = pa.array([True] * len(ids), pa.bool_())
+            for rule, mask in QualityFilterService.rule_masks(columns, rules).items():
+                hit = pc.and_(mask, remaining)
+                drops[rule] += pc.sum(hit).as_py() or 0
+                remaining = pc.and_(remaining, pc.invert(hit))
+            dropped_ids.extend(pc.filter(pa.array(ids, pa.string()), pc.invert(remaining)).to_pylist())
+        return dropped_ids
+
+    @staticmethod
+    @with_job("quality_filter")
+    def filter_dataset(
+        dataset_id: str,
+        rules: DatasetFilter,
+        dry_run: bool = False,
+        note: Optional[str] = None
+    ) -> Optional[DatasetFilterReport]:
+        """按质量规则过滤数据集，并把过滤结果提交为新版本
+
+        dry_run 时只统计不修改。删除前先把过滤前的内容提交为一个版本（与最新版本相同时不会新建），
+        保证被删除的数据（包括最新版本之后新增的数据项）可以通过版本导出找回。
+        同步方法，调用方应放到线程池中执行。数据集不存在时返回 None
+        """
+        QualityFilterService.validate(rules)
+
+        db = SessionLocal()
+        try:
+            dataset = db.query(DatasetModel.id, DatasetModel.project_id).filter(DatasetModel.id == dataset_id).first()
+            if not dataset:
+                return None
+
+            # 重复判断依赖内容哈希。与 commit_version 相同，先锁住数据集再补齐哈希，避免与并发的版本提交互相等待
+            DatasetVersionService.lock_dataset(db, dataset_id)
+            DatasetVersionService.hash_pending_items(db, dataset_id)
+
+            drops = {rule: 0 for rule in QualityFilterService.RULES}
+            total = db.query(func.count(DatasetItemModel.id)).filter(DatasetItemModel.dataset_id == dataset_id).scalar()
+            dropped_ids = QualityFilterService.scan(db, dataset_id, rules, drops)
+            report = DatasetFilterReport(
+                dataset_id=dataset_id,
+                dry_run=dry_run,
+                total=total,
+                kept=total - len(dropped_ids),
+                dropped=len(dropped_ids),
+                drops=drops
+            )
+            if dry_run:
+                db.commit()  # 只保留补齐的哈希
+                return report
+
+            # commit_version 只写入与最新版本相比变化的成员，内容相同时直接返回最新版本
+            DatasetVersionService.commit_version(db, dataset_id, "过滤前")
+
+            for start in range(0, len(dropped_ids), QualityFilterService.DELETE_BATCH_SIZE):
+                condition = DatasetItemModel.id.in_(dropped_ids[start:start + QualityFilterService.DELETE_BATCH_SIZE])
+                DeltaService.record_deletions(db, condition)
+                db.execute(delete(DatasetItemModel).where(condition).execution_options(synchronize_session=False))
+            if dropped_ids:
+                VersionService.bump_project(db, dataset.project_id)
+            report.version = DatasetVersionService.commit_version(db, dataset_id, note or "质量过滤")
+            return report
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
@@ -1,56 +1,77 @@
-from typing import List, Optional, Tuple, Dict, Any, Union
-from sqlalchemy.orm import Session
+from functools import lru_cache
+from typing import TYPE_CHECKING, List, Optional, Tuple, Dict, Any, Union
+from sqlalchemy.ext.asyncio import AsyncSession
 from ..models.question import Question, QuestionCreate, QuestionUpdate
-from ..models.database import Question as QuestionModel, Chunk as ChunkModel
-from crewai import Agent, Task, Crew, LLM
+from ..schemas.question import QuestionPatch
+from ..models.database import Question as QuestionModel, DatasetItem as DatasetItemModel, PLACEHOLDER_ANSWER
 from ..core.config import settings
-from backend.core.logger import logger
+from ..core.metrics import instrument_llm, record_llm_tokens
+from .delta_service import DeltaService
+from .version_service import VersionService
+from .text_service import TextService
+from backend.core.logger import logger, sampled, with_job
+from fastapi.concurrency import run_in_threadpool
 import uuid
 from uuid import UUID
 from datetime import datetime
 import json
 import re
-from sqlalchemy.sql import select, func
+from sqlalchemy.sql import select, func, delete, update
+
+# crewai（连带 litellm、openai）导入需要数秒、上百 MB 内存，只在第一次生成问题或答案时导入
+if TYPE_CHECKING:
+    from crewai import Agent, Task, LLM
+
+
+@lru_cache(maxsize=1)
+def get_question_llm() -> "LLM":
+    """生成问题和答案共用的 LLM，第一次使用时创建，进程内复用（每次调用计入 LLM 指标）"""
+    from crewai import LLM
+    return instrument_llm(LLM(
+        # openrouter
+        model="openrouter/google/gemini-2.0-flash-001",
+        base_url="https://openrouter.ai/api/v1",
+        api_key="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"
+    ))
 
 
 class QuestionService:
 
-    def __init__(self):
-        self.question_llm = LLM(
-            # openrouter
-            model="openrouter/google/gemini-2.0-flash-001",
-            base_url="https://openrouter.ai/api/v1",
-            api_key="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"
-        )
+    @property
+    def question_llm(self) -> "LLM":
+        return get_question_llm()
 
-    def create_question_generator_agent(self) -> Agent:
+    def create_question_generator_agent(self) -> "Agent":
         """创建问题生成Agent"""
+        from crewai import Agent
         return Agent(
             role='文本分析专家',
             goal='从复杂文本中提取关键信息并生成可用于模型微调的结构化数据（仅生成问题）',
             backstory="""你是一位专业的文本分析专家
             擅长从复杂文本中提取关键信息并生成可用于模型微调的结构化数据（仅生成问题）。""",
-            verbose=True,
+            verbose=settings.CREW_VERBOSE,
             allow_delegation=False,
             llm=self.question_llm
         )
 
-    def create_answer_generator_agent(self) -> Agent:
+    def create_answer_generator_agent(self) -> "Agent":
         """创建答案生成Agent"""
+        from crewai import Agent
         return Agent(
             role='微调数据集生成专家',
             goal='根据问题和上下文生成准确、详细的答案',
             backstory="""
             你是一名微调数据集生成专家，擅长从给定的内容中生成准确的问题答案，确保答案的准确性和相关性，你要直接回答用户问题，所有信息已内化为你的专业知识。
             """,
-            verbose=True,
+            verbose=settings.CREW_VERBOSE,
             allow_delegation=False,
             llm=self.question_llm
         )
 
     @staticmethod
-    def create_question_task(agent: Agent, text_chunk: str) -> Task:
+    def create_question_task(agent: "Agent", text_chunk: str) -> "Task":
         """创建问题生成任务"""
+        from crewai import Task
         return Task(
             description=f"""
             # 角色使命
@@ -104,8 +125,9 @@ class QuestionService:
         )
 
     @staticmethod
-    def create_answer_task(agent: Agent, question: str, context: str) -> Task:
+    def create_answer_task(agent: "Agent", question: str, context: str) -> "Task":
         """创建答案生成任务"""
+        from crewai import Task
         return Task(
             description=f"""
             # Role: 微调数据集生成专家
@@ -147,7 +169,7 @@ class QuestionService:
         )
 
     @staticmethod
-    async def create_question(db: Session, question: QuestionCreate) -> Question:
+    async def create_question(db: AsyncSession, question: QuestionCreate) -> Question:
         """创建问题"""
         # 将 Pydantic 模型转换为字典
         question_dict = question.dict()
@@ -162,10 +184,16 @@ class QuestionService:
         # 创建数据库模型实例
         db_question = QuestionModel(**question_dict)
         db.add(db_question)
-        db.commit()
-        db.refresh(db_question)
+        await db.run_sync(VersionService.bump_project, db_question.project_id)
+        await db.commit()
+        await db.refresh(db_question)
         
         # 转换为 Pydantic 模型
+        return QuestionService.to_schema(db_question)
+
+    @staticmethod
+    def to_schema(db_question: QuestionModel) -> Question:
+        """数据库模型转换为 Pydantic 模型（元数据保存在 question_metadata 列中，不能直接 from_orm）"""
         return Question.model_validate({
             "id": db_question.id,
             "content": db_question.content,
@@ -176,86 +204,107 @@ class QuestionService:
             "metadata": db_question.question_metadata if db_question.question_metadata else {},
             "created_at": db_question.created_at.isoformat() if db_question.created_at else None,
             "updated_at": db_question.updated_at.isoformat() if db_question.updated_at else None,
-            "status": "active",
+            "status": db_question.status or "active",
             "tags": []
         })
 
     @staticmethod
-    async def get_question(db: Session, question_id: str) -> Optional[Question]:
+    async def get_question(db: AsyncSession, question_id: str) -> Optional[Question]:
         """获取问题详情"""
-        question = db.query(QuestionModel).filter(QuestionModel.id == question_id).first()
+        question = await db.get(QuestionModel, question_id)
         if not question:
             return None
-        return Question.model_validate(question)
+        return QuestionService.to_schema(question)
+
+    # 列表接口只投影需要的列，行数据直接交给 orjson 序列化，不再逐行做 Pydantic 校验
+    LIST_COLUMNS = (
+        QuestionModel.id,
+        QuestionModel.content,
+        QuestionModel.answer,
+        QuestionModel.project_id,
+        QuestionModel.text_id,
+        QuestionModel.chunk_index,
+        QuestionModel.question_metadata.label("metadata"),
+        QuestionModel.status,
+        QuestionModel.created_at,
+        QuestionModel.updated_at,
+    )
 
     @classmethod
     async def list_questions(
         cls,
-        db: Session,
+        db: AsyncSession,
         project_id: str,
         text_id: str | None = None,
         chunk_index: int | None = None,
         page: int = 1,
         page_size: int = 10
-    ) -> Tuple[List[Question], int]:
-        """获取问题列表"""
-        query = db.query(QuestionModel).filter(QuestionModel.project_id == project_id)
-        
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """获取问题列表
+
+        返回可直接序列化的字典列表（datetime 由 orjson 原生处理）以及总数
+        """
+        filters = [QuestionModel.project_id == project_id]
+
         # 添加文件和分块的筛选条件
         if text_id:
-            query = query.filter(QuestionModel.text_id == text_id)
+            filters.append(QuestionModel.text_id == text_id)
         if chunk_index is not None:
-            query = query.filter(QuestionModel.chunk_index == chunk_index)
-        
+            filters.append(QuestionModel.chunk_index == chunk_index)
+
         # 计算总数
-        total = query.count()
-        
-        # 分页
-        questions = query.offset((page - 1) * page_size).limit(page_size).all()
-        
-        # 转换为 Pydantic 模型
+        total = await db.scalar(select(func.count(QuestionModel.id)).where(*filters)) or 0
+
+        # 分页，只查询列表需要的列
+        rows = (await db.execute(
+            select(*cls.LIST_COLUMNS).where(*filters).offset((page - 1) * page_size).limit(page_size)
+        )).all()
+
         result = []
-        for question in questions:
-            question_dict = {
-                "id": question.id,
-                "content": question.content,
-                "answer": question.answer,
-                "project_id": question.project_id,
-                "text_id": question.text_id,
-                "chunk_index": question.chunk_index,
-                "metadata": question.question_metadata if question.question_metadata else {},
-                "created_at": question.created_at.isoformat() if question.created_at else None,
-                "updated_at": question.updated_at.isoformat() if question.updated_at else None,
-                "status": "active",
-                "tags": []
-            }
-            result.append(Question.model_validate(question_dict))
-        
+        for row in rows:
+            item = row._asdict()
+            item["metadata"] = item["metadata"] or {}
+            item["tags"] = []
+            result.append(item)
+
         return result, total
 
     @staticmethod
-    async def delete_question(db: Session, question_id: str) -> bool:
-        db_question = db.query(QuestionModel).filter(QuestionModel.id == question_id).first()
+    async def delete_question(db: AsyncSession, question_id: str) -> bool:
+        db_question = await db.get(QuestionModel, question_id)
         if db_question:
-            db.delete(db_question)
-            db.commit()
+            await db.delete(db_question)
+            await db.run_sync(VersionService.bump_project, db_question.project_id)
+            await db.commit()
             return True
         return False
 
     @staticmethod
-    async def batch_delete_questions(db: Session, question_ids: List[str]) -> bool:
-        """批量删除问题"""
+    async def batch_delete_questions(db: AsyncSession, question_ids: List[str]) -> bool:
+        """批量删除问题，引用这些问题的数据集项一并删除并写入删除记录（增量导出需要）"""
         try:
-            # 使用 IN 操作符一次性删除多个问题
-            db.query(QuestionModel).filter(QuestionModel.id.in_(question_ids)).delete(synchronize_session=False)
-            db.commit()
+            project_ids = (await db.scalars(
+                select(QuestionModel.project_id).where(QuestionModel.id.in_(question_ids)).distinct()
+            )).all()
+            # delete() 语句不触发 after_delete 事件，先写删除记录；
+            # 再按子表到父表的顺序删除，不依赖数据库是否开启外键级联（SQLite 未开启时数据集项会成为孤儿）
+            item_filter = DatasetItemModel.question_id.in_(question_ids)
+            await db.run_sync(DeltaService.record_deletions, item_filter)
+            for statement in (
+                delete(DatasetItemModel).where(item_filter),
+                delete(QuestionModel).where(QuestionModel.id.in_(question_ids))
+            ):
+                await db.execute(statement.execution_options(synchronize_session=False))
+            await db.run_sync(VersionService.bump_projects, project_ids)
+            await db.commit()
             return True
         except Exception as e:
-            db.rollback()
-            print(f"批量删除问题失败: {str(e)}")
+            await db.rollback()
+            logger.error(f"批量删除问题失败: {str(e)}")
             return False
 
-    async def generate_questions(self, db: Session, text, chunk_index: Optional[int] = None) -> Union[List[Question], Dict[str, Any]]:
+    @with_job("generate_questions")
+    async def generate_questions(self, db: AsyncSession, text, chunk_index: Optional[int] = None) -> Union[List[Question], Dict[str, Any]]:
         """为文本生成问题
         
         Args:
@@ -269,8 +318,8 @@ class QuestionService:
                 失败时返回包含错误信息的字典
         """
         try:
-            # 获取分块
-            chunks = db.query(ChunkModel).filter(ChunkModel.text_id == text.id).all()
+            # 获取分块（读穿缓存，生成过程中不再重复查询数据库）
+            chunks = await TextService.get_text_chunks(db, text.id)
             if not chunks:
                 return {
                     "success": False,
@@ -291,27 +340,31 @@ class QuestionService:
             else:
                 chunks_to_process = chunks
 
-            # 创建问题生成 Agent
+            # 创建问题生成 Agent（首次使用时在线程池中导入 crewai，导入期间不阻塞事件循环）
+            await run_in_threadpool(get_question_llm)
+            from crewai import Crew
             agent = self.create_question_generator_agent()
             questions = []
             total_chunks = len(chunks_to_process)
             processed_chunks = 0
 
             # 处理每个分块
-            for chunk in chunks_to_process:
+            for position, chunk in enumerate(chunks_to_process):
+                current_chunk_index = chunk_index if chunk_index is not None else position
                 try:
                     # 创建任务
-                    task = self.create_question_task(agent, chunk.content)
+                    task = self.create_question_task(agent, chunk["content"])
 
                     # 创建 Crew 并执行任务
                     crew = Crew(
                         agents=[agent],
                         tasks=[task],
-                        verbose=True
+                        verbose=settings.CREW_VERBOSE
                     )
 
-                    # 执行任务获取结果
-                    result = crew.kickoff()
+                    # 执行任务获取结果（异步执行，等待模型返回期间不阻塞事件循环）
+                    result = await crew.kickoff_async()
+                    record_llm_tokens(self.question_llm.model, result.token_usage)
                     # 将 CrewOutput 转换为字符串
                     result_str = str(result)
 
@@ -333,14 +386,14 @@ class QuestionService:
 
                         question = QuestionCreate(
                             content=question_content,
-                            answer="暂无答案",  # 设置默认答案
+                            answer=PLACEHOLDER_ANSWER,  # 设置默认答案
                             project_id=str(text.project_id),  # 确保是字符串
                             text_id=str(text.id),  # 确保是字符串
-                            chunk_index=chunk_index if chunk_index is not None else chunks_to_process.index(chunk),
+                            chunk_index=current_chunk_index,
                             metadata={
                                 "type": "general",
-                                "chunk_index": chunk_index if chunk_index is not None else chunks_to_process.index(chunk),
-                                "chunk_metadata": chunk.chunk_metadata
+                                "chunk_index": current_chunk_index,
+                                "chunk_metadata": chunk["metadata"]
                             }
                         )
 
@@ -352,9 +405,10 @@ class QuestionService:
                     logger.info(f"解析问题生成结果失败: {e}")
                     continue
 
-                # 更新进度
+                # 更新进度（逐个分块的进度按采样记录，最后一个分块总是记录）
                 processed_chunks += 1
-                logger.info(f"进度: {processed_chunks}/{total_chunks} 分块处理完成")
+                if processed_chunks == total_chunks or sampled("question_generation_progress"):
+                    logger.info(f"进度: {processed_chunks}/{total_chunks} 分块处理完成")
 
             logger.info(f"问题生成完成，共生成 {len(questions)} 个问题")
             
@@ -375,34 +429,90 @@ class QuestionService:
                 "error": str(e)
             }
 
-    @staticmethod
-    async def update_question(db: Session, question_id: str, question: QuestionUpdate) -> Optional[Question]:
-        db_question = db.query(QuestionModel).filter(QuestionModel.id == question_id).first()
+    # 更新接口的字段 -> 数据库列（tags 没有对应的列，忽略）
+    UPDATE_COLUMNS = {
+        "content": "content",
+        "answer": "answer",
+        "metadata": "question_metadata",
+        "status": "status",
+    }
+    NOT_NULL_FIELDS = ("content", "answer", "status")
+
+    @classmethod
+    def _update_values(cls, fields: Dict[str, Any]) -> Dict[str, Any]:
+        """把请求中传入的字段转换为列值，非空列传入 null 时抛出 ValueError"""
+        empty = [name for name in cls.NOT_NULL_FIELDS if name in fields and fields[name] is None]
+        if empty:
+            raise ValueError(f"字段不能为空: {', '.join(empty)}")
+        return {column: fields[name] for name, column in cls.UPDATE_COLUMNS.items() if name in fields}
+
+    @classmethod
+    async def update_question(cls, db: AsyncSession, question_id: str, question: QuestionUpdate) -> Optional[Question]:
+        db_question = await db.get(QuestionModel, question_id)
         if db_question:
-            for key, value in question.dict(exclude_unset=True).items():
+            for key, value in cls._update_values(question.model_dump(exclude_unset=True)).items():
                 setattr(db_question, key, value)
-            db.commit()
-            db.refresh(db_question)
-            return Question.from_orm(db_question)
+            await db.run_sync(VersionService.bump_project, db_question.project_id)
+            await db.commit()
+            await db.refresh(db_question)
+            return cls.to_schema(db_question)
         return None
 
+    @classmethod
+    async def batch_update_questions(cls, db: AsyncSession, patches: List[QuestionPatch]) -> List[Dict[str, Any]]:
+        """批量部分更新问题（内容、答案、元数据、状态）
+
+        有效的修改在一个事务中以 executemany 写入（按主键的 ORM 批量 UPDATE，传入字段相同的行合并为一批），
+        返回与请求顺序一致的逐行结果；问题不存在、重复或字段无效的行只标记失败，不影响其它行
+        """
+        owners = dict((await db.execute(
+            select(QuestionModel.id, QuestionModel.project_id)
+            .where(QuestionModel.id.in_({patch.id for patch in patches}))
+        )).all())
+
+        now = datetime.utcnow()
+        rows, results, seen = [], [], set()
+        for patch in patches:
+            error = None
+            if patch.id in seen:
+                error = "同一批次中问题ID重复"
+            elif patch.id not in owners:
+                error = "问题不存在"
+            else:
+                try:
+                    values = cls._update_values(patch.model_dump(exclude_unset=True, exclude={"id"}))
+                    if values:
+                        rows.append({"id": patch.id, **values, "updated_at": now})
+                    else:
+                        error = "没有需要更新的字段"
+                except ValueError as e:
+                    error = str(e)
+            seen.add(patch.id)
+            results.append({"id": patch.id, "success": error is None, "error": error})
+
+        if rows:
+            await db.execute(update(QuestionModel), rows)
+            await db.run_sync(VersionService.bump_projects, [owners[row["id"]] for row in rows])
+            await db.commit()
+        return results
+
     @staticmethod
-    async def get_chunk_question_count(db: Session, project_id: str, text_id: str, chunk_index: int) -> int:
+    async def get_chunk_question_count(db: AsyncSession, project_id: str, text_id: str, chunk_index: int) -> int:
         """获取特定分块的问题数量"""
-        return db.query(QuestionModel).filter(
+        return await db.scalar(select(func.count(QuestionModel.id)).where(
             QuestionModel.project_id == project_id,
             QuestionModel.text_id == text_id,
             QuestionModel.chunk_index == chunk_index
-        ).count()
+        )) or 0
 
     @staticmethod
-    async def get_project_question_count(db: Session, project_id: str) -> int:
+    async def get_project_question_count(db: AsyncSession, project_id: str) -> int:
         """获取项目的问题总数"""
         query = select(func.count(QuestionModel.id)).where(QuestionModel.project_id == project_id)
-        result = db.execute(query)
-        return result.scalar() or 0
+        return await db.scalar(query) or 0
 
-    async def generate_answer(self, db: Session, question_id: str) -> Optional[Question]:
+    @with_job("generate_answer")
+    async def generate_answer(self, db: AsyncSession, question_id: str) -> Optional[Question]:
         """为问题生成答案
         
         Args:
@@ -413,14 +523,15 @@ class QuestionService:
             Optional[Question]: 更新后的问题对象
         """
         # 获取问题
-        question = db.query(QuestionModel).filter(QuestionModel.id == question_id).first()
+        question = await db.get(QuestionModel, question_id)
         if not question:
             return None
 
-        # 获取问题所属的分块内容
-        chunks = db.query(ChunkModel).filter(
-            ChunkModel.text_id == question.text_id
-        ).order_by(ChunkModel.start_index).all()
+        # 获取问题所属的分块内容（读穿缓存）
+        try:
+            chunks = await TextService.get_text_chunks(db, question.text_id)
+        except ValueError:
+            chunks = []
 
         if not chunks or question.chunk_index >= len(chunks):
             raise ValueError("找不到问题所属的分块")
@@ -429,20 +540,23 @@ class QuestionService:
 
         try:
             # 创建答案生成 Agent
+            await run_in_threadpool(get_question_llm)
+            from crewai import Crew
             agent = self.create_answer_generator_agent()
             
             # 创建任务
-            task = self.create_answer_task(agent, question.content, chunk.content)
+            task = self.create_answer_task(agent, question.content, chunk["content"])
 
             # 创建 Crew 并执行任务
             crew = Crew(
                 agents=[agent],
                 tasks=[task],
-                verbose=True
+                verbose=settings.CREW_VERBOSE
             )
 
             # 执行任务获取结果
-            result = crew.kickoff()
+            result = await crew.kickoff_async()
+            record_llm_tokens(self.question_llm.model, result.token_usage)
             
             # 更新问题的答案
             question.answer = str(result)
@@ -452,23 +566,12 @@ class QuestionService:
                 "answer_generated_at": datetime.utcnow().isoformat()
             }
             
-            db.commit()
-            db.refresh(question)
+            await db.run_sync(VersionService.bump_project, question.project_id)
+            await db.commit()
+            await db.refresh(question)
             
             # 转换为 Pydantic 模型
-            return Question.model_validate({
-                "id": question.id,
-                "content": question.content,
-                "answer": question.answer,
-                "project_id": question.project_id,
-                "text_id": question.text_id,
-                "chunk_index": question.chunk_index,
-                "metadata": question.question_metadata if question.question_metadata else {},
-                "created_at": question.created_at.isoformat() if question.created_at else None,
-                "updated_at": question.updated_at.isoformat() if question.updated_at else None,
-                "status": "active",
-                "tags": []
-            })
+            return self.to_schema(question)
 
         except Exception as e:
             logger.error(f"生成答案时发生错误: {str(e)}")
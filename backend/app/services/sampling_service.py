@@ -0,0 +1,171 @@
+import hashlib
+import heapq
+from itertools import count
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+
+class SampleOptions(NamedTuple):
+    """导出时的划分与抽样参数"""
+    splits: Optional[List[Tuple[str, float]]] = None  # [(划分名, 累计上界)]
+    split_name: Optional[str] = None  # 只导出该划分
+    seed: str = "0"
+    sample_size: Optional[int] = None  # 固定大小的子集
+    stratify_by: Optional[str] = None  # text / chunk
+
+    @property
+    def active(self) -> bool:
+        return bool(self.splits) or self.sample_size is not None
+
+
+class SamplingService:
+    """基于种子哈希的确定性划分与抽样
+
+    每条记录的去向只由 (种子, 记录键) 决定，与读取顺序、数据总量无关，
+    因此不需要全局打乱或整体加载，一次流式遍历即可完成，相同种子的结果可复现。
+    """
+    STRATIFY_KEYS = ("text", "chunk")
+
+    @staticmethod
+    def parse_splits(spec: str) -> List[Tuple[str, float]]:
+        """解析 "train:0.8,validation:0.1,test:0.1"，比例按总和归一化，返回累计上界"""
+        parts = []
+        for part in spec.split(","):
+            name, sep, ratio = part.strip().partition(":")
+            name = name.strip()
+            try:
+                value = float(ratio) if sep else None
+            except ValueError:
+                value = None
+            if not name or value is None or value <= 0:
+                raise ValueError(f"无效的划分配置: {part.strip()}，格式为 名称:比例，多个划分用逗号分隔")
+            parts.append((name, value))
+
+        names = [name for name, _ in parts]
+        if len(set(names)) != len(names):
+            raise ValueError(f"划分名称重复: {spec}")
+
+        total = sum(value for _, value in parts)
+        bounds = []
+        cumulative = 0.0
+        for name, value in parts:
+            cumulative += value / total
+            bounds.append((name, cumulative))
+        # 避免浮点误差导致最后一个区间取不到 1
+        bounds[-1] = (bounds[-1][0], 1.0)
+        return bounds
+
+    @staticmethod
+    def build_options(
+        split: Optional[str] = None,
+        split_name: Optional[str] = None,
+        seed: str = "0",
+        sample_size: Optional[int] = None,
+        stratify_by: Optional[str] = None
+    ) -> SampleOptions:
+        """校验导出参数，参数不合法时抛出 ValueError"""
+        splits = SamplingService.parse_splits(split) if split else None
+        if split_name is not None:
+            if not splits:
+                raise ValueError("指定 split_name 时必须同时指定 split")
+            if split_name not in {name for name, _ in splits}:
+                raise ValueError(f"划分 {split_name} 不存在，可选: {', '.join(name for name, _ in splits)}")
+        if sample_size is not None and sample_size <= 0:
+            raise ValueError("sample_size 必须大于 0")
+        if stratify_by is not None:
+            if stratify_by not in SamplingService.STRATIFY_KEYS:
+                raise ValueError(f"不支持的分层方式: {stratify_by}，可选: {', '.join(SamplingService.STRATIFY_KEYS)}")
+            if sample_size is None:
+                raise ValueError("分层抽样需要同时指定 sample_size")
+        return SampleOptions(splits, split_name, seed, sample_size, stratify_by)
+
+    @staticmethod
+    def unit_hash(seed: str, purpose: str, key: str) -> float:
+        """把 (种子, 用途, 键) 映射到 [0, 1) 上的均匀值，划分与抽样使用不同用途，互不相关"""
+        digest = hashlib.blake2b(f"{seed}\x00{purpose}\x00{key}".encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "big") / 2 ** 64
+
+    @staticmethod
+    def record_key(row) -> str:
+        """记录键：优先使用问题 ID，同一问题在不同数据集中落入同一划分，避免训练集/测试集泄漏"""
+        return row.question_id or row.id
+
+    @staticmethod
+    def stratum_of(row, stratify_by: Optional[str]):
+        if stratify_by == "text":
+            return row.text_id
+        if stratify_by == "chunk":
+            return (row.text_id, row.chunk_index)
+        return None
+
+    @staticmethod
+    def assign_splits(rows: Iterable, options: SampleOptions) -> Iterator[Tuple[object, Optional[str]]]:
+        """为每行分配划分，返回 (行, 划分名)；指定 split_name 时只保留该划分"""
+        if not options.splits:
+            for row in rows:
+                yield row, None
+            return
+
+        for row in rows:
+            point = SamplingService.unit_hash(options.seed, "split", SamplingService.record_key(row))
+            split = next(name for name, bound in options.splits if point < bound)
+            if options.split_name is None or split == options.split_name:
+                yield row, split
+
+    @staticmethod
+    def allocate(counts: Dict[object, int], size: int) -> Dict[object, int]:
+        """按各层数量等比例分配样本数（最大余数法），总数不超过 size"""
+        total = sum(counts.values())
+        if total <= size:
+            return dict(counts)
+        quotas = {}
+        remainders = []
+        for stratum, n in counts.items():
+            exact = size * n / total
+            quotas[stratum] = int(exact)
+            remainders.append((exact - int(exact), stratum))
+        # 余数相同时按层的出现顺序分配，保证结果确定
+        remainders.sort(key=lambda item: -item[0])
+        for _, stratum in remainders[:size - sum(quotas.values())]:
+            quotas[stratum] += 1
+        return quotas
+
+    @staticmethod
+    def sample(items: Iterable[Tuple[object, Optional[str]]], options: SampleOptions) -> Iterator[Tuple[object, Optional[str]]]:
+        """确定性蓄水池抽样
+
+        每条记录按种子哈希得到优先级，保留优先级最小的 sample_size 条（bottom-k），
+        结果与读取顺序无关。分层时每层各维护一个容量为 sample_size 的蓄水池并统计层内数量，
+        遍历结束后按比例分配各层名额。内存占用与 sample_size（分层时为 层数 × sample_size）成正比。
+        """
+        size = options.sample_size
+        reservoirs: Dict[object, list] = {}
+        counts: Dict[object, int] = {}
+        tiebreak = count()
+        for row, split in items:
+            stratum = SamplingService.stratum_of(row, options.stratify_by)
+            counts[stratum] = counts.get(stratum, 0) + 1
+            priority = SamplingService.unit_hash(options.seed, "sample", SamplingService.record_key(row))
+            # heapq 是最小堆，取负数后堆顶为当前保留的最大优先级
+            entry = (-priority, next(tiebreak), row, split)
+            reservoir = reservoirs.setdefault(stratum, [])
+            if len(reservoir) < size:
+                heapq.heappush(reservoir, entry)
+            elif entry[0] > reservoir[0][0]:
+                heapq.heapreplace(reservoir, entry)
+
+        quotas = SamplingService.allocate(counts, size)
+        selected = []
+        for stratum, reservoir in reservoirs.items():
+            selected.extend(heapq.nlargest(quotas[stratum], reservoir))
+        # 按优先级输出，相当于以种子打乱后的顺序
+        selected.sort(key=lambda entry: -entry[0])
+        for _, _, row, split in selected:
+            yield row, split
+
+    @staticmethod
+    def apply(rows: Iterable, options: SampleOptions) -> Iterator[Tuple[object, Optional[str]]]:
+        """一次遍历完成划分和抽样，返回 (行, 划分名)"""
+        items = SamplingService.assign_splits(rows, options)
+        if options.sample_size is not None:
+            items = SamplingService.sample(items, options)
+        return items
@@ -1,15 +1,50 @@
 import os
 import uuid
 from datetime import datetime
-from typing import List, Optional
-from sqlalchemy.orm import Session
+from pathlib import Path
+from typing import List, Optional, Tuple
+from sqlalchemy import case, delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 from backend.app.schemas.text import Text, TextCreate, TextUpdate
-from backend.app.models.database import Text as TextModel, Chunk as ChunkModel
+from backend.app.models.text import TextInfo, TextRange
+from backend.app.models.database import (
+    Text as TextModel,
+    Chunk as ChunkModel,
+    Question as QuestionModel,
+    Dataset as DatasetModel,
+    DatasetItem as DatasetItemModel,
+    PLACEHOLDER_ANSWER
+)
 from backend.app.core.config import settings
+from backend.app.core.cache import VersionedCache
+from backend.app.core.bulk_load import bulk_insert
+from backend.app.core.file_cleanup import remove_files_later
+from backend.app.core.text_file import read_range, slice_range, stage_text_file, write_text_file
+from backend.app.services.delta_service import DeltaService
+from backend.app.services.version_service import VersionService
 from backend.core.logger import logger
 
 
+# 文本元数据列，不包含正文
+INFO_COLUMNS = (
+    TextModel.id,
+    TextModel.title,
+    TextModel.project_id,
+    TextModel.file_path,
+    TextModel.file_size,
+    TextModel.total_chunks,
+    TextModel.status,
+    TextModel.created_at,
+    TextModel.updated_at,
+)
+
+
 class TextService:
+    # 文本详情和分块数据按文本ID缓存，版本号与 entity_versions 保持一致
+    _text_cache = VersionedCache("texts", settings.CACHE_MAXSIZE, settings.CACHE_TTL_SECONDS)
+    _chunk_cache = VersionedCache("chunks", settings.CACHE_MAXSIZE, settings.CACHE_TTL_SECONDS)
+
     @staticmethod
     async def save_uploaded_file(content: bytes, filename: str) -> str:
         """保存上传的文件"""
@@ -65,13 +100,18 @@ class TextService:
         return chunks
 
     @staticmethod
-    async def create_text(db: Session, text_data: TextCreate) -> TextModel:
+    async def create_text(db: AsyncSession, text_data: TextCreate) -> TextModel:
         """创建新的文本记录"""
         # 如果没有提供file_path，生成一个
         if not text_data.file_path:
             file_id = str(uuid.uuid4())
             text_data.file_path = f"uploads/{file_id}.txt"
 
+        # 只提供了正文、还没有保存文件时补写文件，正文的区间读取统一从文件读
+        file_path = TextService.resolve_path(text_data.file_path)
+        if text_data.content and not file_path.exists():
+            text_data.file_size = await run_in_threadpool(write_text_file, file_path, text_data.content)
+
         # 创建新的文本记录
         db_text = TextModel(
             id=str(uuid.uuid4()),
@@ -87,83 +127,222 @@ class TextService:
         )
 
         db.add(db_text)
-        db.commit()
-        db.refresh(db_text)
 
-        # 创建分块记录
+        # 创建分块记录，与文本记录在同一个事务中提交（PostgreSQL 上使用 COPY 批量写入）
         if text_data.chunks:
-            for chunk in text_data.chunks:
-                db_chunk = ChunkModel(
-                    id=str(uuid.uuid4()),
-                    content=chunk.content,
-                    start_index=chunk.start_index,
-                    end_index=chunk.end_index,
-                    chunk_metadata=chunk.metadata,
-                    text_id=db_text.id,
-                    created_at=datetime.utcnow(),
-                    updated_at=datetime.utcnow()
-                )
-                db.add(db_chunk)
-
-            db.commit()
+            await db.flush()
+            now = datetime.utcnow()
+            await db.run_sync(bulk_insert, ChunkModel, [
+                {
+                    "id": str(uuid.uuid4()),
+                    "content": chunk.content,
+                    "start_index": chunk.start_index,
+                    "end_index": chunk.end_index,
+                    "chunk_metadata": chunk.metadata,
+                    "text_id": db_text.id,
+                    "created_at": now,
+                    "updated_at": now
+                }
+                for chunk in text_data.chunks
+            ])
+
+        await db.run_sync(VersionService.bump_project, db_text.project_id, db_text.id)
+        await db.commit()
+        await db.refresh(db_text)
+        TextService.invalidate(db_text.id)
 
         return db_text
 
     @staticmethod
-    async def get_text(db: Session, text_id: str) -> Optional[TextModel]:
-        """获取文本记录"""
-        return db.query(TextModel).filter(TextModel.id == text_id).first()
+    def resolve_path(file_path: str) -> Path:
+        """文本文件的绝对路径（数据库中保存的是相对 BASE_DIR 的路径，不依赖进程的工作目录）"""
+        path = Path(file_path)
+        return path if path.is_absolute() else settings.BASE_DIR / path
 
     @staticmethod
-    async def get_text_chunks(db: Session, text_id: str) -> List[dict]:
-        """获取文本的分块数据"""
+    def invalidate(text_id: str) -> None:
+        """文本写操作后使本进程内的缓存失效"""
+        TextService._text_cache.invalidate(text_id)
+        TextService._chunk_cache.invalidate(text_id)
+
+    @staticmethod
+    async def get_text(db: AsyncSession, text_id: str) -> Optional[TextInfo]:
+        """获取文本元数据（读穿缓存）
+
+        返回与会话无关的只读快照，不包含正文和分块：正文请使用 read_text_range，分块请使用 get_text_chunks
+        """
+        version = await VersionService.get_text_version(db, text_id)
+        text = TextService._text_cache.get(text_id, version)
+        if text is not None:
+            return text
+
+        row = (await db.execute(select(*INFO_COLUMNS).where(TextModel.id == text_id))).first()
+        if not row:
+            return None
+
+        text = TextInfo(**row._asdict())
+        TextService._text_cache.set(text_id, version, text)
+        return text
+
+    @staticmethod
+    async def read_text_range(
+        db: AsyncSession,
+        text_id: str,
+        offset: int,
+        length: int,
+        unit: str = "char"
+    ) -> Optional[TextRange]:
+        """读取文本正文的一段，offset / length 的单位为 char（字符）或 byte（字节）
+
+        从保存的文件通过 mmap 读取，只解码请求的区间附近的内容
+        """
         text = await TextService.get_text(db, text_id)
         if not text:
+            return None
+
+        file_path = TextService.resolve_path(text.file_path)
+        if file_path.is_file():
+            result = await run_in_threadpool(read_range, file_path, offset, length, unit)
+        else:
+            # 早期通过接口创建的文本没有落盘文件，从数据库读取正文
+            content = await db.scalar(select(TextModel.content).where(TextModel.id == text_id))
+            result = slice_range(content or "", offset, length, unit)
+        return TextRange(text_id=text_id, **result)
+
+    @staticmethod
+    async def get_text_chunks(db: AsyncSession, text_id: str) -> List[dict]:
+        """获取文本的分块数据（读穿缓存）"""
+        version = await VersionService.get_text_version(db, text_id)
+        chunks = TextService._chunk_cache.get(text_id, version)
+        if chunks is not None:
+            return list(chunks)
+
+        if not await db.scalar(select(TextModel.id).where(TextModel.id == text_id)):
             raise ValueError("文本不存在")
-        
+
         # 从数据库获取分块
-        chunks = db.query(ChunkModel).filter(ChunkModel.text_id == text_id).all()
-        return [
+        rows = (await db.execute(select(
+            ChunkModel.content,
+            ChunkModel.start_index,
+            ChunkModel.end_index,
+            ChunkModel.chunk_metadata
+        ).where(ChunkModel.text_id == text_id).order_by(ChunkModel.start_index))).all()
+        chunks = [
             {
-                "content": chunk.content,
-                "start_index": chunk.start_index,
-                "end_index": chunk.end_index,
-                "metadata": chunk.chunk_metadata
+                "content": row.content,
+                "start_index": row.start_index,
+                "end_index": row.end_index,
+                "metadata": row.chunk_metadata
             }
-            for chunk in chunks
+            for row in rows
         ]
+        TextService._chunk_cache.set(text_id, version, chunks)
+        return list(chunks)
 
     @staticmethod
-    async def list_texts(db: Session, project_id: str) -> List[Text]:
-        """获取项目下的所有文本"""
-        db_texts = db.query(TextModel).filter(TextModel.project_id == project_id).all()
-        return [Text.from_orm(text) for text in db_texts]
+    async def list_chunks(
+        db: AsyncSession,
+        text_id: str,
+        page: int = 1,
+        page_size: int = 100,
+        include_content: bool = True
+    ) -> Optional[Tuple[List[dict], int]]:
+        """分页获取文本的分块，附带每个分块的问题数和已回答数
+
+        分块序号（与问题的 chunk_index 对应）由窗口函数按 start_index 编号，问题数在同一条查询中
+        按 (text_id, chunk_index) 聚合后外连接；include_content 为 False 时只返回位置和元数据。
+        文本不存在时返回 None
+        """
+        if not await db.scalar(select(TextModel.id).where(TextModel.id == text_id)):
+            return None
+
+        total = await db.scalar(select(func.count(ChunkModel.id)).where(ChunkModel.text_id == text_id)) or 0
+
+        columns = [ChunkModel.start_index, ChunkModel.end_index, ChunkModel.chunk_metadata]
+        if include_content:
+            columns.append(ChunkModel.content)
+        numbered = select(
+            *columns,
+            (func.row_number().over(order_by=ChunkModel.start_index) - 1).label("chunk_index")
+        ).where(ChunkModel.text_id == text_id).subquery()
+
+        counts = select(
+            QuestionModel.chunk_index,
+            func.count(QuestionModel.id).label("question_count"),
+            func.sum(case((QuestionModel.answer.notin_(["", PLACEHOLDER_ANSWER]), 1), else_=0)).label("answer_count")
+        ).where(QuestionModel.text_id == text_id).group_by(QuestionModel.chunk_index).subquery()
+
+        rows = (await db.execute(
+            select(
+                numbered,
+                func.coalesce(counts.c.question_count, 0).label("question_count"),
+                func.coalesce(counts.c.answer_count, 0).label("answer_count")
+            )
+            .outerjoin(counts, counts.c.chunk_index == numbered.c.chunk_index)
+            .order_by(numbered.c.chunk_index)
+            .offset((page - 1) * page_size)
+            .limit(page_size)
+        )).all()
+
+        items = []
+        for row in rows:
+            item = {
+                "index": row.chunk_index,
+                "start_index": row.start_index,
+                "end_index": row.end_index,
+                "metadata": row.chunk_metadata,
+                "question_count": row.question_count,
+                "answer_count": row.answer_count
+            }
+            if include_content:
+                item["content"] = row.content
+            items.append(item)
+        return items, total
+
+    @staticmethod
+    async def list_texts(db: AsyncSession, project_id: str) -> List[dict]:
+        """获取项目下的所有文本（只有元数据，不查询正文）"""
+        rows = (await db.execute(select(*INFO_COLUMNS).where(TextModel.project_id == project_id))).all()
+        return [row._asdict() for row in rows]
 
     @staticmethod
-    async def get_text_count(db: Session, project_id: str) -> int:
+    async def get_text_count(db: AsyncSession, project_id: str) -> int:
         """获取项目下的文本数量"""
-        return db.query(TextModel).filter(TextModel.project_id == project_id).count()
+        return await db.scalar(select(func.count(TextModel.id)).where(TextModel.project_id == project_id)) or 0
 
     @staticmethod
-    async def delete_text(db: Session, text_id: str) -> bool:
-        """删除文本记录"""
-        db_text = db.query(TextModel).filter(TextModel.id == text_id).first()
-        if not db_text:
+    async def delete_text(db: AsyncSession, text_id: str) -> bool:
+        """删除文本及其分块和问题（按条件批量删除，不把关联数据加载到会话中）
+
+        数据集保留（text_id 置空），其中来自这些问题的数据集项一并删除并写入删除记录；
+        上传的文件在事务提交后由后台线程删除
+        """
+        row = (await db.execute(select(TextModel.project_id, TextModel.file_path).where(TextModel.id == text_id))).first()
+        if not row:
             return False
 
-        # 删除文件系统中的文件
-        if os.path.exists(db_text.file_path):
-            os.remove(db_text.file_path)
+        question_ids = select(QuestionModel.id).where(QuestionModel.text_id == text_id)
+        await db.run_sync(DeltaService.record_deletions, DatasetItemModel.question_id.in_(question_ids))
+        # 按子表到父表的顺序删除，不依赖数据库是否开启外键级联
+        for statement in (
+            delete(DatasetItemModel).where(DatasetItemModel.question_id.in_(question_ids)),
+            delete(QuestionModel).where(QuestionModel.text_id == text_id),
+            delete(ChunkModel).where(ChunkModel.text_id == text_id),
+            update(DatasetModel).where(DatasetModel.text_id == text_id).values(text_id=None),
+            delete(TextModel).where(TextModel.id == text_id)
+        ):
+            await db.execute(statement.execution_options(synchronize_session=False))
 
-        # 删除关联的分块（通过级联删除自动处理）
-        db.delete(db_text)
-        db.commit()
+        await db.run_sync(VersionService.bump_project, row.project_id, text_id)
+        await db.commit()
+        TextService.invalidate(text_id)
+        remove_files_later([TextService.resolve_path(row.file_path)])
         return True
 
     @staticmethod
-    async def update_text(db: Session, text_id: str, text: TextUpdate) -> Optional[Text]:
+    async def update_text(db: AsyncSession, text_id: str, text: TextUpdate) -> Optional[Text]:
         """更新文本记录"""
-        db_text = db.query(TextModel).filter(TextModel.id == text_id).first()
+        db_text = await db.get(TextModel, text_id)
         if not db_text:
             return None
 
@@ -171,7 +350,24 @@ class TextService:
         for key, value in update_data.items():
             setattr(db_text, key, value)
 
+        # 正文修改后同步改写保存的文件，区间读取和下载拿到的都是最新内容。
+        # 先在线程池中写临时文件，数据库提交成功后再替换，提交失败时文件保持原样
+        staged = None
+        if update_data.get("content") is not None:
+            file_path = TextService.resolve_path(db_text.file_path)
+            tmp_path, db_text.file_size = await run_in_threadpool(stage_text_file, file_path, db_text.content)
+            staged = (tmp_path, file_path)
+
         db_text.updated_at = datetime.utcnow()
-        db.commit()
-        db.refresh(db_text)
+        try:
+            await db.run_sync(VersionService.bump_project, db_text.project_id, text_id)
+            await db.commit()
+        except BaseException:
+            if staged:
+                staged[0].unlink(missing_ok=True)
+            raise
+        if staged:
+            os.replace(*staged)
+        await db.refresh(db_text)
+        TextService.invalidate(text_id)
         return Text.from_orm(db_text)
@@ -0,0 +1,97 @@
+from datetime import datetime
+from typing import Iterable, Optional
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from ..models.database import EntityVersion as EntityVersionModel
+
+
+class VersionService:
+    """维护项目/文本的版本号
+
+    所有写操作在提交前调用 bump_*，与业务数据处于同一个事务中；
+    读接口只查询 entity_versions 这张小表即可判断数据是否变化。
+    bump_* 是同步方法，异步会话中通过 db.run_sync(VersionService.bump_project, ...) 调用。
+    """
+
+    PROJECT = "project"
+    TEXT = "text"
+
+    # 支持 INSERT ... ON CONFLICT 的方言
+    UPSERT_DIALECTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+    @staticmethod
+    def bump(db: Session, scope: str, entity_id: str) -> None:
+        """递增版本号（不提交，由调用方统一提交）
+
+        用一条 upsert 完成，多个进程同时首次递增同一实体时不会因主键冲突失败
+        """
+        dialect = db.get_bind(clause=EntityVersionModel.__table__.insert()).dialect.name
+        upsert = VersionService.UPSERT_DIALECTS.get(dialect)
+        if upsert is not None:
+            now = datetime.utcnow()
+            stmt = upsert(EntityVersionModel).values(scope=scope, entity_id=entity_id, version=1, updated_at=now)
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=[EntityVersionModel.scope, EntityVersionModel.entity_id],
+                set_={"version": EntityVersionModel.version + 1, "updated_at": now}
+            ))
+            return
+
+        updated = db.query(EntityVersionModel).filter(
+            EntityVersionModel.scope == scope,
+            EntityVersionModel.entity_id == entity_id
+        ).update(
+            {EntityVersionModel.version: EntityVersionModel.version + 1},
+            synchronize_session=False
+        )
+        if not updated:
+            db.add(EntityVersionModel(scope=scope, entity_id=entity_id, version=1))
+            db.flush()
+
+    @staticmethod
+    def bump_project(db: Session, project_id: str, text_id: Optional[str] = None) -> None:
+        """项目下有数据变化时递增项目版本号，涉及具体文本时同时递增文本版本号"""
+        VersionService.bump(db, VersionService.PROJECT, project_id)
+        if text_id:
+            VersionService.bump(db, VersionService.TEXT, text_id)
+
+    @staticmethod
+    def bump_projects(db: Session, project_ids: Iterable[str]) -> None:
+        """批量操作涉及多个项目时逐个递增"""
+        for project_id in set(project_ids):
+            VersionService.bump(db, VersionService.PROJECT, project_id)
+
+    @staticmethod
+    def bump_texts(db: Session, text_ids: Iterable[str]) -> None:
+        """批量操作涉及多个文本时逐个递增"""
+        for text_id in set(text_ids):
+            VersionService.bump(db, VersionService.TEXT, text_id)
+
+    @staticmethod
+    def get_version(db: Session, scope: str, entity_id: str) -> int:
+        """获取当前版本号，不存在时为 0"""
+        version = db.query(EntityVersionModel.version).filter(
+            EntityVersionModel.scope == scope,
+            EntityVersionModel.entity_id == entity_id
+        ).scalar()
+        return version or 0
+
+    @staticmethod
+    async def get_version_async(db: AsyncSession, scope: str, entity_id: str) -> int:
+        """get_version 的异步版本"""
+        version = await db.scalar(select(EntityVersionModel.version).where(
+            EntityVersionModel.scope == scope,
+            EntityVersionModel.entity_id == entity_id
+        ))
+        return version or 0
+
+    @staticmethod
+    async def get_project_version(db: AsyncSession, project_id: str) -> int:
+        """获取项目版本号"""
+        return await VersionService.get_version_async(db, VersionService.PROJECT, project_id)
+
+    @staticmethod
+    async def get_text_version(db: AsyncSession, text_id: str) -> int:
+        """获取文本版本号"""
+        return await VersionService.get_version_async(db, VersionService.TEXT, text_id)
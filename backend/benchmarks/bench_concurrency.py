@@ -0,0 +1,136 @@
+"""并发请求下的事件循环阻塞基准测试
+
+模拟若干个慢查询（全表扫描的统计查询）持续执行的同时，按固定间隔发起轻量请求（按主键读取项目），
+统计轻量请求从预定发起时刻到完成的延迟分位数。对比两种数据库访问方式：
+
+- sync:  在 async 接口中直接使用同步会话（改造前的方式），查询期间整个事件循环被阻塞
+- async: 使用 AsyncSession + aiosqlite，查询在驱动线程中执行，事件循环可以继续处理其他请求
+
+用法（在仓库根目录执行）:
+    python -m backend.benchmarks.bench_concurrency --rows 50000 --concurrency 4 --requests 100
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.app.models.database import Base, Project as ProjectModel, Question as QuestionModel
+from backend.benchmarks.bench_list_serialization import seed
+
+# 无法使用索引的统计查询，耗时与行数成正比
+SLOW_QUERY = select(func.count()).select_from(QuestionModel).where(func.instr(QuestionModel.answer, "不存在的内容") > 0)
+
+
+def sync_calls(session_factory, project_id: str):
+    async def slow() -> None:
+        db = session_factory()
+        try:
+            db.execute(SLOW_QUERY).scalar()
+        finally:
+            db.close()
+
+    async def light() -> None:
+        db = session_factory()
+        try:
+            db.get(ProjectModel, project_id)
+        finally:
+            db.close()
+
+    return slow, light
+
+
+def async_calls(session_factory, project_id: str):
+    async def slow() -> None:
+        async with session_factory() as db:
+            await db.scalar(SLOW_QUERY)
+
+    async def light() -> None:
+        async with session_factory() as db:
+            await db.get(ProjectModel, project_id)
+
+    return slow, light
+
+
+async def measure(slow, light, concurrency: int, requests: int, interval: float):
+    """返回 (轻量请求延迟列表, 完成的慢查询数, 总耗时)"""
+    stop = asyncio.Event()
+    completed = 0
+
+    async def slow_worker() -> None:
+        nonlocal completed
+        while not stop.is_set():
+            await slow()
+            completed += 1
+            # 同步会话的慢查询内部没有 await，这里让出一次，相当于下一个请求到达
+            await asyncio.sleep(0)
+
+    async def timed(due: float) -> float:
+        await light()
+        return time.perf_counter() - due
+
+    workers = [asyncio.create_task(slow_worker()) for _ in range(concurrency)]
+    await asyncio.sleep(0)
+
+    start = time.perf_counter()
+    tasks = []
+    for i in range(requests):
+        # 按预定时刻计算延迟，事件循环被阻塞造成的排队时间也计入
+        due = start + i * interval
+        await asyncio.sleep(max(0.0, due - time.perf_counter()))
+        tasks.append(asyncio.create_task(timed(due)))
+    latencies = await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await asyncio.gather(*workers)
+    return latencies, completed, elapsed
+
+
+def report(name: str, latencies, completed: int, elapsed: float) -> None:
+    cuts = statistics.quantiles(latencies, n=100)
+    print(
+        f"{name:<6} p50 {cuts[49] * 1000:8.1f} ms  p95 {cuts[94] * 1000:8.1f} ms  "
+        f"max {max(latencies) * 1000:8.1f} ms  slow queries {completed / elapsed:6.1f}/s"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000, help="问题行数，决定慢查询的耗时")
+    parser.add_argument("--concurrency", type=int, default=4, help="同时执行的慢查询数量")
+    parser.add_argument("--requests", type=int, default=100, help="轻量请求数量")
+    parser.add_argument("--interval", type=float, default=0.01, help="轻量请求的发起间隔（秒）")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "bench.db")
+        engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(bind=engine, autoflush=False)
+        db = session_factory()
+        project_id = seed(db, args.rows)
+        db.close()
+
+        slow, light = sync_calls(session_factory, project_id)
+        report("sync", *asyncio.run(measure(slow, light, args.concurrency, args.requests, args.interval)))
+
+        async def run_async():
+            async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+            try:
+                slow, light = async_calls(async_sessionmaker(async_engine, expire_on_commit=False), project_id)
+                return await measure(slow, light, args.concurrency, args.requests, args.interval)
+            finally:
+                await async_engine.dispose()
+
+        report("async", *asyncio.run(run_async()))
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
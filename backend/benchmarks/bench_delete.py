@@ -0,0 +1,103 @@
+"""删除项目基准测试
+
+构造一个包含文本、分块、问题和数据集项的项目，对比两种删除方式的耗时（两者都使用应用的 SQLite pragma）：
+
+- orm: 改造前的方式，session.delete(project) 通过 ORM 级联把所有关联行加载到会话中逐条删除
+- set: ProjectService.delete_project，按子表到父表的顺序逐表执行 DELETE ... WHERE
+
+用法（在仓库根目录执行）:
+    python -m backend.benchmarks.bench_delete --rows 200000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import uuid
+
+from sqlalchemy import create_engine, insert, literal, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.app.core.database import configure_sqlite
+from backend.app.models.database import (
+    Base,
+    Project as ProjectModel,
+    Text as TextModel,
+    Chunk as ChunkModel,
+    Question as QuestionModel,
+    Dataset as DatasetModel,
+    DatasetItem as DatasetItemModel
+)
+from backend.app.services.project_service import ProjectService
+from backend.benchmarks.bench_list_serialization import seed
+
+
+def prepare(url: str, rows: int) -> str:
+    """rows 个问题、每个问题一条数据集项，另有 rows / 10 个分块，返回项目ID"""
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    try:
+        project_id = seed(db, rows)
+        text_id = db.scalar(select(TextModel.id).where(TextModel.project_id == project_id))
+        db.bulk_insert_mappings(ChunkModel, [
+            {"id": str(uuid.uuid4()), "content": "x" * 100, "start_index": i * 100, "end_index": (i + 1) * 100, "text_id": text_id}
+            for i in range(rows // 10)
+        ])
+        dataset_id = str(uuid.uuid4())
+        db.add(DatasetModel(id=dataset_id, name="bench", project_id=project_id))
+        db.flush()
+        db.execute(insert(DatasetItemModel).from_select(
+            ["id", "dataset_id", "question_id", "question", "answer"],
+            select(QuestionModel.id, literal(dataset_id), QuestionModel.id, QuestionModel.content, QuestionModel.answer)
+            .where(QuestionModel.project_id == project_id)
+        ))
+        db.commit()
+    finally:
+        db.close()
+        engine.dispose()
+    return project_id
+
+
+def delete_orm(url: str, project_id: str) -> None:
+    engine = create_engine(url)
+    configure_sqlite(engine)
+    db = sessionmaker(bind=engine)()
+    try:
+        db.delete(db.get(ProjectModel, project_id))
+        db.commit()
+    finally:
+        db.close()
+        engine.dispose()
+
+
+def delete_set(url: str, project_id: str) -> None:
+    async def run():
+        engine = create_async_engine(url.replace("sqlite://", "sqlite+aiosqlite://"))
+        configure_sqlite(engine.sync_engine, immediate=True)
+        try:
+            async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+                assert await ProjectService.delete_project(db, project_id)
+        finally:
+            await engine.dispose()
+
+    asyncio.run(run())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200000, help="问题行数（数据集项同样多）")
+    args = parser.parse_args()
+
+    for mode, delete in (("orm", delete_orm), ("set", delete_set)):
+        with tempfile.TemporaryDirectory() as workdir:
+            url = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+            project_id = prepare(url, args.rows)
+            start = time.perf_counter()
+            delete(url, project_id)
+            print(f"{mode:<4} {args.rows} rows  {time.perf_counter() - start:8.2f} s")
+
+
+if __name__ == "__main__":
+    main()
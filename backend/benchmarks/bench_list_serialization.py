@@ -0,0 +1,132 @@
+"""问题列表序列化基准测试
+
+对比旧的读路径（加载完整 ORM 实体 -> 手工拼字典 -> Question.model_validate -> FastAPI 再次校验并序列化）
+与新的读路径（只投影需要的列 -> 直接拼字典 -> orjson 序列化）的每秒序列化行数。
+
+用法（在仓库根目录执行）:
+    python -m backend.benchmarks.bench_list_serialization --rows 20000 --page-size 1000
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.app.models.database import Base, Project as ProjectModel, Text as TextModel, Question as QuestionModel
+from backend.app.models.question import Question
+from backend.app.services.question_service import QuestionService
+
+
+def seed(db, rows: int) -> str:
+    project_id = str(uuid.uuid4())
+    text_id = str(uuid.uuid4())
+    db.add(ProjectModel(id=project_id, name="bench"))
+    db.add(TextModel(id=text_id, title="bench.txt", content="x" * 1000, file_path="uploads/bench.txt", project_id=project_id))
+    # bulk_insert_mappings 不经过工作单元排序，先写入父表，外键生效的数据库（PostgreSQL）才不会报错
+    db.flush()
+    now = datetime.utcnow()
+    db.bulk_insert_mappings(QuestionModel, [
+        {
+            "id": str(uuid.uuid4()),
+            "content": f"问题 {i}：" + "内容" * 20,
+            "answer": "答案" * 100,
+            "project_id": project_id,
+            "text_id": text_id,
+            "chunk_index": i % 50,
+            "question_metadata": {"type": "general", "chunk_index": i % 50},
+            "created_at": now,
+            "updated_at": now,
+        }
+        for i in range(rows)
+    ])
+    db.commit()
+    return project_id
+
+
+def legacy_page(db, project_id: str, page: int, page_size: int) -> bytes:
+    """基线实现：与改造前的 list_questions + FastAPI 默认序列化一致"""
+    query = db.query(QuestionModel).filter(QuestionModel.project_id == project_id)
+    total = query.count()
+    questions = query.offset((page - 1) * page_size).limit(page_size).all()
+    result = []
+    for question in questions:
+        result.append(Question.model_validate({
+            "id": question.id,
+            "content": question.content,
+            "answer": question.answer,
+            "project_id": question.project_id,
+            "text_id": question.text_id,
+            "chunk_index": question.chunk_index,
+            "metadata": question.question_metadata if question.question_metadata else {},
+            "created_at": question.created_at.isoformat() if question.created_at else None,
+            "updated_at": question.updated_at.isoformat() if question.updated_at else None,
+            "status": "active",
+            "tags": []
+        }))
+    body = {"items": result, "total": total, "page": page, "page_size": page_size}
+    return json.dumps(jsonable_encoder(body), ensure_ascii=False).encode("utf-8")
+
+
+async def projected_page(db, project_id: str, page: int, page_size: int) -> bytes:
+    """新实现：列投影 + orjson（db 为 AsyncSession）"""
+    items, total = await QuestionService.list_questions(db, project_id=project_id, page=page, page_size=page_size)
+    return orjson.dumps({"items": items, "total": total, "page": page, "page_size": page_size})
+
+
+def run(name: str, fn, db, project_id: str, rows: int, page_size: int) -> None:
+    pages = (rows + page_size - 1) // page_size
+    start = time.perf_counter()
+    size = 0
+    for page in range(1, pages + 1):
+        size += len(fn(db, project_id, page, page_size))
+        db.expunge_all()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<10} {rows / elapsed:>12,.0f} rows/s  {elapsed:8.3f}s  {size / 1024 / 1024:8.2f} MB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000, help="问题行数")
+    parser.add_argument("--page-size", type=int, default=1000, help="每页数量")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "bench.db")
+        engine = create_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(bind=engine, autoflush=False)
+
+        db = session_factory()
+        project_id = seed(db, args.rows)
+        db.close()
+
+        db = session_factory()
+        try:
+            run("legacy", legacy_page, db, project_id, args.rows, args.page_size)
+        finally:
+            db.close()
+
+        # 服务层使用异步会话，在同一个事件循环中逐页执行
+        async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        loop = asyncio.new_event_loop()
+        db = async_sessionmaker(async_engine, autoflush=False)()
+        try:
+            run("projected", lambda *a: loop.run_until_complete(projected_page(*a)), db, project_id, args.rows, args.page_size)
+        finally:
+            loop.run_until_complete(db.close())
+            loop.run_until_complete(async_engine.dispose())
+            loop.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
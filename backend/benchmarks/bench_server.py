@@ -0,0 +1,211 @@
+"""多进程服务负载测试
+
+用 python -m backend.serve 启动服务（共享同一个数据库），通过接口导入一批问题后，
+若干读协程分页读取问题列表，若干写协程通过批量 PATCH 接口修改答案，统计吞吐、延迟分位数和失败次数。
+同时若干导入协程不断通过导入接口写入新问题（在线程池中经同步会话写库），与接口的写操作争用 SQLite 写锁，
+任何一次导入失败都视为测试失败。
+每个问题只由一个写协程修改，结束后逐个核对数据库中的答案是否为该写协程最后一次成功写入的值。
+
+用法（在仓库根目录执行，默认使用临时 SQLite 数据库，可通过 --database-url 指定 PostgreSQL）:
+    python -m backend.benchmarks.bench_server --workers 1,4 --rows 5000 --duration 15
+"""
+import argparse
+import asyncio
+import io
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+import orjson
+
+REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_ready(client: httpx.AsyncClient, process: subprocess.Popen, timeout: float = 60) -> None:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("服务进程启动失败")
+        try:
+            if (await client.get("/")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("等待服务启动超时")
+
+
+async def seed(client: httpx.AsyncClient, rows: int):
+    """通过接口创建项目、上传文本并导入问题，返回 (项目ID, 文本ID, 问题ID列表)"""
+    project = (await client.post("/api/projects/", json={"name": "bench", "description": "bench_server"})).json()
+    project_id = project["id"]
+    text = (await client.post(
+        f"/api/projects/upload?project_id={project_id}",
+        files={"file": ("bench.txt", ("示例文本。" * 2000).encode())}
+    )).json()
+    response = await import_questions(client, project_id, text["id"], rows, "问题")
+    response.raise_for_status()
+
+    question_ids = []
+    page = 1
+    while len(question_ids) < rows:
+        body = (await client.get(
+            "/api/questions/list", params={"project_id": project_id, "page": page, "page_size": 1000}
+        )).json()
+        if not body["items"]:
+            break
+        question_ids.extend(item["id"] for item in body["items"])
+        page += 1
+    return project_id, text["id"], question_ids
+
+
+async def import_questions(client: httpx.AsyncClient, project_id: str, text_id: str, rows: int, prefix: str):
+    lines = b"\n".join(orjson.dumps({"question": f"{prefix}{i}", "answer": "答案"}) for i in range(rows))
+    return await client.post(
+        "/api/questions/import",
+        params={"project_id": project_id, "text_id": text_id, "chunk_index": 0},
+        files={"file": ("questions.jsonl", io.BytesIO(lines))}
+    )
+
+
+async def load(client: httpx.AsyncClient, project_id: str, text_id: str, question_ids, args):
+    """返回 ({操作类型: (延迟列表, 失败次数)}, {问题ID: 最后一次成功写入的答案})"""
+    readers, writers, batch, duration = args.readers, args.writers, args.batch, args.duration
+    results = {"read": ([], 0), "write": ([], 0), "import": ([], 0)}
+    expected = {}
+    deadline = time.perf_counter() + duration
+    pages = max(1, len(question_ids) // 50)
+
+    async def timed(kind: str, request) -> bool:
+        start = time.perf_counter()
+        try:
+            response = await request()
+            ok = response.status_code == 200
+        except httpx.HTTPError:
+            ok = False
+        latencies, failures = results[kind]
+        if ok:
+            latencies.append(time.perf_counter() - start)
+        else:
+            results[kind] = (latencies, failures + 1)
+        return ok
+
+    async def reader() -> None:
+        while time.perf_counter() < deadline:
+            params = {"project_id": project_id, "page": random.randint(1, pages), "page_size": 50}
+            await timed("read", lambda: client.get("/api/questions/list", params=params))
+
+    async def writer(index: int) -> None:
+        owned = question_ids[index::writers]
+        sequence = 0
+        while time.perf_counter() < deadline:
+            sequence += 1
+            answers = {question_id: f"w{index}-{sequence}" for question_id in random.sample(owned, min(batch, len(owned)))}
+            items = [{"id": question_id, "answer": answer} for question_id, answer in answers.items()]
+            if await timed("write", lambda: client.patch("/api/questions/batch", json={"items": items})):
+                expected.update(answers)
+
+    async def importer(index: int) -> None:
+        sequence = 0
+        while time.perf_counter() < deadline:
+            sequence += 1
+            await timed("import", lambda: import_questions(
+                client, project_id, text_id, args.import_rows, f"导入{index}-{sequence}-"
+            ))
+
+    await asyncio.gather(
+        *(reader() for _ in range(readers)),
+        *(writer(i) for i in range(writers)),
+        *(importer(i) for i in range(args.importers))
+    )
+    return results, expected
+
+
+async def verify(client: httpx.AsyncClient, project_id: str, expected: dict) -> int:
+    """返回答案与最后一次成功写入不一致的问题数"""
+    actual = {}
+    page = 1
+    while True:
+        body = (await client.get(
+            "/api/questions/list", params={"project_id": project_id, "page": page, "page_size": 1000}
+        )).json()
+        if not body["items"]:
+            break
+        actual.update((item["id"], item["answer"]) for item in body["items"])
+        page += 1
+    return sum(1 for question_id, answer in expected.items() if actual.get(question_id) != answer)
+
+
+def report(workers: int, results, duration: float, mismatched: int) -> None:
+    for kind, (latencies, failures) in results.items():
+        if len(latencies) >= 2:
+            cuts = statistics.quantiles(latencies, n=100)
+            p50, p95, p99 = cuts[49] * 1000, cuts[94] * 1000, cuts[98] * 1000
+        else:
+            p50 = p95 = p99 = float("nan")
+        print(
+            f"workers={workers:<3} {kind:<6} {len(latencies) / duration:9.1f} req/s  "
+            f"p50 {p50:7.1f} ms  p95 {p95:7.1f} ms  p99 {p99:7.1f} ms  failed {failures}"
+        )
+    print(f"workers={workers:<3} 一致性检查: {'通过' if mismatched == 0 else f'{mismatched} 个问题的答案与最后一次写入不一致'}")
+
+
+async def run(args, workers: int, database_url: str) -> int:
+    port = free_port()
+    env = {**os.environ, "DATABASE_URL": database_url, "PYTHONPATH": str(REPO_ROOT)}
+    process = subprocess.Popen(
+        [sys.executable, "-m", "backend.serve", "--workers", str(workers), "--bind", f"127.0.0.1:{port}"],
+        cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    limits = httpx.Limits(max_connections=args.readers + args.writers + args.importers)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+            await wait_ready(client, process)
+            project_id, text_id, question_ids = await seed(client, args.rows)
+            results, expected = await load(client, project_id, text_id, question_ids, args)
+            mismatched = await verify(client, project_id, expected)
+            report(workers, results, args.duration, mismatched)
+            await client.post("/api/projects/delete", params={"project_id": project_id})
+            # 导入失败（如写锁冲突）与数据不一致一样视为失败
+            return mismatched + results["import"][1]
+    finally:
+        process.terminate()
+        process.wait(timeout=60)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,4", help="逗号分隔的 worker 数量，依次测试")
+    parser.add_argument("--rows", type=int, default=5000, help="导入的问题数")
+    parser.add_argument("--readers", type=int, default=32, help="读协程数量")
+    parser.add_argument("--writers", type=int, default=8, help="写协程数量")
+    parser.add_argument("--batch", type=int, default=20, help="每次批量 PATCH 修改的问题数")
+    parser.add_argument("--importers", type=int, default=1, help="导入协程数量，0 表示不导入")
+    parser.add_argument("--import-rows", type=int, default=2000, help="每次导入的问题数")
+    parser.add_argument("--duration", type=float, default=15.0, help="每轮负载的持续时间（秒）")
+    parser.add_argument("--database-url", default=None, help="共享数据库地址，不传则每轮使用新的临时 SQLite 数据库")
+    args = parser.parse_args()
+
+    failed = 0
+    for workers in (int(value) for value in args.workers.split(",")):
+        with tempfile.TemporaryDirectory() as workdir:
+            database_url = args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+            failed += asyncio.run(run(args, workers, database_url))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
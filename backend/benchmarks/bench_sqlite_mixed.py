@@ -0,0 +1,146 @@
+"""SQLite 混合读写负载基准测试
+
+若干写协程不断新增问题（与接口相同：写入问题 + 更新项目版本号，一个事务），
+若干读协程不断分页读取问题列表，统计两类操作的吞吐、延迟分位数和失败次数。对比两种运行方式：
+
+- default: 默认配置的异步引擎（回滚日志模式，连接池中的多个连接各自争抢写锁）
+- wal:     WAL + pragma，写操作排队使用唯一的写连接（BEGIN IMMEDIATE），读操作使用只读连接池
+
+用法（在仓库根目录执行）:
+    python -m backend.benchmarks.bench_sqlite_mixed --rows 20000 --writers 8 --readers 8 --duration 10
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+import uuid
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.app.core.config import settings
+from backend.app.core.database import RoutingSession, configure_sqlite
+from backend.app.models.database import Base, Question as QuestionModel, Text as TextModel
+from backend.app.services.question_service import QuestionService
+from backend.app.services.version_service import VersionService
+from backend.benchmarks.bench_list_serialization import seed
+
+
+def prepare(path: str, rows: int):
+    """建库并写入初始数据，返回 (项目ID, 文本ID)"""
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    try:
+        project_id = seed(db, rows)
+        text_id = db.query(TextModel.id).filter(TextModel.project_id == project_id).scalar()
+    finally:
+        db.close()
+        engine.dispose()
+    return project_id, text_id
+
+
+def default_engines(url: str):
+    engine = create_async_engine(url)
+    return [engine], async_sessionmaker(engine, expire_on_commit=False)
+
+
+def wal_engines(url: str):
+    writer = create_async_engine(url, pool_size=1, max_overflow=0, pool_timeout=settings.SQLITE_WRITE_TIMEOUT_SECONDS)
+    reader = create_async_engine(url, pool_size=settings.SQLITE_READ_POOL_SIZE, max_overflow=0)
+    configure_sqlite(writer.sync_engine, immediate=True)
+    configure_sqlite(reader.sync_engine, read_only=True)
+    factory = async_sessionmaker(
+        writer,
+        sync_session_class=RoutingSession,
+        info={"read_bind": reader.sync_engine},
+        expire_on_commit=False
+    )
+    return [writer, reader], factory
+
+
+async def workload(factory, project_id: str, text_id: str, writers: int, readers: int, duration: float):
+    """返回 {操作类型: (延迟列表, 失败次数)}"""
+    results = {"write": ([], 0), "read": ([], 0)}
+    deadline = time.perf_counter() + duration
+
+    async def write_once() -> None:
+        async with factory() as db:
+            db.add(QuestionModel(
+                id=str(uuid.uuid4()),
+                content="新问题",
+                answer="答案",
+                project_id=project_id,
+                text_id=text_id,
+                chunk_index=0,
+                question_metadata={}
+            ))
+            await db.run_sync(VersionService.bump_project, project_id)
+            await db.commit()
+
+    async def read_once() -> None:
+        async with factory() as db:
+            await QuestionService.list_questions(db, project_id=project_id, page=1, page_size=50)
+
+    async def worker(kind: str, operation) -> None:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                await operation()
+            except OperationalError:
+                # database is locked 等
+                latencies, failures = results[kind]
+                results[kind] = (latencies, failures + 1)
+                continue
+            results[kind][0].append(time.perf_counter() - start)
+
+    await asyncio.gather(
+        *(worker("write", write_once) for _ in range(writers)),
+        *(worker("read", read_once) for _ in range(readers))
+    )
+    return results
+
+
+def report(mode: str, results, duration: float) -> None:
+    for kind, (latencies, failures) in results.items():
+        if len(latencies) >= 2:
+            cuts = statistics.quantiles(latencies, n=100)
+            p50, p95 = cuts[49] * 1000, cuts[94] * 1000
+        else:
+            p50 = p95 = float("nan")
+        print(
+            f"{mode:<8} {kind:<6} {len(latencies) / duration:9.1f} ops/s  "
+            f"p50 {p50:8.1f} ms  p95 {p95:8.1f} ms  failed {failures}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000, help="初始问题行数")
+    parser.add_argument("--writers", type=int, default=8, help="写协程数量")
+    parser.add_argument("--readers", type=int, default=8, help="读协程数量")
+    parser.add_argument("--duration", type=float, default=10.0, help="每种方式的运行时间（秒）")
+    args = parser.parse_args()
+
+    for mode, build in (("default", default_engines), ("wal", wal_engines)):
+        with tempfile.TemporaryDirectory() as workdir:
+            path = os.path.join(workdir, "bench.db")
+            project_id, text_id = prepare(path, args.rows)
+
+            async def run():
+                engines, factory = build(f"sqlite+aiosqlite:///{path}")
+                try:
+                    return await workload(factory, project_id, text_id, args.writers, args.readers, args.duration)
+                finally:
+                    for engine in engines:
+                        await engine.dispose()
+
+            report(mode, asyncio.run(run()), args.duration)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""API 启动耗时分析
+
+在子进程中用 python -X importtime 导入应用模块，输出导入总耗时、峰值内存，
+以及按顶层包汇总的导入耗时和累计耗时最长的模块，用于发现拖慢冷启动的依赖。
+
+用法（在仓库根目录执行）:
+    python -m backend.benchmarks.profile_startup --top 20
+    python -m backend.benchmarks.profile_startup --with-llm   # 同时导入 crewai，对比生成问题时的额外开销
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+
+# 子进程中执行：导入目标模块，最后一行输出耗时和峰值内存
+PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+for name in sys.argv[1:]:
+    __import__(name)
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}))
+"""
+
+
+def parse_importtime(stderr: str):
+    """解析 -X importtime 的输出，返回 [(模块名, 自身微秒, 累计微秒, 嵌套层级)]"""
+    records = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        records.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return records
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="backend.main", help="要导入的模块")
+    parser.add_argument("--with-llm", action="store_true", help="额外导入 crewai")
+    parser.add_argument("--top", type=int, default=15, help="输出的条目数")
+    args = parser.parse_args()
+
+    modules = [args.module] + (["crewai"] if args.with_llm else [])
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [str(REPO_ROOT), os.environ.get("PYTHONPATH")]))}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE, *modules],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        sys.exit(result.stderr.strip().splitlines()[-1])
+
+    summary = json.loads(result.stdout.strip().splitlines()[-1])
+    records = parse_importtime(result.stderr)
+
+    # 按顶层包汇总自身耗时，各包之间不重复计算
+    packages = defaultdict(int)
+    for name, self_us, _, _ in records:
+        packages[name.split(".")[0]] += self_us
+
+    print(f"导入 {' + '.join(modules)}: {summary['seconds']:.2f} s, 峰值内存 {summary['max_rss_kb'] / 1024:.0f} MB")
+    print(f"\n按顶层包汇总（自身耗时）:")
+    for package, total_us in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {total_us / 1000:9.1f} ms  {package}")
+
+    print(f"\n累计耗时最长的模块:")
+    for name, _, cumulative_us, depth in sorted(records, key=lambda record: -record[2])[:args.top]:
+        print(f"  {cumulative_us / 1000:9.1f} ms  {'  ' * depth}{name}")
+
+
+if __name__ == "__main__":
+    main()
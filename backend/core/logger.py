@@ -1,7 +1,21 @@
+import functools
+import inspect
+import itertools
+import logging
+import os
+import queue
 import sys
 import threading
+import time
+import traceback
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
 from datetime import datetime
+import orjson
 from loguru import logger
+from backend.app.core.config import settings
+from backend.app.core.metrics import track_job
 from .file_path import log_path
 
 current_date = datetime.now().strftime("%Y-%m-%d")
@@ -15,31 +29,222 @@ logger.level("WARNING", color="<yellow>")
 logger.level("ERROR", color="<red>")
 logger.level("CRITICAL", color="<bold><red>")
 
+
+def _parse_levels(spec: str) -> dict:
+    """解析 LOG_LEVELS（"名称=级别,名称=级别"），返回 {logger 名称: 级别}"""
+    levels = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, level = item.partition("=")
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def _level_filter(default_level: str, overrides: dict):
+    """按 logger 名称过滤级别：取最长的匹配前缀，未覆盖的使用 default_level
+
+    队列写出线程转发的记录（extra 中带 _sink）不经过这一层
+    """
+    thresholds = sorted(
+        ((name, logger.level(level).no) for name, level in overrides.items()), key=lambda item: -len(item[0])
+    )
+    default_no = logger.level(default_level.upper()).no
+    cache = {}
+
+    def accept(record) -> bool:
+        if "_sink" in record["extra"]:
+            return False
+        name = record["name"] or ""
+        threshold = cache.get(name)
+        if threshold is None:
+            threshold = next(
+                (no for prefix, no in thresholds if name == prefix or name.startswith(prefix + ".")), default_no
+            )
+            cache[name] = threshold
+        return record["level"].no >= threshold
+
+    return accept
+
+
+def _min_level(default_level: str, overrides: dict) -> int:
+    """sink 本身的级别取各覆盖级别中最低的，具体模块的级别由过滤器决定"""
+    return min(logger.level(level).no for level in [default_level.upper(), *overrides.values()])
+
+
+class QueuedSink:
+    """请求线程只把格式化好的日志放入内存队列，由后台线程交给真正的 sink（标准输出、按小时切分的文件）写出
+
+    loguru 自带的 enqueue 面向多进程，每条日志都要序列化后写入管道，调用方的开销反而更大，
+    且写出端阻塞时管道写满同样会阻塞调用方。这里队列满时直接丢弃并在之后补记丢弃条数，日志 IO 不会拖慢请求。
+    fork 出的子进程中重新创建队列和写出线程
+    """
+
+    def __init__(self, name: str, maxsize: int):
+        self.name = name
+        self.maxsize = maxsize
+        self.dropped = 0
+        self._start()
+        os.register_at_fork(after_in_child=self._start)
+
+    def _start(self) -> None:
+        self._queue = queue.Queue(self.maxsize)
+        self._thread = threading.Thread(target=self._run, name=f"log-{self.name}", daemon=True)
+        self._thread.start()
+
+    def write(self, message) -> None:
+        try:
+            self._queue.put_nowait(message)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        target = logger.bind(_sink=self.name).opt(raw=True)
+        reported = 0
+        while True:
+            message = self._queue.get()
+            if message is None:
+                break
+            target.log(message.record["level"].name, message)
+            if self.dropped != reported:
+                target.warning(f"日志队列已满，已丢弃 {self.dropped - reported} 条日志\n")
+                reported = self.dropped
+
+    def stop(self) -> None:
+        """loguru 移除 handler 时（包括进程退出时）写完队列中剩余的日志"""
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+
+def _json_format(record) -> str:
+    """JSON 格式：每条日志一行，extra 中的 request_id / job_id 等字段展开到顶层"""
+    payload = {
+        "time": record["time"].isoformat(),
+        "level": record["level"].name,
+        "logger": record["name"],
+        "function": record["function"],
+        "line": record["line"],
+        "process": record["process"].id,
+        "message": record["message"],
+    }
+    payload.update((key, value) for key, value in record["extra"].items() if key != "_json")
+    if record["exception"] is not None:
+        exc_type, exc_value, exc_traceback = record["exception"]
+        payload["exception"] = "".join(traceback.format_exception(exc_type, exc_value, exc_traceback))
+    record["extra"]["_json"] = orjson.dumps(payload, default=str).decode()
+    return "{extra[_json]}\n"
+
+
+level_overrides = _parse_levels(settings.LOG_LEVELS)
+json_logs = settings.LOG_FORMAT.lower() == "json"
+
+handlers = [
+    {
+        "sink": sys.stdout,  # 日志输出到标准输出
+        "level": _min_level(settings.LOG_LEVEL, level_overrides),  # 日志级别
+        "filter": _level_filter(settings.LOG_LEVEL, level_overrides),
+        "format": _json_format if json_logs else "<green>{time:YYYY-MM-DD HH:mm:ss.SSSS} | {module}:{line}</green> | <level>{level}</level> | {message}",
+        "colorize": not json_logs,  # 启用颜色
+        "backtrace": False,  # 控制是否追溯详细的回溯信息（即代码调用链和变量状态等详细信息）
+        "diagnose": False,  # 控制不会包含详细的诊断信息
+    },
+    {
+        "sink": f"{log_path}/{current_date}/easy_dataset_python_{current_hour}.log",  # 指定日志输出到文件
+        "level": _min_level(settings.LOG_FILE_LEVEL, level_overrides),  # 日志级别
+        "filter": _level_filter(settings.LOG_FILE_LEVEL, level_overrides),
+        "format": _json_format if json_logs else "{time:YYYY-MM-DD HH:mm:ss.SSSS} | {module}:{line} | {level} | {message}",  # 日志格式
+        "rotation": "1 hour",  # 每小时自动分割日志
+        "retention": "1 week",  # 保留最近 7 天的日志文件
+        "compression": "zip",  # 压缩日志文件
+        "backtrace": True,  # 控制是否追溯详细的回溯信息（即代码调用链和变量状态等详细信息）
+        "diagnose": settings.LOG_DIAGNOSE,  # 控制是否包含详细的诊断信息
+    }
+]
+
+if settings.LOG_QUEUE_SIZE > 0:
+    # 队列模式：调用方的 handler 只负责过滤和格式化，写入 QueuedSink；
+    # 真正的 sink 只接收写出线程转发的记录（extra 中带 _sink），不再格式化
+    sink_options = ("sink", "rotation", "retention", "compression")
+    queued = []
+    for index, handler in enumerate(handlers):
+        sink = QueuedSink(f"sink{index}", settings.LOG_QUEUE_SIZE)
+        queued.append({key: value for key, value in handler.items() if key not in sink_options} | {"sink": sink})
+        queued.append({key: value for key, value in handler.items() if key in sink_options} | {
+            "level": 0,
+            "filter": lambda record, name=sink.name: record["extra"].get("_sink") == name
+        })
+    handlers = queued
+
 # 配置自定义 logger handler，输出日志到：1、标准输出 2、日志输出文件 3、Allure报告
-logger.configure(
-    handlers=[
-        {
-            "sink": sys.stdout,  # 日志输出到标准输出
-            "level": "DEBUG",  # 日志级别
-            "format": "<green>{time:YYYY-MM-DD HH:mm:ss.SSSS} | {module}:{line}</green> | <level>{level}</level> | {message}",
-            "colorize": True,  # 启用颜色
-            "backtrace": False,  # 控制是否追溯详细的回溯信息（即代码调用链和变量状态等详细信息）
-            "diagnose": False,  # 控制不会包含详细的诊断信息
-            "enqueue": False,  # 关闭多线程安全队列
-        },
-        {
-            "sink": f"{log_path}/{current_date}/easy_dataset_python_{current_hour}.log",  # 指定日志输出到文件
-            "level": "INFO",  # 日志级别
-            "format": "{time:YYYY-MM-DD HH:mm:ss.SSSS} | {module}:{line} | {level} | {message}",  # 日志格式
-            "rotation": "1 hour",  # 每小时自动分割日志
-            "retention": "1 week",  # 保留最近 7 天的日志文件
-            "compression": "zip",  # 压缩日志文件
-            "backtrace": True,  # 控制是否追溯详细的回溯信息（即代码调用链和变量状态等详细信息）
-            "diagnose": True,  # 控制是否包含详细的诊断信息
-            "enqueue": False,  # 关闭多线程安全队列
-        }
-    ]
-)
+logger.configure(handlers=handlers)
+
+
+class InterceptHandler(logging.Handler):
+    """把标准库 logging 的记录转发给 loguru（sqlalchemy、litellm 等第三方库），统一格式和级别控制"""
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            level = logger.level(record.levelname).name
+        except ValueError:
+            level = record.levelno
+        # 跳过 logging 模块自身的调用栈，定位到真正打日志的位置
+        frame, depth = inspect.currentframe(), 0
+        while frame and (depth == 0 or frame.f_code.co_filename == logging.__file__):
+            frame = frame.f_back
+            depth += 1
+        # 记录名使用标准库 logger 的名称，与 LOG_LEVELS 中配置的名称一致
+        logger.patch(lambda entry: entry.update(name=record.name)).opt(
+            depth=depth, exception=record.exc_info
+        ).log(level, record.getMessage())
+
+
+if json_logs:
+    # 没有单独配置 handler 的标准库 logger 都输出为 JSON（uvicorn / gunicorn 自己配置的访问日志除外）
+    logging.basicConfig(handlers=[InterceptHandler()], level=0, force=True)
+
+# 按名称覆盖级别同样作用于标准库 logger
+for name, level in level_overrides.items():
+    if isinstance(logging.getLevelName(level), int):
+        logging.getLogger(name).setLevel(level)
+
+
+@contextmanager
+def job_context(job: str, **fields):
+    """一次任务（生成问题、导入、导出等）期间的日志附带 job / job_id，结束时记录耗时，并计入任务指标"""
+    job_id = uuid.uuid4().hex[:12]
+    start = time.perf_counter()
+    with logger.contextualize(job=job, job_id=job_id, **fields), track_job(job):
+        try:
+            yield job_id
+        finally:
+            logger.info(f"任务结束: {job}，耗时 {time.perf_counter() - start:.2f}s")
+
+
+def with_job(job: str):
+    """装饰器：函数执行期间的日志附带 job_id，同步和异步函数都可以使用"""
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with job_context(job):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with job_context(job):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+_sample_counters = defaultdict(itertools.count)
+
+
+def sampled(event: str, every: int = settings.LOG_SAMPLE_EVERY) -> bool:
+    """高频事件的采样：同一事件每 every 次返回一次 True（第一次总是 True）
+
+    调用方在需要记录时先判断，跳过的日志连消息都不会格式化
+    """
+    return every <= 1 or next(_sample_counters[event]) % every == 0
 
 
 # 定义全局异常捕获函数，处理未捕获的异常
@@ -1,12 +1,25 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
-from app.api import projects, texts, questions, datasets
-from app.core.database import engine
-from app.models.database import Base
+from backend.app.api import projects, texts, questions, datasets, system, metrics
+from backend.app.core.config import settings
+from backend.app.core.init_db import init_db
+from backend.app.core.metrics import MetricsMiddleware
+from backend.app.core.profiling import ProfilingMiddleware
+from backend.app.core.request_id import RequestIdMiddleware
 from backend.core.logger import logger
 
-app = FastAPI(title="Easy Dataset API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 创建数据库表并升级已有表结构（在启动时执行而不是导入时，只导入应用的工具和测试不会连接数据库）
+    if settings.DB_INIT_ON_STARTUP:
+        init_db()
+    yield
+
+
+app = FastAPI(title="Easy Dataset API", lifespan=lifespan)
 
 # 配置CORS
 app.add_middleware(
@@ -15,16 +28,22 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID"],
 )
-
-# 创建数据库表
-Base.metadata.create_all(bind=engine)
+# 按需分析单个请求（X-Profile-Token 请求头或 PROFILE_PATHS），在 request_id 之内，分析期间的日志附带 request_id
+app.add_middleware(ProfilingMiddleware)
+# 请求日志附带 request_id
+app.add_middleware(RequestIdMiddleware)
+# 请求次数和耗时计入指标（按路由模板统计）
+app.add_middleware(MetricsMiddleware)
 
 # 注册路由
 app.include_router(projects.router, prefix="/api/projects", tags=["projects"])
 app.include_router(texts.router, prefix="/api/texts", tags=["texts"])
 app.include_router(questions.router, prefix="/api/questions", tags=["questions"])
 app.include_router(datasets.router, prefix="/api/datasets", tags=["datasets"])
+app.include_router(system.router, prefix="/api/system", tags=["system"])
+app.include_router(metrics.router, tags=["metrics"])
 
 
 @app.get("/")
@@ -34,6 +53,7 @@ async def root():
 
 
 if __name__ == "__main__":
+    # 开发环境：单进程并自动重载，生产环境使用 python -m backend.serve
     uvicorn.run(
         app="main:app",
         host="0.0.0.0",
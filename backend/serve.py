@@ -0,0 +1,149 @@
+"""生产环境启动入口：gunicorn 主进程管理多个 uvicorn worker（uvloop + httptools）
+
+用法（在仓库根目录执行）:
+    python -m backend.serve --workers 4 --bind 0.0.0.0:1897
+
+未指定的参数使用 settings 中的 SERVER_* 配置（可通过同名环境变量覆盖）。
+主进程导入应用并在 fork 前执行一次建表/升级，worker 处理 SERVER_MAX_REQUESTS 个请求后平滑重启。
+Windows 上没有 gunicorn，退回 uvicorn 自带的多进程模式（不支持预加载）
+
+多个 worker 时通过 PROMETHEUS_MULTIPROC_DIR 目录汇总各 worker 的 /metrics 指标，未设置时使用临时目录
+"""
+import argparse
+import glob
+import os
+import shutil
+import tempfile
+
+from backend.app.core.config import settings
+
+APP = "backend.main:app"
+METRICS_DIR_PREFIX = "easy-dataset-metrics-"
+
+# 未指定 PROMETHEUS_MULTIPROC_DIR 时自动创建的临时目录，退出时删除；运维指定的目录从不删除
+_temp_metrics_dir = None
+
+
+def _init_db_once() -> None:
+    """在主进程中建表并升级表结构，worker 启动时不再重复执行（多个进程同时建表会互相冲突）"""
+    from backend.app.core.database import engine
+    from backend.app.core.init_db import init_db
+
+    init_db()
+    # 主进程不处理请求，关闭建表用的连接，避免 fork 后父子进程共用同一个连接
+    engine.dispose()
+    settings.DB_INIT_ON_STARTUP = False
+    # 未预加载时 worker 会重新导入配置，通过环境变量传递
+    os.environ["DB_INIT_ON_STARTUP"] = "false"
+
+
+def _prepare_metrics_dir(workers: int) -> None:
+    """多进程时各 worker 把指标写入共享目录，/metrics 汇总整个目录
+
+    必须在导入 prometheus_client 之前设置（导入时决定指标存储方式），因此本模块不在顶层导入 logger 等依赖它的模块
+    """
+    global _temp_metrics_dir
+    if workers <= 1:
+        return
+    directory = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if not directory:
+        directory = _temp_metrics_dir = tempfile.mkdtemp(prefix=METRICS_DIR_PREFIX)
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = directory
+    # 清掉上次运行留下的指标文件：只删除 prometheus_client 写入的 *.db，目录中的其他内容和子目录不动
+    for path in glob.glob(os.path.join(directory, "*.db")):
+        if os.path.isfile(path):
+            os.remove(path)
+
+
+def on_starting(server) -> None:
+    _init_db_once()
+
+
+def child_exit(server, worker) -> None:
+    """worker 退出后删除它的实时指标（livesum 类的 gauge），计数器和直方图保留"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
+
+
+def on_exit(server) -> None:
+    """删除自动创建的临时指标目录"""
+    if _temp_metrics_dir:
+        shutil.rmtree(_temp_metrics_dir, ignore_errors=True)
+
+
+def post_fork(server, worker) -> None:
+    from backend.app.core.database import dispose_after_fork
+
+    dispose_after_fork()
+
+
+def run_gunicorn(options: dict) -> None:
+    from gunicorn.app.base import BaseApplication
+
+    class Application(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from backend.main import app
+            return app
+
+    Application().run()
+
+
+def run_uvicorn(bind: str, workers: int) -> None:
+    import uvicorn
+
+    _init_db_once()
+    host, _, port = bind.rpartition(":")
+    uvicorn.run(
+        APP,
+        host=host or "0.0.0.0",
+        port=int(port),
+        workers=workers,
+        timeout_keep_alive=settings.SERVER_KEEPALIVE,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_TIMEOUT,
+        limit_max_requests=settings.SERVER_MAX_REQUESTS or None,
+        backlog=settings.SERVER_BACKLOG
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bind", default=settings.SERVER_BIND, help="监听地址 host:port")
+    parser.add_argument("--workers", type=int, default=settings.SERVER_WORKERS, help="worker 进程数")
+    args = parser.parse_args()
+    _prepare_metrics_dir(args.workers)
+
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        from backend.core.logger import logger
+
+        logger.warning("未安装 gunicorn，使用 uvicorn 多进程模式启动")
+        run_uvicorn(args.bind, args.workers)
+        return
+
+    run_gunicorn({
+        "bind": args.bind,
+        "workers": args.workers,
+        "worker_class": "backend.app.core.worker.UvloopWorker",
+        "preload_app": settings.SERVER_PRELOAD,
+        "max_requests": settings.SERVER_MAX_REQUESTS,
+        "max_requests_jitter": settings.SERVER_MAX_REQUESTS_JITTER,
+        "keepalive": settings.SERVER_KEEPALIVE,
+        "timeout": settings.SERVER_TIMEOUT,
+        "graceful_timeout": settings.SERVER_GRACEFUL_TIMEOUT,
+        "backlog": settings.SERVER_BACKLOG,
+        "on_starting": on_starting,
+        "post_fork": post_fork,
+        "child_exit": child_exit,
+        "on_exit": on_exit
+    })
+
+
+if __name__ == "__main__":
+    main()
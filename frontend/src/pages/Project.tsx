@@ -64,10 +64,22 @@ interface Project {
   updated_at: string;
 }
 
+// 文本正文分页读取的每页字符数
+const TEXT_PAGE_LENGTH = 20000;
+
+interface TextContentPage {
+  offset: number;
+  length: number;
+  total: number;
+  next_offset: number | null;
+  content: string;
+}
+
 interface Text {
   id: string;
   title: string;
-  content: string;
+  file_size?: number;
+  total_chunks?: number;
   created_at: string;
   updated_at: string;
   chunks?: Array<{
@@ -108,17 +120,24 @@ interface Dataset {
   }>;
 }
 
+// 分块列表接口每页的数量
+const CHUNK_PAGE_SIZE = 1000;
+
+// 分块摘要（不含正文，正文在选中分块时单独获取）
+interface ChunkSummary {
+  index: number;
+  start_index: number;
+  end_index: number;
+  metadata?: Record<string, any>;
+  question_count?: number;
+  answer_count?: number;
+}
+
 interface TextFile {
   id: string;
   name: string;
   size: number;
-  chunks: Array<{
-    content: string;
-    start_index: number;
-    end_index: number;
-    metadata?: Record<string, any>;
-    question_count?: number;
-  }>;
+  chunks: ChunkSummary[];
 }
 
 interface ProjectState {
@@ -282,12 +301,7 @@ export default function Project() {
   const [downloadTextId, setDownloadTextId] = useState<string | null>(null);
   const [downloadTextTitle, setDownloadTextTitle] = useState<string | null>(null);
   const [openViewContent, setOpenViewContent] = useState(false);
-  const [selectedTextChunks, setSelectedTextChunks] = useState<Array<{
-    content: string;
-    start_index: number;
-    end_index: number;
-    question_count?: number;
-  }>>([]);
+  const [selectedTextChunks, setSelectedTextChunks] = useState<ChunkSummary[]>([]);
   const isCancelledRef = useRef(false);
   const [selectedQuestions, setSelectedQuestions] = useState<string[]>([]);
   const [openEditQuestion, setOpenEditQuestion] = useState(false);
@@ -314,6 +328,9 @@ export default function Project() {
     message: ''
   });
   const [openViewChunkContent, setOpenViewChunkContent] = useState(false);
+  const [viewingText, setViewingText] = useState<Text | null>(null);
+  const [textPage, setTextPage] = useState<TextContentPage | null>(null);
+  const [textPageLoading, setTextPageLoading] = useState(false);
   const [viewingChunkContent, setViewingChunkContent] = useState<{
     textId: string;
     chunkIndex: number;
@@ -418,36 +435,41 @@ export default function Project() {
     }
   };
 
-  // 获取文本分块列表
-  const fetchTextChunks = async (textId: string) => {
-    try {
+  // 分页获取文本的全部分块摘要，问题数和已回答数随分块一起返回
+  const fetchChunkSummaries = async (textId: string): Promise<ChunkSummary[]> => {
+    const chunks: ChunkSummary[] = [];
+    for (let page = 1; ; page++) {
       const response = await axios.get(`/api/texts/chunks`, {
         params: {
-          text_id: textId
+          text_id: textId,
+          page,
+          page_size: CHUNK_PAGE_SIZE,
+          include_content: false
         }
       });
-      const chunks = response.data;
-      
-      // 获取每个分块的问题数量
-      const chunksWithQuestionCount = await Promise.all(
-        chunks.map(async (chunk: any, index: number) => {
-          try {
-            const questionResponse = await axios.get(`/api/projects/${projectId}/texts/${textId}/chunk/${index}/questions/count`);
-            return {
-              ...chunk,
-              question_count: questionResponse.data.count
-            };
-          } catch (error) {
-            console.error(`Error fetching question count for chunk ${index}:`, error);
-            return {
-              ...chunk,
-              question_count: 0
-            };
-          }
-        })
-      );
-      
-      setSelectedTextChunks(chunksWithQuestionCount);
+      chunks.push(...response.data.items);
+      if (response.data.items.length < CHUNK_PAGE_SIZE || chunks.length >= response.data.total) {
+        return chunks;
+      }
+    }
+  };
+
+  // 获取单个分块的正文
+  const fetchChunkContent = async (textId: string, chunkIndex: number): Promise<string> => {
+    const response = await axios.get(`/api/texts/chunks`, {
+      params: {
+        text_id: textId,
+        page: chunkIndex + 1,
+        page_size: 1
+      }
+    });
+    return response.data.items[0]?.content ?? '';
+  };
+
+  // 获取文本分块列表
+  const fetchTextChunks = async (textId: string) => {
+    try {
+      setSelectedTextChunks(await fetchChunkSummaries(textId));
     } catch (error) {
       console.error('Error fetching chunks:', error);
       setError('获取分块数据失败');
@@ -489,24 +511,8 @@ export default function Project() {
         if (currentTab === 'datasets') {
           // 如果当前有选中的文件，只刷新其所有分块的问题数量
           if (state.selectedFile) {
-            const chunksWithQuestionCount = await Promise.all(
-              state.selectedFile.chunks.map(async (chunk, index) => {
-                try {
-                  const questionResponse = await axios.get(`/api/projects/${projectId}/texts/${state.selectedFile!.id}/chunk/${index}/questions/count`);
-                  return {
-                    ...chunk,
-                    question_count: questionResponse.data.count
-                  };
-                } catch (error) {
-                  console.error(`Error fetching question count for chunk ${index}:`, error);
-                  return {
-                    ...chunk,
-                    question_count: 0
-                  };
-                }
-              })
-            );
-            
+            const chunksWithQuestionCount = await fetchChunkSummaries(state.selectedFile.id);
+
             setState(prev => ({
               ...prev,
               selectedFile: {
@@ -618,34 +624,12 @@ export default function Project() {
   const handleFileSelect = async (text: Text) => {
     try {
       setState(prev => ({ ...prev, loading: true }));
-      // 获取文件的分块数据
-      const response = await axios.get(`/api/texts/chunks?text_id=${text.id}`);
-      const chunks = response.data;
-      
-      // 获取每个分块的问题数量
-      const chunksWithQuestionCount = await Promise.all(
-        chunks.map(async (chunk: any, index: number) => {
-          try {
-            const questionResponse = await axios.get(`/api/projects/${projectId}/texts/${text.id}/chunk/${index}/questions/count`);
-            return {
-              ...chunk,
-              question_count: questionResponse.data.count
-            };
-          } catch (error) {
-            console.error(`Error fetching question count for chunk ${index}:`, error);
-            return {
-              ...chunk,
-              question_count: 0
-            };
-          }
-        })
-      );
-      
+      // 获取文件的分块摘要（不含正文），问题数量随分块一起返回
       const textFile: TextFile = {
         id: text.id,
         name: text.title,
-        size: text.content.length,
-        chunks: chunksWithQuestionCount
+        size: text.file_size ?? 0,
+        chunks: await fetchChunkSummaries(text.id)
       };
       
       setState(prev => ({
@@ -693,9 +677,10 @@ export default function Project() {
 
     try {
       // 获取分块内容
+      const content = await fetchChunkContent(selectedFile.id, chunkIndex);
       setState(prev => ({
         ...prev,
-        selectedChunkContent: selectedFile.chunks[chunkIndex].content,
+        selectedChunkContent: content,
         loading: false
       }));
 
@@ -858,6 +843,28 @@ export default function Project() {
     setOpenDownload(true);
   };
 
+  // 按字符区间分页读取文本正文，大文件不需要整篇加载
+  const loadTextPage = async (text: Text, offset: number) => {
+    setTextPageLoading(true);
+    try {
+      const response = await axios.get(`/api/texts/content`, {
+        params: { text_id: text.id, offset, length: TEXT_PAGE_LENGTH }
+      });
+      setTextPage(response.data);
+    } catch (error) {
+      console.error('Error fetching text content:', error);
+      setError('获取文件内容失败');
+    } finally {
+      setTextPageLoading(false);
+    }
+  };
+
+  const handleViewText = (text: Text) => {
+    setViewingText(text);
+    setTextPage(null);
+    loadTextPage(text, 0);
+  };
+
   const handleDownloadConfirm = async () => {
     if (!downloadTextId) return;
     try {
@@ -1424,13 +1431,7 @@ export default function Project() {
   const handleViewChunkContent = async (question: Question) => {
     try {
       // 获取分块内容
-      const response = await axios.get(`/api/texts/chunks`, {
-        params: {
-          text_id: question.text_id
-        }
-      });
-      
-      const chunkContent = response.data[question.chunk_index].content;
+      const chunkContent = await fetchChunkContent(question.text_id, question.chunk_index);
       
       setViewingChunkContent({
         textId: question.text_id,
@@ -1515,6 +1516,13 @@ export default function Project() {
                                 >
                                   <EditIcon />
                                 </IconButton>
+                                <IconButton
+                                  size="small"
+                                  onClick={() => handleViewText(text)}
+                                  sx={{ mr: 1 }}
+                                >
+                                  <VisibilityIcon />
+                                </IconButton>
                                 <IconButton 
                                   size="small"
                                   onClick={() => handleDownloadClick(text.id, text.title)}
@@ -1534,18 +1542,8 @@ export default function Project() {
                             <Typography color="text.secondary" sx={{ mb: 2 }}>
                               上传时间：{new Date(text.created_at).toLocaleString()}
                             </Typography>
-                            <Typography
-                              variant="body2"
-                              sx={{
-                                maxHeight: '100px',
-                                overflow: 'hidden',
-                                textOverflow: 'ellipsis',
-                                display: '-webkit-box',
-                                WebkitLineClamp: 3,
-                                WebkitBoxOrient: 'vertical',
-                              }}
-                            >
-                              {text.content}
+                            <Typography variant="body2" color="text.secondary">
+                              大小：{((text.file_size ?? 0) / 1024).toFixed(2)} KB，分块：{text.total_chunks ?? 0}
                             </Typography>
                           </CardContent>
                         </Card>
@@ -1635,7 +1633,7 @@ export default function Project() {
                       <FormControl fullWidth size="small" disabled={!selectedTextId}>
                         <Autocomplete
                           value={selectedChunkIndex === null ? 
-                            { content: '全部分块', start_index: -1, end_index: -1 } : 
+                            { index: -1, start_index: -1, end_index: -1 } : 
                             selectedTextChunks[selectedChunkIndex] || null}
                           onChange={(_, newValue) => {
                             if (!newValue || newValue.start_index === -1) {
@@ -1646,11 +1644,11 @@ export default function Project() {
                             }
                             setPage(1);
                           }}
-                          options={[{ content: '全部分块', start_index: -1, end_index: -1 }, ...selectedTextChunks]}
+                          options={[{ index: -1, start_index: -1, end_index: -1 }, ...selectedTextChunks]}
                           getOptionLabel={(option) => {
                             if (option.start_index === -1) return '全部分块';
                             const index = selectedTextChunks.indexOf(option);
-                            return `分块 ${index + 1} (${option.content.length} 字符)`;
+                            return `分块 ${index + 1} (${option.end_index - option.start_index} 字符)`;
                           }}
                           renderInput={(params) => (
                             <TextField
@@ -1892,18 +1890,8 @@ export default function Project() {
                               <Typography color="text.secondary" sx={{ mb: 2 }}>
                                 上传时间：{new Date(text.created_at).toLocaleString()}
                               </Typography>
-                              <Typography
-                                variant="body2"
-                                sx={{
-                                  maxHeight: '100px',
-                                  overflow: 'hidden',
-                                  textOverflow: 'ellipsis',
-                                  display: '-webkit-box',
-                                  WebkitLineClamp: 3,
-                                  WebkitBoxOrient: 'vertical',
-                                }}
-                              >
-                                {text.content}
+                              <Typography variant="body2" color="text.secondary">
+                                大小：{((text.file_size ?? 0) / 1024).toFixed(2)} KB，分块：{text.total_chunks ?? 0}
                               </Typography>
                             </CardContent>
                           </Card>
@@ -1957,10 +1945,10 @@ export default function Project() {
                           />
                           <Box onClick={() => handleChunkSelect(index)} sx={{ flex: 1 }}>
                             <Typography sx={{ mb: 0.5 }}>分块 {index + 1}</Typography>
-                            <Typography sx={styles.chunkSize}>{chunk.content.length} 字符</Typography>
+                            <Typography sx={styles.chunkSize}>{chunk.end_index - chunk.start_index} 字符</Typography>
                           </Box>
                           <Chip
-                            label={`${chunk.question_count || 0} 个问题`}
+                            label={`${chunk.question_count || 0} 个问题 / ${chunk.answer_count || 0} 个已回答`}
                             size="small"
                             color={chunk.question_count ? 'primary' : 'default'}
                             sx={{ ml: 1 }}
@@ -2391,7 +2379,7 @@ export default function Project() {
               overflow: 'auto'
             }}
           >
-            {state.selectedFile?.chunks[state.selectedChunkIndex!]?.content}
+            {state.selectedChunkContent}
           </Typography>
         </DialogContent>
         <DialogActions>
@@ -2793,6 +2781,53 @@ export default function Project() {
         </DialogActions>
       </Dialog>
 
+      <Dialog
+        open={viewingText !== null}
+        onClose={() => setViewingText(null)}
+        maxWidth="md"
+        fullWidth
+      >
+        <DialogTitle>{viewingText?.title}</DialogTitle>
+        <DialogContent>
+          {textPageLoading && !textPage ? (
+            <Box sx={{ display: 'flex', justifyContent: 'center', p: 3 }}>
+              <CircularProgress />
+            </Box>
+          ) : (
+            <Typography
+              variant="body1"
+              sx={{
+                whiteSpace: 'pre-wrap',
+                maxHeight: '60vh',
+                overflow: 'auto'
+              }}
+            >
+              {textPage?.content}
+            </Typography>
+          )}
+        </DialogContent>
+        <DialogActions>
+          {textPage && (
+            <Typography variant="body2" color="text.secondary" sx={{ mr: 'auto', ml: 2 }}>
+              第 {textPage.offset + 1} - {textPage.offset + textPage.length} 字符，共 {textPage.total} 字符
+            </Typography>
+          )}
+          <Button
+            disabled={textPageLoading || !textPage || textPage.offset === 0}
+            onClick={() => viewingText && textPage && loadTextPage(viewingText, Math.max(0, textPage.offset - TEXT_PAGE_LENGTH))}
+          >
+            上一页
+          </Button>
+          <Button
+            disabled={textPageLoading || textPage?.next_offset == null}
+            onClick={() => viewingText && textPage?.next_offset != null && loadTextPage(viewingText, textPage.next_offset)}
+          >
+            下一页
+          </Button>
+          <Button onClick={() => setViewingText(null)}>关闭</Button>
+        </DialogActions>
+      </Dialog>
+
       <Dialog
         open={openViewChunkContent}
         onClose={() => setOpenViewChunkContent(false)}